@@ -0,0 +1,170 @@
+# agendador.py
+
+import heapq
+import itertools
+import math
+import threading
+import time
+
+class _Estado:
+    __slots__ = ("intervalo", "vence_em", "vol", "preco", "liquidez", "score",
+                 "ultima_busca", "ultima_mudanca", "enviado_em")
+
+    def __init__(self):
+        self.intervalo      = None
+        self.vence_em       = 0.0
+        self.vol            = 0.0     # média móvel de |variação %| do avg_sell
+        self.preco          = None
+        self.liquidez       = 0
+        self.score          = 0.0
+        self.ultima_busca   = None
+        self.ultima_mudanca = None
+        self.enviado_em     = None    # entregue ao coletor e ainda sem resposta
+
+class AgendadorAdaptativo:
+    """
+    Decide quando cada item volta para o coletor.
+
+    Cada item recebe um "calor" h em [0, 1] a partir da volatilidade do
+    avg_sell, da liquidez e do score; o intervalo vai de `intervalo_max`
+    (h=0, item parado) até `intervalo_min` (h=1) em escala logarítmica.
+    Se a soma das taxas (1/intervalo) passar do `orcamento` em req/s, todos
+    os intervalos são esticados pelo mesmo fator.
+    """
+
+    def __init__(self, orcamento=2.5, intervalo_min=5.0, intervalo_max=4 * 3600.0,
+                 perdido_apos=600.0, relogio=time.time):
+        self.orcamento     = orcamento
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.perdido_apos  = perdido_apos
+        self.requisicoes   = 0
+        self.com_mudanca   = 0
+        self._relogio = relogio
+        self._itens   = {}
+        self._heap    = []    # (vence_em, seq, item); entradas velhas são puladas
+        self._seq     = itertools.count()
+        self._soma    = 0.0   # Σ 1/intervalo
+        self._lock    = threading.Lock()
+
+    # ─── calor / intervalo ────────────────────────────────────────────────
+    def calor(self, est):
+        h_vol   = math.tanh(est.vol / 0.05)
+        h_liq   = min(1.0, math.log1p(max(est.liquidez, 0)) / math.log1p(50))
+        h_score = min(1.0, max(est.score, 0.0) / 30.0)
+        return 0.5 * h_vol + 0.3 * h_liq + 0.2 * h_score
+
+    def _recalcular(self, est):
+        if est.intervalo:
+            self._soma -= 1.0 / est.intervalo
+        h = self.calor(est)
+        est.intervalo = self.intervalo_max * (self.intervalo_min / self.intervalo_max) ** h
+        self._soma += 1.0 / est.intervalo
+
+    def fator(self):
+        """Quanto os intervalos estão sendo esticados para caber no orçamento."""
+        return max(1.0, self._soma / self.orcamento)
+
+    def _marcar(self, item, est, vence_em):
+        est.vence_em = vence_em
+        heapq.heappush(self._heap, (vence_em, next(self._seq), item))
+
+    # ─── entrada ──────────────────────────────────────────────────────────
+    def adicionar(self, item, rec=None):
+        """Inclui o item (vence já); `rec` de resultados dá o chute inicial."""
+        with self._lock:
+            if item in self._itens:
+                return
+            est = self._itens[item] = _Estado()
+            if rec:
+                est.preco    = rec.get("avg_sell")
+                est.liquidez = rec.get("liquidity", 0)
+                est.score    = rec.get("score", 0.0)
+            self._recalcular(est)
+            self._marcar(item, est, 0.0)
+
+    def semear(self, linhas):
+        """
+        Volatilidade inicial a partir do histórico: `linhas` são (item, avg_sell)
+        em ordem de item e ts, como vêm de market_data.
+        """
+        anterior = {}
+        with self._lock:
+            for item, preco in linhas:
+                est = self._itens.get(item)
+                ant = anterior.get(item)
+                anterior[item] = preco
+                if est is None or not ant or preco is None:
+                    continue
+                est.vol = 0.7 * est.vol + 0.3 * abs(preco - ant) / ant
+            for item in anterior:
+                if item in self._itens:
+                    self._recalcular(self._itens[item])
+
+    def vencidos(self):
+        """
+        Tira da agenda os itens vencidos, mais atrasados primeiro, e já os
+        remarca para daqui a um intervalo. Item que ainda está na fila do
+        coletor não sai de novo, a não ser que a resposta não tenha vindo em
+        `perdido_apos` segundos (busca que falhou).
+        """
+        agora = self._relogio()
+        saida = []
+        with self._lock:
+            fator = self.fator()
+            while self._heap and self._heap[0][0] <= agora:
+                vence_em, _, item = heapq.heappop(self._heap)
+                est = self._itens[item]
+                if vence_em != est.vence_em:
+                    continue
+                self._marcar(item, est, agora + est.intervalo * fator)
+                if est.enviado_em is not None and agora - est.enviado_em < self.perdido_apos:
+                    continue
+                est.enviado_em = agora
+                saida.append((item, vence_em))
+        return saida
+
+    def observar(self, item, rec):
+        """Resultado de uma busca; `rec` None quer dizer livro sem mudança."""
+        agora = self._relogio()
+        with self._lock:
+            est = self._itens.get(item)
+            if est is None:
+                return
+            self.requisicoes += 1
+            est.ultima_busca = agora
+            est.enviado_em   = None
+            if rec is None:
+                est.vol *= 0.8
+            else:
+                self.com_mudanca += 1
+                est.ultima_mudanca = agora
+                preco = rec.get("avg_sell")
+                if est.preco and preco is not None:
+                    est.vol = 0.7 * est.vol + 0.3 * abs(preco - est.preco) / est.preco
+                est.preco    = preco
+                est.liquidez = rec.get("liquidity", 0)
+                est.score    = rec.get("score", 0.0)
+            self._recalcular(est)
+            self._marcar(item, est, agora + est.intervalo * self.fator())
+
+    # ─── medição ──────────────────────────────────────────────────────────
+    def estatisticas(self):
+        """
+        frescor_por_req: fração das requisições que trouxeram dado novo.
+        idade_media: segundos desde a última busca, na média dos itens já buscados.
+        """
+        agora = self._relogio()
+        with self._lock:
+            idades = [agora - e.ultima_busca for e in self._itens.values()
+                      if e.ultima_busca is not None]
+            fator = self.fator()
+            return {
+                "itens":           len(self._itens),
+                "requisicoes":     self.requisicoes,
+                "com_mudanca":     self.com_mudanca,
+                "frescor_por_req": self.com_mudanca / self.requisicoes if self.requisicoes else 0.0,
+                "idade_media":     sum(idades) / len(idades) if idades else 0.0,
+                "taxa_planejada":  self._soma / fator,
+                "fator":           fator,
+            }
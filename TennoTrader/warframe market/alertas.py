@@ -0,0 +1,371 @@
+# alertas.py
+#
+# Alertas avaliados a cada registro novo de calcular_dados, sem varrer
+# `resultados`. As regras usam as mesmas condições (campo, operador, valor)
+# das recomendações, e o campo pode ser derivado: "<campo>_var_<janela>" é a
+# variação em % do campo contra a sua média móvel exponencial na janela
+# (ex.: ("avg_sell_var_1h", "<=", -10) = caiu 10% contra a média de 1 h),
+# semeada com a média dessa janela no banco.
+#
+# Regras do usuário ficam em alertas.json, por exemplo:
+#   {"webhook": "http://127.0.0.1:9000/alertas",
+#    "regras": [
+#     {"nome": "arbitragem", "condicoes": [["spread", ">", 40], ["liquidity", ">=", 5]],
+#      "destinos": ["log", "desktop"], "intervalo": 900,
+#      "mensagem": "{item}: spread {spread:.0f}p, liquidez {liquidity}"},
+#     {"nome": "queda", "condicoes": [["avg_sell_var_1h", "<=", -15]],
+#      "itens": ["arcane_energize"], "destinos": ["ui", "webhook"]}]}
+# (uma lista pura também vale, sem webhook). Destinos: log, desktop, ui
+# (últimos alertas na janela e no servico.py) e webhook.
+#
+# Todas as regras viram arrays numpy (uma linha por condição, ordenadas por
+# regra): um registro é comparado com todas as condições de uma vez e
+# logical_and.reduceat dá o resultado de cada regra. Um alerta sai quando a
+# regra passa a valer para o item (borda de subida) e não saiu nos últimos
+# `intervalo` s; o envio aos destinos é feito numa thread própria.
+
+import json
+import math
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from recomendacoes import OPERADORES
+
+ALERTAS_FILE = "alertas.json"
+CAMPOS_BASE = ("avg_sell", "avg_buy", "median_sell", "median_buy",
+               "weighted_avg_sell", "weighted_avg_buy", "spread",
+               "demand", "supply", "liquidity", "score")
+UNIDADES = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_DERIVADO = re.compile(r"^(\w+?)_var_([1-9]\d*)([smhd])$")    # janela 0 dividiria por zero
+_OPS = list(OPERADORES)      # código da operação = posição aqui
+
+def campo_derivado(nome):
+    """(campo base, janela em s) de "<campo>_var_<n><unidade>", ou None."""
+    m = _DERIVADO.match(nome)
+    if not m or m.group(1) not in CAMPOS_BASE:
+        return None
+    return m.group(1), int(m.group(2)) * UNIDADES[m.group(3)]
+
+class RegraAlerta:
+    """
+    Uma regra: vale para o item quando todas as `condicoes` (campo,
+    operador, valor) são verdadeiras. `itens` restringe a alguns itens
+    (None = todos); `destinos` são nomes de destinos do MotorAlertas.
+    """
+
+    def __init__(self, nome, condicoes, itens=None, destinos=("log",),
+                 intervalo=900, mensagem=None):
+        self.nome      = nome
+        self.condicoes = [(c, op, float(v)) for c, op, v in condicoes]
+        self.itens     = None if itens is None else frozenset(itens)
+        self.destinos  = tuple(destinos)
+        self.intervalo = intervalo
+        self.mensagem  = mensagem or ("{item}: " + " e ".join(
+            f"{c} {op} {v:g}" for c, op, v in self.condicoes))
+        if not self.condicoes:
+            raise ValueError(f"regra {nome}: sem condições")
+        for campo, op, _ in self.condicoes:
+            if op not in OPERADORES:
+                raise ValueError(f"regra {nome}: operador desconhecido {op!r}")
+            if campo not in CAMPOS_BASE and campo_derivado(campo) is None:
+                raise ValueError(f"regra {nome}: campo desconhecido {campo!r}")
+
+    @classmethod
+    def de_dict(cls, d):
+        return cls(d["nome"], d["condicoes"], d.get("itens"), d.get("destinos", ("log",)),
+                   d.get("intervalo", 900), d.get("mensagem"))
+
+def carregar_alertas(path=ALERTAS_FILE):
+    """
+    (regras, url do webhook ou None) de `path`; arquivo ausente = nenhuma
+    regra. Uma regra inválida é ignorada sem levar as outras junto.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return [], None
+    except ValueError as e:
+        print(f"[Alertas] Ignorando {path}: {e}")
+        return [], None
+    if isinstance(dados, list):
+        dados = {"regras": dados}
+    if not isinstance(dados, dict) or not isinstance(dados.get("regras", []), list):
+        print(f"[Alertas] Ignorando {path}: esperava uma lista de regras")
+        return [], None
+    regras = []
+    for d in dados.get("regras", ()):
+        try:
+            regras.append(RegraAlerta.de_dict(d))
+        except ValueError as e:
+            print(f"[Alertas] Ignorando {e}")
+        except (KeyError, TypeError, AttributeError) as e:
+            print(f"[Alertas] Ignorando regra malformada em {path}: {e!r}")
+    return regras, dados.get("webhook")
+
+# ─── destinos ─────────────────────────────────────────────────────────────
+class DestinoLog:
+    """Escreve o alerta no console e, se `path`, numa linha JSON por alerta."""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def enviar(self, alerta):
+        print(f"[Alerta] {alerta['regra']}: {alerta['mensagem']}")
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+class DestinoDesktop:
+    """Notificação do sistema: plyer se instalado, senão notify-send/osascript; cai no log."""
+
+    def __init__(self):
+        try:
+            from plyer import notification
+            self._plyer = notification
+        except ImportError:
+            self._plyer = None
+
+    def enviar(self, alerta):
+        titulo, texto = f"TennoTrader — {alerta['regra']}", alerta["mensagem"]
+        if self._plyer is not None:
+            self._plyer.notify(title=titulo, message=texto, app_name="TennoTrader")
+        elif sys.platform.startswith("linux") and shutil.which("notify-send"):
+            subprocess.run(["notify-send", titulo, texto], check=False, timeout=5)
+        elif sys.platform == "darwin":
+            script = f"display notification {json.dumps(texto)} with title {json.dumps(titulo)}"
+            subprocess.run(["osascript", "-e", script], check=False, timeout=5)
+        else:
+            print(f"[Alerta] {titulo}: {texto}")
+
+class DestinoWebhook:
+    """POST do alerta em JSON para `url` (ex.: Discord/Slack via ponte); sem retries."""
+
+    def __init__(self, url, timeout=5):
+        self.url     = url
+        self.timeout = timeout
+
+    def enviar(self, alerta):
+        from urllib.request import Request, urlopen
+        corpo = json.dumps(alerta, ensure_ascii=False).encode("utf-8")
+        req = Request(self.url, corpo, {"Content-Type": "application/json"})
+        with urlopen(req, timeout=self.timeout):
+            pass
+
+class DestinoMemoria:
+    """Guarda os últimos `n` alertas (para a UI e o servico.py lerem)."""
+
+    def __init__(self, n=100):
+        self.recentes = deque(maxlen=n)
+
+    def enviar(self, alerta):
+        self.recentes.append(alerta)
+
+# ─── motor ────────────────────────────────────────────────────────────────
+class MotorAlertas:
+    """
+    Avalia as regras a cada registro (`avaliar`) e despacha os alertas.
+
+    Estado por item: um bool por regra (a regra valia no último registro),
+    uma média exponencial e um ts por campo derivado, e o horário do último
+    alerta só dos pares (regra, item) que já dispararam.
+    """
+
+    def __init__(self, regras=(), destinos=None, relogio=time.time):
+        self.destinos = {"log": DestinoLog()} if destinos is None else dict(destinos)
+        self.disparados = 0
+        self._relogio = relogio
+        self._lock    = threading.Lock()
+        self._fila    = queue.Queue()
+        self._thread  = None
+        self.definir_regras(regras)
+
+    # ─── regras ───────────────────────────────────────────────────────────
+    def definir_regras(self, regras):
+        """Troca o conjunto de regras (o estado de borda e as médias recomeçam)."""
+        regras = list(regras)
+        derivados = sorted({c for r in regras for c, _, _ in r.condicoes if c not in CAMPOS_BASE})
+        campos = list(CAMPOS_BASE) + derivados
+        pos = {c: i for i, c in enumerate(campos)}
+        conds = [(k, pos[c], _OPS.index(op), v)
+                 for k, r in enumerate(regras) for c, op, v in r.condicoes]
+        with self._lock:
+            self.regras   = regras
+            self._campos  = campos
+            self._pos     = pos
+            self._derivados = [campo_derivado(c) for c in derivados]
+            self._base_der  = np.array([CAMPOS_BASE.index(b) for b, _ in self._derivados], dtype=np.int64)
+            self._tau       = np.array([j for _, j in self._derivados], dtype=float)
+            # condições ordenadas por regra: cada regra é um trecho contíguo
+            arr = np.array(conds, dtype=float).reshape(-1, 4)
+            self._ini_regra = np.searchsorted(arr[:, 0], np.arange(len(regras))) if len(regras) else np.zeros(0, int)
+            self._c_campo = arr[:, 1].astype(np.int64)
+            self._c_lim   = arr[:, 3]
+            self._c_ops   = [(np.flatnonzero(arr[:, 2] == k), OPERADORES[op])
+                             for k, op in enumerate(_OPS) if (arr[:, 2] == k).any()]
+            # regras restritas a itens: máscara base (todas as globais) + índices por item
+            self._globais = np.array([r.itens is None for r in regras], dtype=bool)
+            self._por_item = {}
+            for k, r in enumerate(regras):
+                for item in r.itens or ():
+                    self._por_item.setdefault(item, []).append(k)
+            self._ativas  = {}    # item -> bool[n_regras]
+            self._medias  = {}    # item -> (médias[n_derivados], ts[n_derivados])
+            self._ultimo  = {}    # (k, item) -> ts do último alerta
+
+    def semear(self, conn):
+        """Começa as médias dos campos derivados com a média da janela em market_series."""
+        agora = int(self._relogio())
+        with self._lock:
+            lista = self._derivados
+        for d, (base, janela) in enumerate(lista):
+            linhas = conn.execute(f"""
+                SELECT i.url_name, AVG(s.{base}), MAX(s.ts)
+                FROM market_series s JOIN items i ON i.id = s.item_id
+                WHERE s.ts >= ? GROUP BY s.item_id
+            """, (agora - janela,)).fetchall()
+            with self._lock:
+                if self._derivados is not lista:     # regras trocadas no meio
+                    return 0
+                for item, media, ts in linhas:
+                    medias, tss = self._estado_medias(item)
+                    medias[d], tss[d] = media, ts
+        return len(lista)
+
+    def _estado_medias(self, item):
+        est = self._medias.get(item)
+        if est is None:
+            n = len(self._derivados)
+            est = self._medias[item] = (np.full(n, np.nan), np.full(n, np.nan))
+        return est
+
+    # ─── avaliação ────────────────────────────────────────────────────────
+    def _vetor(self, rec, ts):
+        x = np.empty(len(self._campos))
+        x[:len(CAMPOS_BASE)] = [rec[c] for c in CAMPOS_BASE]
+        if self._derivados:
+            medias, tss = self._estado_medias(rec["item"])
+            valores = x[self._base_der]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x[len(CAMPOS_BASE):] = (valores / medias - 1) * 100
+            # média exponencial no tempo: peso do valor novo = 1 - e^(-dt/janela)
+            alfa = -np.expm1(-np.maximum(ts - tss, 0) / self._tau)
+            medias[:] = np.where(np.isnan(medias), valores, medias + alfa * (valores - medias))
+            tss[:] = ts
+        return x
+
+    def _valem(self, x):
+        v = x[self._c_campo]
+        ok = np.empty(len(v), dtype=bool)
+        for idx, op in self._c_ops:
+            ok[idx] = op(v[idx], self._c_lim[idx])     # NaN (sem média ainda) dá False
+        return np.logical_and.reduceat(ok, self._ini_regra)
+
+    def avaliar(self, rec, ts=None):
+        """Avalia um registro (dict de calcular_dados); devolve os alertas disparados."""
+        ts = self._relogio() if ts is None else ts
+        item = rec["item"]
+        with self._lock:
+            if not self.regras:
+                return []
+            x = self._vetor(rec, ts)
+            valem = self._valem(x)
+            extras = self._por_item.get(item)
+            if extras is None:
+                valem &= self._globais
+            else:
+                aplica = self._globais.copy()
+                aplica[extras] = True
+                valem &= aplica
+            ativas = self._ativas.get(item)
+            if ativas is None:
+                ativas = self._ativas[item] = np.zeros(len(self.regras), dtype=bool)
+            subiram = np.flatnonzero(valem & ~ativas)
+            ativas[:] = valem
+            alertas, valores = [], None
+            for k in subiram.tolist():
+                regra = self.regras[k]
+                ultimo = self._ultimo.get((k, item))
+                if ultimo is not None and ts - ultimo < regra.intervalo:
+                    continue
+                self._ultimo[(k, item)] = ts
+                if valores is None:
+                    valores = self._valores(rec, x)
+                alertas.append(self._alerta(regra, item, ts, valores))
+            self.disparados += len(alertas)
+        if alertas and self._thread is not None:
+            self._fila.put(alertas)
+        return alertas
+
+    def avaliar_varios(self, recs, ts=None):
+        alertas = []
+        for rec in recs:
+            alertas.extend(self.avaliar(rec, ts))
+        return alertas
+
+    def _valores(self, rec, x):
+        # campos do registro + derivados; um dict só para todos os alertas do registro
+        valores = {c: rec[c] for c in CAMPOS_BASE}
+        for c, v in zip(self._campos[len(CAMPOS_BASE):], x[len(CAMPOS_BASE):].tolist()):
+            valores[c] = None if math.isnan(v) else round(v, 2)
+        return valores
+
+    def _alerta(self, regra, item, ts, valores):
+        try:
+            mensagem = regra.mensagem.format(item=item, **valores)
+        except (KeyError, ValueError, TypeError):
+            mensagem = f"{item}: {regra.nome}"
+        return {"regra": regra.nome, "item": item, "ts": ts,
+                "mensagem": mensagem, "destinos": regra.destinos, "valores": valores}
+
+    # ─── envio ────────────────────────────────────────────────────────────
+    def iniciar(self):
+        """Sobe a thread que entrega os alertas aos destinos."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._despachar, daemon=True, name="alertas")
+            self._thread.start()
+        return self
+
+    def _despachar(self):
+        import telemetria
+        while True:
+            alertas = self._fila.get()
+            if alertas is None:
+                return
+            for alerta in alertas:
+                for nome in alerta["destinos"]:
+                    destino = self.destinos.get(nome)
+                    if destino is None:
+                        continue
+                    try:
+                        destino.enviar(alerta)
+                        telemetria.contar("alertas", destino=nome)
+                    except Exception as e:
+                        telemetria.erro(f"alerta_{nome}", e)
+
+    def recentes(self):
+        """Últimos alertas do destino "ui" (mais novo por último)."""
+        destino = self.destinos.get("ui")
+        return list(destino.recentes) if isinstance(destino, DestinoMemoria) else []
+
+    def fechar(self, timeout=5):
+        if self._thread is not None:
+            self._fila.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+def criar_motor(path=ALERTAS_FILE):
+    """MotorAlertas com as regras de `path` e os destinos padrão, já despachando."""
+    regras, webhook = carregar_alertas(path)
+    destinos = {"log": DestinoLog(), "desktop": DestinoDesktop(), "ui": DestinoMemoria()}
+    if webhook:
+        destinos["webhook"] = DestinoWebhook(webhook)
+    return MotorAlertas(regras, destinos).iniciar()
@@ -2,6 +2,8 @@
 
 import statistics
 
+import numpy as np
+
 def remover_outliers(valores, limite=1.5):
     # só tenta se tiver dados suficientes
     if len(valores) < 4:
@@ -67,3 +69,130 @@ def calcular_metricas(sells, buys):
         "liquidity": liquidity,
         "score":     round(score, 2)
     }
+
+# ─── LOTE (NumPy) ─────────────────────────────────────────────────────────────
+# Mesmas contas de calcular_metricas, mas para muitos livros de uma vez a partir
+# de colunas: cada lado é (precos, volumes, offsets), com as ordens do livro k
+# em precos[offsets[k]:offsets[k+1]]. As operações seguem a mesma ordem das
+# versões em Python puro (quantis 'exclusive', somas da esquerda para a
+# direita via bincount), então os resultados batem bit a bit para preços
+# inteiros, que é o que a API devolve.
+
+def montar_lote(livros):
+    """Converte [(sells, buys), ...] nas colunas (venda, compra) do lote."""
+    lados = ([], [], [0]), ([], [], [0])
+    for livro in livros:
+        for (precos, volumes, offsets), ordens in zip(lados, livro):
+            for o in ordens:
+                precos.append(o["platinum"])
+                volumes.append(o.get("volume", 1))
+            offsets.append(len(precos))
+    return tuple(
+        (np.asarray(p, dtype=float), np.asarray(v, dtype=float),
+         np.asarray(o, dtype=np.int64))
+        for p, v, o in lados
+    )
+
+_BITS_PRECO = 31
+
+def _ordenar_por_livro(precos, seg):
+    """Preços ordenados dentro de cada livro, livros na ordem original."""
+    if (precos.min() >= 0 and precos.max() < 2**_BITS_PRECO
+            and np.array_equal(precos, np.floor(precos))):
+        # preço inteiro (caso normal): uma única ordenação de chave livro|preço
+        chave = (seg.astype(np.int64) << _BITS_PRECO) | precos.astype(np.int64)
+        chave.sort()
+        return (chave & (2**_BITS_PRECO - 1)).astype(float)
+    ordem = np.argsort(precos, kind="stable")
+    ordem = ordem[np.argsort(seg[ordem], kind="stable")]
+    return precos[ordem]
+
+def _metricas_lado(precos, volumes, offsets, limite=1.5):
+    n     = len(offsets) - 1
+    conts = np.diff(offsets)
+    if not len(precos):
+        zeros = np.zeros(n)
+        return zeros, zeros, zeros, conts
+    seg = np.repeat(np.arange(n), conts)
+    ult = len(precos) - 1
+    ordenado = _ordenar_por_livro(precos, seg)
+
+    # média ponderada: como no original, valores ordenados × volumes na ordem da API
+    peso_total = np.bincount(seg, weights=volumes, minlength=n)
+    soma_pond  = np.bincount(seg, weights=ordenado * volumes, minlength=n)
+    ponderada  = np.divide(soma_pond, peso_total,
+                           out=np.zeros(n), where=peso_total != 0)
+
+    # quantis 'exclusive' (n=4) do statistics; só valem onde há >= 4 valores
+    m, ini = conts + 1, offsets[:-1]
+    def quartil(i):
+        j = np.clip(i * m // 4, 1, np.maximum(conts - 1, 1))
+        delta = i * m - j * 4
+        a = ordenado[np.clip(ini + j - 1, 0, ult)]
+        b = ordenado[np.clip(ini + j,     0, ult)]
+        return (a * (4 - delta) + b * delta) / 4
+    q1, q3  = quartil(1), quartil(3)
+    iqr     = q3 - q1
+    com_iqr = conts >= 4
+    lower = np.where(com_iqr, q1 - limite * iqr, -np.inf)
+    upper = np.where(com_iqr, q3 + limite * iqr,  np.inf)
+    manter = (lower[seg] <= ordenado) & (ordenado <= upper[seg])
+
+    filtrado = ordenado[manter]
+    seg_f    = seg[manter]
+    conts_f  = np.bincount(seg_f, minlength=n)
+    somas_f  = np.bincount(seg_f, weights=filtrado, minlength=n)
+    media    = np.divide(somas_f, conts_f, out=np.zeros(n), where=conts_f != 0)
+
+    # mediana do que sobrou (continua ordenado dentro de cada livro)
+    if not len(filtrado):
+        return media, np.zeros(n), ponderada, conts
+    ult_f = len(filtrado) - 1
+    meio  = np.cumsum(conts_f) - conts_f + conts_f // 2
+    alto  = filtrado[np.clip(meio,     0, ult_f)]
+    baixo = filtrado[np.clip(meio - 1, 0, ult_f)]
+    mediana_ = np.where(conts_f % 2 == 1, alto, (baixo + alto) / 2)
+    mediana_ = np.where(conts_f == 0, 0.0, mediana_)
+
+    return media, mediana_, ponderada, conts
+
+def metricas_colunares(venda, compra):
+    """
+    Métricas de todos os livros como arrays NumPy (sem arredondar).
+    `venda` e `compra` são tuplas (precos, volumes, offsets) de montar_lote.
+    """
+    avg_sell, median_sell, w_sell, supply = _metricas_lado(*venda)
+    avg_buy,  median_buy,  w_buy,  demand = _metricas_lado(*compra)
+    spread    = w_sell - w_buy
+    liquidity = np.minimum(demand, supply)
+    score     = (liquidity * 3 + (demand - supply)) + (10 - spread)
+    return {
+        "avg_sell": avg_sell, "avg_buy": avg_buy,
+        "median_sell": median_sell, "median_buy": median_buy,
+        "weighted_avg_sell": w_sell, "weighted_avg_buy": w_buy,
+        "spread": spread,
+        "demand": demand, "supply": supply, "liquidity": liquidity,
+        "score": score
+    }
+
+def calcular_metricas_lote(livros):
+    """Versão em lote de calcular_metricas: [(sells, buys), ...] → [dict, ...]."""
+    cols = metricas_colunares(*montar_lote(livros))
+    # round() do Python (e não np.round) para arredondar igual ao original
+    py = {k: v.tolist() for k, v in cols.items()}
+    return [
+        {
+            "avg_sell": round(py["avg_sell"][k], 1),
+            "avg_buy":  round(py["avg_buy"][k],  1),
+            "median_sell": round(py["median_sell"][k], 1),
+            "median_buy":  round(py["median_buy"][k],  1),
+            "weighted_avg_sell": round(py["weighted_avg_sell"][k], 1),
+            "weighted_avg_buy":  round(py["weighted_avg_buy"][k],  1),
+            "spread": round(py["spread"][k], 1),
+            "demand":    py["demand"][k],
+            "supply":    py["supply"][k],
+            "liquidity": py["liquidity"][k],
+            "score":     round(py["score"][k], 2)
+        }
+        for k in range(len(py["spread"]))
+    ]
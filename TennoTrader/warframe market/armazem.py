@@ -0,0 +1,119 @@
+# armazem.py
+
+import threading
+from collections import OrderedDict
+
+CAMPOS = (
+    "item", "avg_sell", "avg_buy",
+    "median_sell", "median_buy",
+    "weighted_avg_sell", "weighted_avg_buy",
+    "spread", "demand", "supply", "liquidity", "score"
+)
+
+class Registro:
+    """
+    Resultado de um item, imutável depois de publicado no armazém.
+
+    Usa __slots__ em vez de dict (bem menos memória por item) mas aceita
+    r["campo"], r.get(...) e {**r}, então quem lia os dicts de
+    calcular_dados continua funcionando.
+    """
+
+    __slots__ = CAMPOS + ("versao",)
+
+    def __init__(self, dados, versao=0):
+        for c in CAMPOS:
+            object.__setattr__(self, c, dados[c])
+        object.__setattr__(self, "versao", versao)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Registro é imutável")
+
+    def __getitem__(self, chave):
+        try:
+            return getattr(self, chave)
+        except AttributeError:
+            raise KeyError(chave) from None
+
+    def get(self, chave, padrao=None):
+        return getattr(self, chave, padrao)
+
+    def __contains__(self, chave):
+        return chave in CAMPOS
+
+    def keys(self):
+        return CAMPOS
+
+    def as_dict(self):
+        return {c: getattr(self, c) for c in CAMPOS}
+
+    def __repr__(self):
+        return f"Registro(v{self.versao}, {self.as_dict()!r})"
+
+class ArmazemResultados:
+    """
+    Substitui o dict `resultados` compartilhado entre threads.
+
+    Toda escrita passa pelo lock e ganha um número de versão global; a
+    ordem de atualização fica num OrderedDict, então `mudancas_desde(v)`
+    custa O(mudanças) e não O(itens). Leitores recebem Registros
+    imutáveis, que podem ser guardados sem cópia.
+    """
+
+    def __init__(self):
+        self.versao = 0
+        self._lock  = threading.Lock()
+        self._mudou = threading.Condition(self._lock)
+        self._dados = {}              # item -> Registro
+        self._ordem = OrderedDict()   # item -> versao, da mais antiga à mais nova
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, item):
+        return item in self._dados
+
+    def get(self, item, padrao=None):
+        return self._dados.get(item, padrao)
+
+    def atualizar(self, rec):
+        return self.atualizar_varios((rec,))[0]
+
+    def atualizar_varios(self, recs):
+        novos = []
+        with self._lock:
+            for rec in recs:
+                self.versao += 1
+                r = Registro(rec, self.versao)
+                self._dados[r.item] = r
+                self._ordem[r.item] = r.versao
+                self._ordem.move_to_end(r.item)
+                novos.append(r)
+            self._mudou.notify_all()
+        return novos
+
+    def valores(self):
+        with self._lock:
+            return list(self._dados.values())
+
+    def snapshot(self):
+        """(versão, {item: Registro}) consistentes entre si."""
+        with self._lock:
+            return self.versao, dict(self._dados)
+
+    def esperar(self, versao, timeout=None):
+        """Bloqueia até existir versão > `versao` (ou até o timeout); devolve a versão atual."""
+        with self._mudou:
+            self._mudou.wait_for(lambda: self.versao > versao, timeout)
+            return self.versao
+
+    def mudancas_desde(self, versao):
+        """(versão atual, [Registros com versão > `versao`]) do mais antigo ao mais novo."""
+        with self._lock:
+            saida = []
+            for item, v in reversed(self._ordem.items()):
+                if v <= versao:
+                    break
+                saida.append(self._dados[item])
+            saida.reverse()
+            return self.versao, saida
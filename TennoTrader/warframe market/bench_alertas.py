@@ -0,0 +1,118 @@
+# bench_alertas.py
+#
+# Vazão do MotorAlertas (todas as condições num passo numpy) contra a
+# avaliação regra a regra em Python, com N regras sintéticas (algumas com
+# campos derivados e algumas restritas a itens) sobre registros de 3000
+# itens, e confere que os dois disparam os mesmos alertas. Os limites das
+# condições ficam nas caudas (3% dos registros), como um alerta de verdade.
+#   python bench_alertas.py [regras1 regras2 ...]
+
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+from alertas import CAMPOS_BASE, MotorAlertas, RegraAlerta, campo_derivado
+from recomendacoes import OPERADORES
+
+N_ITENS     = 3000
+N_REGISTROS = 30_000
+
+def gerar_regras(n, itens, recs, seed=42):
+    rnd = random.Random(seed)
+    campos = ("spread", "liquidity", "demand", "supply", "score", "avg_sell")
+    caudas = {c: np.percentile([r[c] for r, _ in recs], [1, 3, 97, 99]) for c in campos}
+    regras = []
+    for k in range(n):
+        condicoes = []
+        for _ in range(rnd.randint(1, 3)):
+            if rnd.random() < 0.2:
+                condicoes.append((f"avg_sell_var_{rnd.choice(('15m', '1h', '6h'))}",
+                                  *rnd.choice((("<=", -25), ("<=", -15), (">=", 15), (">=", 25)))))
+            else:
+                campo = rnd.choice(campos)
+                baixo1, baixo3, alto97, alto99 = caudas[campo].tolist()
+                condicoes.append((campo, *rnd.choice(((">", alto97), (">=", alto99),
+                                                      ("<", baixo3), ("<=", baixo1)))))
+        restrita = rnd.sample(itens, 5) if rnd.random() < 0.3 else None
+        regras.append(RegraAlerta(f"regra_{k}", condicoes, restrita, intervalo=600))
+    return regras
+
+def gerar_registros(itens, n, seed=42):
+    rnd = random.Random(seed)
+    base = {i: rnd.uniform(5, 300) for i in itens}
+    recs = []
+    for k in range(n):
+        item = rnd.choice(itens)
+        base[item] *= math.exp(rnd.gauss(0, 0.08))
+        p = base[item]
+        recs.append(({
+            "item": item, "avg_sell": p, "avg_buy": p * 0.7, "median_sell": p, "median_buy": p * 0.7,
+            "weighted_avg_sell": p, "weighted_avg_buy": p * 0.7, "spread": p * rnd.uniform(0, 0.5),
+            "demand": rnd.randint(0, 30), "supply": rnd.randint(0, 60),
+            "liquidity": rnd.randint(0, 30), "score": rnd.uniform(-5, 40),
+        }, k * 2.0))   # um registro a cada 2 s
+    return recs
+
+class Ingenuo:
+    """A mesma semântica do MotorAlertas, regra a regra e item a item."""
+
+    def __init__(self, regras):
+        self.regras = regras
+        self.medias = {}   # (item, campo derivado) -> (média, ts)
+        self.ativas = set()
+        self.ultimo = {}
+
+    def avaliar(self, rec, ts):
+        item, valores = rec["item"], dict(rec)
+        for regra in self.regras:
+            for c, _, _ in regra.condicoes:
+                if c not in valores:
+                    base, janela = campo_derivado(c)
+                    media, t = self.medias.get((item, c), (math.nan, ts))
+                    valores[c] = (rec[base] / media - 1) * 100
+                    alfa = -math.expm1(-max(ts - t, 0) / janela)
+                    self.medias[(item, c)] = (rec[base] if math.isnan(media)
+                                              else media + alfa * (rec[base] - media), ts)
+        disparos = []
+        for k, regra in enumerate(self.regras):
+            vale = ((regra.itens is None or item in regra.itens) and
+                    all(OPERADORES[op](valores[c], v) for c, op, v in regra.condicoes))
+            if not vale:
+                self.ativas.discard((k, item))
+            elif (k, item) not in self.ativas:
+                self.ativas.add((k, item))
+                u = self.ultimo.get((k, item))
+                if u is None or ts - u >= regra.intervalo:
+                    self.ultimo[(k, item)] = ts
+                    disparos.append((regra.nome, item, ts))
+        return disparos
+
+def cronometrar(avaliar, recs):
+    disparos = []
+    t0 = time.perf_counter()
+    for rec, ts in recs:
+        disparos.extend(avaliar(rec, ts))
+    return disparos, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 5000]
+    itens = [f"item_{i}" for i in range(N_ITENS)]
+    recs = gerar_registros(itens, N_REGISTROS)
+    assert set(CAMPOS_BASE) <= set(recs[0][0])
+    print(f"{'regras':>7} | {'ingênuo reg/s':>13} | {'numpy reg/s':>11} | {'alertas':>8} | {'ganho':>6}")
+    for n in tamanhos:
+        regras = gerar_regras(n, itens, recs)
+        motor = MotorAlertas(regras, destinos={})     # sem thread de envio: só a avaliação
+        rapido, t_rapido = cronometrar(
+            lambda rec, ts: [(a["regra"], a["item"], a["ts"]) for a in motor.avaliar(rec, ts)], recs)
+        # o ingênuo fica lento com muitas regras: mede numa fração e extrapola
+        parte = recs[:max(1000, N_REGISTROS * 100 // n)] if n > 100 else recs
+        lento, t_lento = cronometrar(Ingenuo(regras).avaliar, parte)
+        assert sorted(lento) == sorted(a for a in rapido if a[2] <= parte[-1][1]), \
+            "MotorAlertas e avaliação regra a regra discordam"
+        v_lento, v_rapido = len(parte) / t_lento, len(recs) / t_rapido
+        print(f"{n:>7} | {v_lento:>13,.0f} | {v_rapido:>11,.0f} | {len(rapido):>8} "
+              f"| {v_rapido / v_lento:>5.1f}x")
@@ -0,0 +1,105 @@
+# bench_cache.py
+#
+# Compara o cache.json antigo (reescrito inteiro no fechamento, lido inteiro
+# na abertura) com o CacheIncremental: carga na abertura, salvamento
+# completo e custo para tornar durável um lote de atualizações. No fim
+# simula um crash no meio de uma escrita e confere que a abertura se recupera.
+#   python bench_cache.py [n1 n2 ...]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from cache_local import CacheIncremental, REGISTRO
+
+def gerar_recs(n, seed=42):
+    rnd = random.Random(seed)
+    recs = []
+    for i in range(n):
+        venda = round(rnd.uniform(5, 300), 1)
+        compra = round(venda * rnd.uniform(0.5, 0.9), 1)
+        recs.append({
+            "item": f"item_{i}_{rnd.randint(0, 10**6)}",
+            "avg_sell": venda, "avg_buy": compra,
+            "median_sell": venda, "median_buy": compra,
+            "weighted_avg_sell": venda, "weighted_avg_buy": compra,
+            "spread": round(venda - compra, 1),
+            "demand": rnd.randint(0, 40), "supply": rnd.randint(0, 40),
+            "liquidity": rnd.randint(0, 40), "score": round(rnd.uniform(-20, 40), 2),
+            "pred_sell": venda,
+        })
+    return recs
+
+def cronometrar(f, *args, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        r = f(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return r, melhor
+
+def json_salvar(path, recs):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recs, f)
+
+def json_carregar(path):
+    with open(path, encoding="utf-8") as f:
+        return {d["item"]: d for d in json.load(f)}
+
+def bin_salvar(pasta, recs):
+    cache = CacheIncremental(pasta)
+    cache.gravar_varios(recs)
+    cache.descarregar()
+    cache.compactar()
+    cache.fechar()
+
+def bin_carregar(pasta):
+    cache = CacheIncremental(pasta)
+    dados = cache.carregar()
+    cache.fechar()
+    return dados
+
+if __name__ == "__main__":
+    tamanhos = [int(a) for a in sys.argv[1:]] or [3_000, 30_000]
+    print(f"{'itens':>7} | {'formato':<8} | {'abrir':>9} | {'salvar tudo':>11} "
+          f"| {'lote 10 upd.':>12} | {'tamanho':>9}")
+    for n in tamanhos:
+        recs = gerar_recs(n)
+        lote = recs[:10]
+        with tempfile.TemporaryDirectory() as pasta:
+            arq_json = os.path.join(pasta, "cache.json")
+            pasta_bin = os.path.join(pasta, "cache")
+
+            _, t_sj = cronometrar(json_salvar, arq_json, recs)
+            dados_j, t_cj = cronometrar(json_carregar, arq_json)
+            # no JSON, tornar 10 atualizações duráveis é reescrever tudo
+            _, t_lj = cronometrar(json_salvar, arq_json, recs)
+
+            _, t_sb = cronometrar(bin_salvar, pasta_bin, recs, repeticoes=1)
+            dados_b, t_cb = cronometrar(bin_carregar, pasta_bin)
+            cache = CacheIncremental(pasta_bin)
+
+            def lote_bin():
+                cache.gravar_varios(lote)
+                cache.descarregar()
+            _, t_lb = cronometrar(lote_bin)
+            cache.fechar()
+
+            assert dados_j.keys() == dados_b.keys()
+            for k, d in dados_j.items():
+                assert all(d[c] == dados_b[k][c] for c in d), k
+
+            tam_j = os.path.getsize(arq_json)
+            tam_b = sum(os.path.getsize(os.path.join(pasta_bin, a)) for a in os.listdir(pasta_bin))
+            print(f"{n:>7} | {'json':<8} | {t_cj*1000:>6.1f} ms | {t_sj*1000:>8.1f} ms "
+                  f"| {t_lj*1000:>9.1f} ms | {tam_j/1024:>6.0f} KB")
+            print(f"{n:>7} | {'binário':<8} | {t_cb*1000:>6.1f} ms | {t_sb*1000:>8.1f} ms "
+                  f"| {t_lb*1000:>9.2f} ms | {tam_b/1024:>6.0f} KB")
+
+            # crash no meio de um registro: a abertura corta o pedaço e segue
+            with open(os.path.join(pasta_bin, "registros.bin"), "ab") as f:
+                f.write(REGISTRO.pack(0, 0, *[0.0] * 7, 0, 0, 0, 0.0, 0.0)[:50])
+            assert bin_carregar(pasta_bin).keys() == dados_j.keys()
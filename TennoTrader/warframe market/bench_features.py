@@ -0,0 +1,126 @@
+# bench_features.py
+#
+# Compara o cálculo de features antigo do etl_and_train.py (lê tudo num
+# DataFrame e usa groupby + transform com lambda) com atualizar_features
+# (streaming em blocos), em tempo e pico de memória, numa base sintética.
+# Também mede a atualização incremental depois de 1% de linhas novas.
+#   python bench_features.py [linhas] [itens]
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from database import init_db
+from features import atualizar_features
+
+def gerar_base(path, linhas, itens, ts0, seed=42):
+    rnd = random.Random(seed)
+    conn = init_db(path)
+    por_item = linhas // itens
+    with conn:
+        conn.executemany("INSERT INTO items(id, url_name) VALUES (?, ?)",
+                         ((i, f"item_{i}") for i in range(itens)))
+        for i in range(itens):
+            preco = rnd.uniform(5, 300)
+            serie = []
+            for k in range(por_item):
+                preco = max(1.0, preco * (1 + rnd.gauss(0, 0.03)))
+                serie.append((i, ts0 + k * 60, preco, preco * 0.8, 10.0, 5, 5, 10, 3.0))
+            conn.executemany("""
+                INSERT INTO market_series(item_id, ts, avg_sell, avg_buy, spread,
+                                          demand, supply, liquidity, score)
+                VALUES (?,?,?,?,?,?,?,?,?)
+            """, serie)
+    conn.close()
+    return por_item * itens
+
+def features_pandas(path):
+    # o mesmo que o etl_and_train.py fazia antes de features.py
+    with sqlite3.connect(path) as conn:
+        df = pd.read_sql("SELECT * FROM market_data", conn)
+    df = df.sort_values(["item", "ts"])
+    df["pct_sell"] = (
+        df.groupby("item")["avg_sell"].pct_change()
+          .replace([np.inf, -np.inf], np.nan).fillna(0)
+    )
+    df["vol_3"] = (
+        df.groupby("item")["pct_sell"]
+          .transform(lambda s: s.rolling(3, min_periods=1).std()).fillna(0)
+    )
+    df["ma_sell_3"] = (
+        df.groupby("item")["avg_sell"]
+          .transform(lambda s: s.rolling(3, min_periods=1).mean()).fillna(0)
+    )
+    return len(df)
+
+def medir(f, *args, de_novo=None):
+    # tempo e memória em rodadas separadas: o tracemalloc atrasa bastante
+    t0 = time.perf_counter()
+    r = f(*args)
+    dt = time.perf_counter() - t0
+    if de_novo:
+        de_novo()
+    tracemalloc.start()
+    f(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return r, dt, pico / 2**20
+
+def desfazer_features(path, desde=None):
+    # volta a base ao estado anterior a atualizar_features
+    conn = sqlite3.connect(path)
+    with conn:
+        if desde is None:
+            conn.execute("DELETE FROM features")
+            conn.execute("DELETE FROM features_estado")
+            conn.execute("DELETE FROM marcas")
+        else:
+            estado, marca = desde
+            conn.execute("DELETE FROM features_estado")
+            conn.executemany("INSERT INTO features_estado VALUES (?,?,?,?,?,?,?)", estado)
+            conn.execute("UPDATE marcas SET ts = ? WHERE nome = 'features'", (marca,))
+    conn.close()
+
+def estado_features(path):
+    conn = sqlite3.connect(path)
+    estado = conn.execute("SELECT * FROM features_estado").fetchall()
+    marca = conn.execute("SELECT ts FROM marcas WHERE nome = 'features'").fetchone()[0]
+    conn.close()
+    return estado, marca
+
+if __name__ == "__main__":
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    itens  = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    ts0    = int(time.time()) - 365 * 86400
+    with tempfile.TemporaryDirectory() as pasta:
+        path = os.path.join(pasta, "bench.db")
+        total = gerar_base(path, linhas, itens, ts0)
+        print(f"{total} linhas, {itens} itens")
+        print(f"{'método':<22} | {'linhas':>9} | {'tempo':>8} | {'pico':>9}")
+
+        n, dt, pico = medir(features_pandas, path)
+        print(f"{'pandas groupby/lambda':<22} | {n:>9} | {dt:>7.2f}s | {pico:>7.1f}MB")
+        n, dt, pico = medir(atualizar_features, path,
+                            de_novo=lambda: desfazer_features(path))
+        print(f"{'streaming (inicial)':<22} | {n:>9} | {dt:>7.2f}s | {pico:>7.1f}MB")
+
+        # 1% de linhas novas, no fim da série de cada item
+        conn = sqlite3.connect(path)
+        ts_fim = conn.execute("SELECT MAX(ts) FROM market_series").fetchone()[0]
+        with conn:
+            conn.executemany(
+                "INSERT INTO market_series(item_id, ts, avg_sell) VALUES (?,?,?)",
+                ((i % itens, ts_fim + 60 * (1 + i // itens), 100.0 + i % 7)
+                 for i in range(total // 100)))
+        conn.close()
+        antes = estado_features(path)
+        n, dt, pico = medir(atualizar_features, path,
+                            de_novo=lambda: desfazer_features(path, antes))
+        print(f"{'streaming (+1%)':<22} | {n:>9} | {dt:>7.2f}s | {pico:>7.1f}MB")
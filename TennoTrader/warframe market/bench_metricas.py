@@ -0,0 +1,47 @@
+# bench_metricas.py
+#
+# Compara calcular_metricas (um livro por vez) com calcular_metricas_lote
+# em 1k, 10k e 100k livros sintéticos e confere que os resultados batem.
+#   python bench_metricas.py [n1 n2 ...]
+
+import random
+import sys
+import time
+
+from analise_dados import calcular_metricas, calcular_metricas_lote, \
+    metricas_colunares, montar_lote
+
+def gerar_livros(n, seed=42):
+    rnd = random.Random(seed)
+    livros = []
+    for _ in range(n):
+        base = rnd.randint(5, 300)
+        sells = [{"platinum": max(1, int(rnd.gauss(base, base * 0.3)))}
+                 for _ in range(rnd.randint(0, 40))]
+        buys  = [{"platinum": max(1, int(rnd.gauss(base * 0.7, base * 0.2)))}
+                 for _ in range(rnd.randint(0, 25))]
+        # alguns pedidos com volume e outliers para exercitar o IQR
+        for o in rnd.sample(sells, min(3, len(sells))):
+            o["volume"] = rnd.randint(1, 5)
+        if sells and rnd.random() < 0.3:
+            sells.append({"platinum": base * 20})
+        livros.append((sells, buys))
+    return livros
+
+def cronometrar(f, *args):
+    t0 = time.perf_counter()
+    r = f(*args)
+    return r, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    tamanhos = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    print(f"{'livros':>8} | {'por item':>10} | {'lote':>10} | {'colunar':>10} | {'ganho':>6}")
+    for n in tamanhos:
+        livros = gerar_livros(n)
+        ref, t_item = cronometrar(lambda: [calcular_metricas(s, b) for s, b in livros])
+        lote, t_lote = cronometrar(calcular_metricas_lote, livros)
+        colunas = montar_lote(livros)
+        _, t_col = cronometrar(metricas_colunares, *colunas)
+        assert lote == ref, "resultado do lote difere do calcular_metricas"
+        print(f"{n:>8} | {t_item:>9.3f}s | {t_lote:>9.3f}s | {t_col:>9.3f}s "
+              f"| {t_item / t_col:>5.0f}x")
@@ -0,0 +1,80 @@
+# bench_pontuacao.py
+#
+# Mede a repontuação do histórico com fórmulas do usuário: avaliação das
+# fórmulas compiladas em colunas numpy contra pontuar() registro a registro,
+# o atualizar_pontuacoes completo (ler market_series, avaliar e gravar em
+# `pontuacoes`), a rodada incremental depois de um dia novo e a troca de uma
+# expressão. Usa uma base sintética de `itens` x `dias` a cada 5 min.
+#   python bench_pontuacao.py [itens] [dias]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench_rollups import popular
+from database import INSERT_SERIES_SQL, METRICAS
+from pontuacao import Formula, atualizar_pontuacoes, pontuar
+
+FORMULAS = {
+    "score":  "liquidity * 3 + (demand - supply) + (10 - spread)",
+    "margem": "(avg_sell - avg_buy) / max(avg_buy, 1) * 100",
+    "giro":   "where(liquidity >= 5, log1p(demand) * spread, 0)",
+}
+
+def compilar(formulas):
+    return {nome: Formula(nome, expr) for nome, expr in formulas.items()}
+
+def cronometrar(f, *args):
+    t0 = time.perf_counter()
+    r = f(*args)
+    return r, time.perf_counter() - t0
+
+def avaliacao(conn, formulas, n=200_000):
+    linhas = conn.execute(f"SELECT {', '.join(METRICAS)} FROM market_series LIMIT ?",
+                          (n,)).fetchall()
+    recs = [dict(zip(METRICAS, l)) for l in linhas]
+    dados = np.array(linhas, dtype=float)
+    colunas = {c: dados[:, k] for k, c in enumerate(METRICAS)}
+    lento, t_lento = cronometrar(lambda: [pontuar(formulas, r) for r in recs])
+    rapido, t_rapido = cronometrar(lambda: {nome: f.avaliar(colunas) for nome, f in formulas.items()})
+    for nome in formulas:
+        esperado = np.array([r[nome] for r in lento], dtype=float)
+        assert np.allclose(np.round(rapido[nome], 2), esperado, equal_nan=True), nome
+    print(f"avaliação de {len(formulas)} fórmulas em {len(recs):,} linhas: "
+          f"registro a registro {t_lento:.2f}s, colunas {t_rapido * 1000:.1f} ms "
+          f"({t_lento / t_rapido:,.0f}x)")
+
+if __name__ == "__main__":
+    itens = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    dias  = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    formulas = compilar(FORMULAS)
+    with tempfile.TemporaryDirectory() as pasta:
+        path = os.path.join(pasta, "pontuacao.db")
+        conn, n, _ = popular(path, itens, dias, trigger=False)
+        print(f"base: {itens} itens x {dias} dias = {n:,} linhas")
+        avaliacao(conn, formulas)
+
+        # o último dia fica de fora para simular a coleta chegando depois
+        corte = int(time.time()) - 86400
+        ultimo_dia = conn.execute("SELECT * FROM market_series WHERE ts > ?", (corte,)).fetchall()
+        with conn:
+            conn.execute("DELETE FROM market_series WHERE ts > ?", (corte,))
+        v, dt = cronometrar(atualizar_pontuacoes, path, formulas)
+        print(f"histórico inteiro: {v:,} valores em {dt:.2f}s "
+              f"({(n - len(ultimo_dia)) / dt:,.0f} linhas/s)")
+
+        with conn:
+            conn.executemany(INSERT_SERIES_SQL, ultimo_dia)
+        v, dt = cronometrar(atualizar_pontuacoes, path, formulas)
+        print(f"incremental (+1 dia): {v:,} valores em {dt * 1000:.0f} ms")
+
+        formulas["margem"] = Formula("margem", "(avg_sell - avg_buy) / avg_sell * 100")
+        v, dt = cronometrar(atualizar_pontuacoes, path, formulas)
+        print(f"expressão de 'margem' trocada: {v:,} valores refeitos em {dt:.2f}s")
+        total = sqlite3.connect(path).execute("SELECT COUNT(*) FROM pontuacoes").fetchone()[0]
+        assert total == n * len(formulas), total
+        conn.close()
@@ -0,0 +1,92 @@
+# bench_previsores.py
+#
+# Compara o RegistroPrevisores com uma RandomForest de 100 árvores (o
+# modelo global antigo) numa base sintética: tempo de ajuste, tamanho em
+# disco, tempo para prever todos os itens e erro no próximo ponto.
+#   python bench_previsores.py [itens] [pontos_por_item]
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from database import init_db
+from previsores import RegistroPrevisores
+
+def gerar_base(path, itens, pontos, seed=42):
+    # metade dos itens volta à média (AR), metade é passeio aleatório;
+    # 10% têm poucos pontos e devem cair no modelo global
+    rng = np.random.default_rng(seed)
+    ts0 = int(time.time()) - pontos * 300 - 3600
+    conn = init_db(path)
+    proximos = {}
+    with conn:
+        conn.executemany("INSERT INTO items(id, url_name) VALUES (?, ?)",
+                         ((i, f"item_{i}") for i in range(itens)))
+        for i in range(itens):
+            n = 5 if i % 10 == 0 else pontos + 1
+            media = rng.uniform(20, 300)
+            if i % 2:
+                x = [media]
+                for _ in range(n - 1):
+                    x.append(media + 0.6 * (x[-1] - media) + rng.normal(0, media * 0.03))
+            else:
+                x = list(media + np.cumsum(rng.normal(0, media * 0.01, n)))
+            x = np.maximum(x, 1.0)
+            proximos[f"item_{i}"] = x[-1]      # fica de fora: é o que queremos prever
+            conn.executemany(
+                "INSERT INTO market_series(item_id, ts, avg_sell, spread, demand, "
+                "supply, liquidity, score) VALUES (?,?,?,?,?,?,?,?)",
+                ((i, ts0 + k * 300, v, v * 0.1, 5, 5, 10, 3.0)
+                 for k, v in enumerate(x[:-1].tolist())))
+    return conn, proximos
+
+if __name__ == "__main__":
+    itens  = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    pontos = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as pasta:
+        conn, proximos = gerar_base(os.path.join(pasta, "bench.db"), itens, pontos)
+        nomes = list(proximos)
+        alvo = np.array([proximos[n] for n in nomes])
+
+        from sklearn.ensemble import RandomForestRegressor
+        cols = "spread, demand, supply, liquidity, score"
+        dados = np.array(conn.execute(f"SELECT {cols}, avg_sell FROM market_series").fetchall())
+        t0 = time.perf_counter()
+        rf = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+        rf.fit(dados[:, :-1], dados[:, -1])
+        t_rf = time.perf_counter() - t0
+        ultimos = np.array(conn.execute(f"""
+            SELECT {cols} FROM market_series s
+            WHERE ts = (SELECT MAX(ts) FROM market_series WHERE item_id = s.item_id)
+            ORDER BY item_id
+        """).fetchall())
+        t0 = time.perf_counter()
+        pred_rf = rf.predict(ultimos)
+        p_rf = time.perf_counter() - t0
+        tam_rf = len(pickle.dumps(rf, protocol=pickle.HIGHEST_PROTOCOL))
+
+        t0 = time.perf_counter()
+        reg = RegistroPrevisores.ajustar(conn)
+        t_reg = time.perf_counter() - t0
+        path = os.path.join(pasta, "previsores.npy")
+        reg.salvar(path)
+        reg = RegistroPrevisores.carregar(path)
+        t0 = time.perf_counter()
+        pred_reg = reg.prever(nomes, pred_rf)
+        p_reg = time.perf_counter() - t0
+        tam_reg = os.path.getsize(path)
+
+        def mae(pred):
+            return np.mean(np.abs(pred - alvo))
+
+        print(f"{itens} itens ({len(reg)} com previsor próprio), {len(dados)} linhas")
+        print(f"{'modelo':<22} | {'ajuste':>8} | {'prever todos':>12} | {'tamanho':>10} | {'MAE':>7}")
+        print(f"{'RandomForest(100)':<22} | {t_rf:>7.2f}s | {p_rf * 1000:>9.1f} ms "
+              f"| {tam_rf / 2**20:>7.1f} MB | {mae(pred_rf):>7.2f}")
+        print(f"{'previsores por item':<22} | {t_reg:>7.2f}s | {p_reg * 1000:>9.1f} ms "
+              f"| {tam_reg / 2**20:>7.2f} MB | {mae(pred_reg):>7.2f}")
+        conn.close()
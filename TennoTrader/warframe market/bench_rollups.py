@@ -0,0 +1,107 @@
+# bench_rollups.py
+#
+# Mede o custo dos triggers de rollups na gravação (executemany em
+# market_series com e sem eles, e reescrevendo linhas que já existem, que
+# refaz os baldes) e compara um gráfico de avg_sell montado agregando as
+# linhas brutas em pandas com historico_ohlc, para janelas de 1 dia, 1
+# semana e 1 mês.
+#   python bench_rollups.py [itens] [dias]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from database import INSERT_SERIES_SQL, desligar_rollups, historico_ohlc, init_db, janela
+from rollups import reconstruir_rollups
+
+INTERVALO = 300    # s entre varreduras simuladas
+
+def gerar_linhas(itens, dias, seed=42):
+    rng = np.random.default_rng(seed)
+    ts0 = int(time.time()) - dias * 86400
+    n = dias * 86400 // INTERVALO
+    precos = 50 + np.cumsum(rng.normal(0, 1, (itens, n)), axis=1)
+    for k in range(n):
+        ts = ts0 + k * INTERVALO
+        for i in range(itens):
+            p = float(precos[i, k])
+            yield (i + 1, ts, p, p * 0.8, p, p * 0.8, p, p * 0.8, p * 0.2, 5, 5, 5, 1.0)
+
+def popular(path, itens, dias, trigger=True):
+    conn = init_db(path)
+    if not trigger:
+        desligar_rollups(conn)
+    with conn:
+        conn.executemany("INSERT INTO items(id, url_name) VALUES (?, ?)",
+                         ((i + 1, f"item_{i}") for i in range(itens)))
+    linhas = list(gerar_linhas(itens, dias))
+    t0 = time.perf_counter()
+    gravar_lotes(conn, linhas)
+    return conn, len(linhas), time.perf_counter() - t0
+
+def gravar_lotes(conn, linhas):
+    for k in range(0, len(linhas), 500):       # lotes do tamanho do GravadorLote
+        with conn:
+            conn.executemany(INSERT_SERIES_SQL, linhas[k:k + 500])
+
+def reescrita(conn, fracao=0.05, seed=7):
+    """Reescreve `fracao` das linhas com outro preço; devolve (linhas, segundos)."""
+    rng = np.random.default_rng(seed)
+    linhas = conn.execute("SELECT * FROM market_series").fetchall()
+    escolhidas = rng.choice(len(linhas), int(len(linhas) * fracao), replace=False)
+    novas = [(*linhas[k][:2], linhas[k][2] * rng.uniform(0.5, 1.5), *linhas[k][3:])
+             for k in escolhidas.tolist()]
+    t0 = time.perf_counter()
+    gravar_lotes(conn, novas)
+    dt = time.perf_counter() - t0
+    antes = conn.execute("SELECT * FROM rollups ORDER BY res, item_id, balde").fetchall()
+    with conn:
+        reconstruir_rollups(conn)
+    depois = conn.execute("SELECT * FROM rollups ORDER BY res, item_id, balde").fetchall()
+    assert np.allclose(np.array(antes, dtype=float), np.array(depois, dtype=float)), \
+        "rollups do trigger diferem da reconstrução depois das reescritas"
+    return len(novas), dt
+
+def ohlc_pandas(conn, item, desde, ate, res):
+    df = pd.DataFrame(janela(conn, desde, ate), columns=["ts", "item", "avg_sell"] + [None] * 10)
+    df = df[df["item"] == item]
+    balde = df["ts"] - df["ts"] % res
+    return df.groupby(balde)["avg_sell"].agg(["first", "max", "min", "last"])
+
+def cronometrar(f, *args, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        r = f(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return r, melhor
+
+if __name__ == "__main__":
+    itens = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    dias  = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    with tempfile.TemporaryDirectory() as pasta:
+        sem, n, t_sem = popular(os.path.join(pasta, "sem.db"), itens, dias, trigger=False)
+        sem.close()
+        conn, _, t_com = popular(os.path.join(pasta, "com.db"), itens, dias)
+        print(f"{n} linhas: gravação sem trigger {n / t_sem:,.0f} linhas/s, "
+              f"com trigger {n / t_com:,.0f} linhas/s ({t_com / t_sem:.1f}x)")
+        n_r, t_r = reescrita(conn)
+        print(f"reescrita de {n_r} linhas existentes: {n_r / t_r:,.0f} linhas/s "
+              f"(refaz os 3 baldes de cada uma)")
+
+        agora = int(time.time())
+        print(f"{'janela':>7} | {'res':>6} | {'velas':>5} | {'pandas':>9} | {'rollups':>9}")
+        for nome, segundos in (("1 dia", 86400), ("7 dias", 7 * 86400), ("30 dias", 30 * 86400)):
+            desde = agora - segundos
+            (res, velas), t_r = cronometrar(historico_ohlc, conn, "item_7", desde, agora)
+            ref, t_p = cronometrar(ohlc_pandas, conn, "item_7", desde, agora, res, repeticoes=1)
+            # o primeiro balde pode começar antes de `desde` nos rollups
+            ref_v = ref.to_numpy()[-len(velas) + 1:]
+            assert np.allclose(ref_v, np.array(velas)[-len(ref_v):, 1:5])
+            print(f"{nome:>7} | {res:>5}s | {len(velas):>5} | {t_p * 1000:>6.1f} ms "
+                  f"| {t_r * 1000:>6.2f} ms")
+        conn.close()
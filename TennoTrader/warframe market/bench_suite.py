@@ -0,0 +1,276 @@
+# bench_suite.py
+#
+# Mede os caminhos quentes do app sem rede: a coleta fala com um
+# ServidorReplay (replay.py) e o resto roda sobre o que foi coletado.
+# Cada etapa reporta vazão, latência p50/p99 por operação e pico de memória
+# Python (tracemalloc, numa segunda passada para não pesar no tempo).
+# O resultado sai em JSON para comparar entre versões:
+#   python bench_suite.py [--itens 3000] [--latencia 20] [--jitter 10]
+#                         [--fixtures pasta] [--saida resultado.json]
+#                         [--comparar base.json] [--tolerancia 0.25]
+# Com --comparar, termina com código 1 se alguma etapa ficou mais lenta que
+# a base além da tolerância.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from replay import ServidorReplay, gerar_fixtures
+
+# ─── etapas ───────────────────────────────────────────────────────────────
+# cada etapa recebe o contexto (dict) e devolve (durações por operação em s,
+# quantos itens passaram, tempo total de parede em s)
+
+def etapa_get_orders(ctx):
+    motor = ctx["motor"]
+    duracoes, livros = [], {}
+    t0 = time.perf_counter()
+    for item in ctx["itens"]:
+        t = time.perf_counter()
+        livros[item] = motor.get_orders(item)
+        duracoes.append(time.perf_counter() - t)
+    ctx["livros"] = livros
+    return duracoes, len(duracoes), time.perf_counter() - t0
+
+def etapa_coleta(ctx):
+    # ponta a ponta: Coletor + calcular_dados com a concorrência do app, sem limite de taxa
+    from coletor import Coletor
+    motor = ctx["motor"]
+    duracoes = []
+
+    def buscar(item):
+        t = time.perf_counter()
+        try:
+            return motor.calcular_dados(item)
+        finally:
+            duracoes.append(time.perf_counter() - t)
+
+    coletor = Coletor(buscar, concorrencia=ctx["concorrencia"], taxa=1e9)
+    for item in ctx["itens"]:
+        coletor.agendar(item)
+    t0 = time.perf_counter()
+    coletor.varrer_bloqueante()
+    total = time.perf_counter() - t0
+    coletor.fechar()
+    return duracoes, len(duracoes), total
+
+def etapa_calcular_metricas(ctx):
+    from analise_dados import calcular_metricas
+    duracoes, recs = [], []
+    t0 = time.perf_counter()
+    for item, (sells, buys) in ctx["livros"].items():
+        if not sells and not buys:
+            continue
+        t = time.perf_counter()
+        recs.append({"item": item, **calcular_metricas(sells, buys)})
+        duracoes.append(time.perf_counter() - t)
+    ctx["recs"] = recs
+    return duracoes, len(duracoes), time.perf_counter() - t0
+
+def etapa_insert_record(ctx):
+    from database import init_db, insert_record
+    conn = init_db(os.path.join(ctx["pasta"], f"insert_{time.monotonic_ns()}.db"))
+    duracoes = []
+    t0 = time.perf_counter()
+    for rec in ctx["recs"]:
+        t = time.perf_counter()
+        insert_record(conn, rec)
+        duracoes.append(time.perf_counter() - t)
+    total = time.perf_counter() - t0
+    conn.close()
+    return duracoes, len(duracoes), total
+
+def etapa_gravador_lote(ctx):
+    from database import GravadorLote
+    gravador = GravadorLote(os.path.join(ctx["pasta"], f"lote_{time.monotonic_ns()}.db"))
+    duracoes = []
+    t0 = time.perf_counter()
+    for rec in ctx["recs"]:
+        t = time.perf_counter()
+        gravador.gravar(rec)
+        duracoes.append(time.perf_counter() - t)
+    gravador.flush()          # o total inclui chegar no disco
+    total = time.perf_counter() - t0
+    gravador.close()
+    return duracoes, len(duracoes), total
+
+def etapa_predicoes(ctx, ciclos=20):
+    # um ciclo do predictions_worker: matriz, predict e a troca do dict
+    from modelo import ModeloIncremental, matriz_features
+    registros = ctx["recs"]
+    if "modelo" not in ctx:
+        ctx["modelo"] = ModeloIncremental().fit(matriz_features(registros),
+                                                [r["avg_sell"] for r in registros])
+    duracoes = []
+    t0 = time.perf_counter()
+    for _ in range(ciclos):
+        t = time.perf_counter()
+        preds = ctx["modelo"].predict(matriz_features(registros))
+        ctx["previsoes"] = {r["item"]: float(p) for r, p in zip(registros, preds)}
+        duracoes.append(time.perf_counter() - t)
+    return duracoes, ciclos * len(registros), time.perf_counter() - t0
+
+def etapa_ui_refresh(ctx, ciclos=50, fracao=0.1):
+    # a parte do ui_refresh que não é Tk: 10% dos itens mudam a cada ciclo
+    from armazem import ArmazemResultados
+    from recomendacoes import MotorRecomendacoes
+    from tabela import ModeloTabela, formatar_linha, tag_linha
+    recs, prev = ctx["recs"], ctx.get("previsoes", {})
+    armazem = ArmazemResultados()
+    armazem.atualizar_varios(recs)
+    tabela = ModeloTabela(formatar_linha, tag_linha, "pred_sell")
+    rec_motor = MotorRecomendacoes()
+    versao, snap = armazem.snapshot()
+    tabela.sincronizar(((r.item, r) for r in snap.values()), prev)
+    rec_motor.atualizar(snap.values())
+    rng = np.random.default_rng(42)
+    n_mudam = max(1, int(len(recs) * fracao))
+    duracoes = []
+    t0 = time.perf_counter()
+    for _ in range(ciclos):
+        for k in rng.choice(len(recs), n_mudam, replace=False).tolist():
+            r = dict(recs[k])
+            r["score"] = round(r["score"] + rng.normal(), 2)
+            armazem.atualizar(r)
+        t = time.perf_counter()
+        versao, novos = armazem.mudancas_desde(versao)
+        rec_motor.atualizar(novos).texto()
+        tabela.sincronizar(((r.item, r) for r in novos), prev)
+        for item in tabela.fatia(0, 30):
+            tabela.linha(item)
+        duracoes.append(time.perf_counter() - t)
+    return duracoes, ciclos * n_mudam, time.perf_counter() - t0
+
+def etapa_recomendacoes(ctx, ciclos=20):
+    # recomendações do zero sobre todos os itens (o que a UI faz ao abrir)
+    from recomendacoes import MotorRecomendacoes
+    duracoes = []
+    t0 = time.perf_counter()
+    for _ in range(ciclos):
+        t = time.perf_counter()
+        MotorRecomendacoes().atualizar(ctx["recs"]).texto()
+        duracoes.append(time.perf_counter() - t)
+    return duracoes, ciclos * len(ctx["recs"]), time.perf_counter() - t0
+
+ETAPAS = {
+    "get_orders":         etapa_get_orders,
+    "coleta":             etapa_coleta,
+    "calcular_metricas":  etapa_calcular_metricas,
+    "insert_record":      etapa_insert_record,
+    "gravador_lote":      etapa_gravador_lote,
+    "predicoes":          etapa_predicoes,
+    "ui_refresh":         etapa_ui_refresh,
+    "recomendacoes":      etapa_recomendacoes,
+}
+
+# ─── execução ─────────────────────────────────────────────────────────────
+def medir(nome, funcao, ctx, memoria=True):
+    duracoes, n, total = funcao(ctx)
+    d = np.array(duracoes) * 1000 if duracoes else np.zeros(1)
+    saida = {
+        "n":        n,
+        "total_s":  total,
+        "vazao_s":  n / total if total else 0.0,
+        "p50_ms":   float(np.percentile(d, 50)),
+        "p99_ms":   float(np.percentile(d, 99)),
+    }
+    if memoria:
+        tracemalloc.start()
+        funcao(ctx)
+        saida["pico_mem_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return saida
+
+def rodar(itens=3000, latencia_ms=20.0, jitter_ms=10.0, concorrencia=6,
+          fixtures=None, etapas=None, memoria=True):
+    """Roda as etapas pedidas (todas por padrão) e devolve o relatório como dict."""
+    fixtures = os.path.abspath(fixtures) if fixtures else None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta:
+        if fixtures is None:
+            fixtures = os.path.join(pasta, "fixtures")
+            gerar_fixtures(fixtures, itens)
+        srv = ServidorReplay(fixtures, latencia_ms=latencia_ms, jitter_ms=jitter_ms, n_itens=itens)
+        url = srv.iniciar()
+        # o motor cria banco, cache e snapshots no diretório atual ao ser importado
+        os.chdir(pasta)
+        try:
+            import motor
+            motor.BASE_URL = url
+            motor.iniciar_rede()
+            ctx = {"motor": motor, "pasta": pasta, "concorrencia": concorrencia,
+                   "itens": motor.get_all_items()}
+            resultado = {}
+            for nome, funcao in ETAPAS.items():
+                # as etapas seguintes usam o que get_orders e calcular_metricas produzem
+                if etapas and nome not in etapas and nome not in ("get_orders", "calcular_metricas"):
+                    continue
+                r = medir(nome, funcao, ctx, memoria)
+                if not etapas or nome in etapas:
+                    resultado[nome] = r
+            motor.parar()
+        finally:
+            os.chdir(cwd)
+            srv.parar()
+    return {
+        "quando": int(time.time()),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "parametros": {"itens": itens, "latencia_ms": latencia_ms, "jitter_ms": jitter_ms,
+                       "concorrencia": concorrencia},
+        "etapas": resultado,
+    }
+
+def comparar(atual, base, tolerancia):
+    """Etapas cujo p50 ou vazão piorou mais que `tolerancia` (fração) em relação à base."""
+    piores = []
+    for nome, r in atual["etapas"].items():
+        b = base["etapas"].get(nome)
+        if b is None:
+            continue
+        if r["p50_ms"] > b["p50_ms"] * (1 + tolerancia):
+            piores.append(f"{nome}: p50 {b['p50_ms']:.3f} -> {r['p50_ms']:.3f} ms")
+        if r["vazao_s"] < b["vazao_s"] / (1 + tolerancia):
+            piores.append(f"{nome}: vazão {b['vazao_s']:,.0f} -> {r['vazao_s']:,.0f}/s")
+    return piores
+
+def imprimir(relatorio):
+    print(f"{'etapa':<18} | {'n':>7} | {'vazão/s':>10} | {'p50 ms':>8} | {'p99 ms':>8} | {'pico mem':>10}")
+    for nome, r in relatorio["etapas"].items():
+        mem = f"{r['pico_mem_kb']:>7.0f} KB" if "pico_mem_kb" in r else f"{'-':>10}"
+        print(f"{nome:<18} | {r['n']:>7} | {r['vazao_s']:>10,.0f} | {r['p50_ms']:>8.3f} "
+              f"| {r['p99_ms']:>8.3f} | {mem}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes com replay da API")
+    ap.add_argument("--itens", type=int, default=3000)
+    ap.add_argument("--latencia", type=float, default=20.0, help="ms por resposta do replay")
+    ap.add_argument("--jitter", type=float, default=10.0, help="± ms na latência")
+    ap.add_argument("--concorrencia", type=int, default=6)
+    ap.add_argument("--fixtures", default=None, help="pasta do replay.py (padrão: sintéticas)")
+    ap.add_argument("--etapas", default=None, help=f"separadas por vírgula: {','.join(ETAPAS)}")
+    ap.add_argument("--sem-memoria", action="store_true", help="pula a passada com tracemalloc")
+    ap.add_argument("--saida", default=None, help="grava o relatório JSON neste arquivo")
+    ap.add_argument("--comparar", default=None, help="relatório JSON de base")
+    ap.add_argument("--tolerancia", type=float, default=0.25)
+    args = ap.parse_args()
+
+    relatorio = rodar(args.itens, args.latencia, args.jitter, args.concorrencia, args.fixtures,
+                      args.etapas.split(",") if args.etapas else None, not args.sem_memoria)
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            piores = comparar(relatorio, json.load(f), args.tolerancia)
+        for linha in piores:
+            print(f"[Regressão] {linha}")
+        sys.exit(1 if piores else 0)
@@ -0,0 +1,173 @@
+# cache_local.py
+
+import json
+import os
+import struct
+import threading
+import time
+
+CACHE_DIR = "cache"
+
+CAMPOS_F = ("avg_sell", "avg_buy", "median_sell", "median_buy",
+            "weighted_avg_sell", "weighted_avg_buy", "spread")
+CAMPOS_I = ("demand", "supply", "liquidity")
+
+# item_id, ts, 7 métricas float, demand/supply/liquidity, score, pred_sell
+REGISTRO = struct.Struct("<iq7d3i2d")
+CHAVES   = ("item", "ts") + CAMPOS_F + CAMPOS_I + ("score", "pred_sell")
+
+class CacheIncremental:
+    """
+    Cache dos resultados em log binário só de acréscimo.
+
+    Cada atualização vira um registro de tamanho fixo (REGISTRO) no fim de
+    registros.bin; nomes de itens viram ids pelo itens.txt, uma linha por
+    id, como em snapshots.py. Ao abrir, um registro incompleto no fim (crash
+    no meio da escrita) é cortado e vale a última versão de cada item.
+    Quando o log passa de `fator_compactar` × itens, ele é reescrito só com
+    a última versão de cada um. Só usa a biblioteca padrão, para não
+    atrasar a abertura do app.
+    """
+
+    def __init__(self, pasta=CACHE_DIR, fator_compactar=4, min_compactar=5000):
+        self.pasta = pasta
+        self.fator_compactar = fator_compactar
+        self.min_compactar   = min_compactar
+        os.makedirs(pasta, exist_ok=True)
+        self._arq_log   = os.path.join(pasta, "registros.bin")
+        self._arq_itens = os.path.join(pasta, "itens.txt")
+        self._lock      = threading.Lock()
+        self._pendentes = []
+        self._nomes_novos = []
+        self._itens  = self._carregar_itens()
+        self._ultimo = {}    # item_id -> tupla do último registro
+        self._n_log  = 0
+        self._ler_log()
+        self._log = open(self._arq_log, "ab")
+
+    # ─── abertura ─────────────────────────────────────────────────────────
+    def _carregar_itens(self):
+        try:
+            with open(self._arq_itens, "rb") as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return {}
+        fim = dados.rfind(b"\n") + 1
+        if fim != len(dados):
+            # nome pela metade: nenhum registro aponta para ele ainda
+            with open(self._arq_itens, "r+b") as f:
+                f.truncate(fim)
+        nomes = dados[:fim].decode("utf-8").splitlines()
+        return {nome: i for i, nome in enumerate(nomes)}
+
+    def _ler_log(self):
+        try:
+            with open(self._arq_log, "rb") as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return
+        validos = len(dados) - len(dados) % REGISTRO.size
+        if validos != len(dados):
+            with open(self._arq_log, "r+b") as f:
+                f.truncate(validos)
+        # em ordem de escrita: a última tupla de cada id sobrescreve as anteriores
+        ultimo = {t[0]: t for t in REGISTRO.iter_unpack(memoryview(dados)[:validos])}
+        n_itens = len(self._itens)
+        self._ultimo = {i: t for i, t in ultimo.items() if 0 <= i < n_itens}
+        self._n_log = validos // REGISTRO.size
+
+    def carregar(self):
+        """{item: dict com os campos de calcular_dados + pred_sell}, última versão de cada item."""
+        nomes = [None] * len(self._itens)
+        for nome, i in self._itens.items():
+            nomes[i] = nome
+        return {nomes[t[0]]: dict(zip(CHAVES, (nomes[t[0]],) + t[1:]))
+                for t in self._ultimo.values()}
+
+    def __len__(self):
+        return len(self._ultimo)
+
+    # ─── escrita ──────────────────────────────────────────────────────────
+    def _id(self, item):
+        i = self._itens.get(item)
+        if i is None:
+            i = self._itens[item] = len(self._itens)
+            self._nomes_novos.append(item)
+        return i
+
+    def _empacotar(self, rec, pred, ts):
+        return REGISTRO.pack(
+            self._id(rec["item"]), ts,
+            *[float(rec[c]) for c in CAMPOS_F],
+            *[int(rec[c]) for c in CAMPOS_I],
+            float(rec["score"]), float(pred))
+
+    def gravar(self, rec, pred=0.0, ts=None):
+        """Enfileira a versão nova de um item; vai para o disco em `descarregar`."""
+        ts = int(time.time()) if ts is None else ts
+        with self._lock:
+            self._pendentes.append(self._empacotar(rec, pred, ts))
+
+    def gravar_varios(self, recs, previsoes=None):
+        """Como `gravar` para vários; sem `previsoes`, usa o pred_sell do próprio rec."""
+        ts = int(time.time())
+        previsoes = previsoes or {}
+        with self._lock:
+            self._pendentes.extend(
+                self._empacotar(rec, previsoes.get(rec["item"], rec.get("pred_sell", 0.0)), ts)
+                for rec in recs)
+
+    def descarregar(self):
+        """Escreve os pendentes num único write; compacta se o log cresceu demais."""
+        with self._lock:
+            if not self._pendentes:
+                return 0
+            if self._nomes_novos:
+                # os nomes vão para o disco antes de qualquer registro que use os ids
+                with open(self._arq_itens, "a", encoding="utf-8") as f:
+                    f.write("".join(nome + "\n" for nome in self._nomes_novos))
+                self._nomes_novos = []
+            bloco, self._pendentes = b"".join(self._pendentes), []
+            self._log.write(bloco)
+            self._log.flush()
+            n = len(bloco) // REGISTRO.size
+            self._ultimo.update((t[0], t) for t in REGISTRO.iter_unpack(bloco))
+            self._n_log += n
+            if self._n_log > max(self.min_compactar, self.fator_compactar * len(self._ultimo)):
+                self._compactar()
+            return n
+
+    def _compactar(self):
+        tmp = self._arq_log + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(REGISTRO.pack(*t) for t in self._ultimo.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        self._log.close()       # no Windows não dá para substituir um arquivo aberto
+        os.replace(tmp, self._arq_log)
+        self._log = open(self._arq_log, "ab")
+        self._n_log = len(self._ultimo)
+
+    def compactar(self):
+        with self._lock:
+            self._compactar()
+
+    def fechar(self):
+        self.descarregar()
+        with self._lock:
+            self._log.close()
+
+    # ─── migração ─────────────────────────────────────────────────────────
+    def importar_json(self, path):
+        """Importa o cache.json antigo (lista de dicts com pred_sell); devolve quantos."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        for d in dados:
+            try:
+                self.gravar(d, d.get("pred_sell", 0.0))
+            except (KeyError, TypeError, ValueError):
+                continue    # entrada incompleta de alguma versão antiga
+        return self.descarregar()
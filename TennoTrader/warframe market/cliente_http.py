@@ -0,0 +1,102 @@
+# cliente_http.py
+
+import hashlib
+import json
+import os
+import threading
+
+HTTP_CACHE_DIR = "http_cache"
+
+class SemMudanca(Exception):
+    """O endpoint devolveu o mesmo conteúdo da última vez."""
+
+class ClienteCondicional:
+    """
+    GET condicional em cima da session do app, com cache em disco por endpoint.
+
+    Guarda ETag, Last-Modified e um hash do corpo de cada endpoint e manda
+    If-None-Match / If-Modified-Since na próxima vez. Um 304, ou um 200 com
+    o mesmo hash, conta como acerto e nada precisa ser decodificado.
+    """
+
+    def __init__(self, session, base_url, headers, pasta=HTTP_CACHE_DIR, timeout=10):
+        self.session  = session
+        self.base_url = base_url
+        self.headers  = headers
+        self.pasta    = pasta
+        self.timeout  = timeout
+        self.hits     = 0
+        self.misses   = 0
+        self._meta    = {}    # endpoint -> {"etag", "last_modified", "hash"}
+        self._lock    = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+
+    def _arquivo(self, endpoint):
+        nome = hashlib.sha1(endpoint.encode("utf-8")).hexdigest()
+        return os.path.join(self.pasta, nome)
+
+    def _ler_meta(self, endpoint):
+        meta = self._meta.get(endpoint)
+        if meta is None:
+            try:
+                with open(self._arquivo(endpoint), "rb") as f:
+                    meta = json.loads(f.readline())
+            except (OSError, ValueError):
+                meta = {}
+            self._meta[endpoint] = meta
+        return meta
+
+    def _ler_corpo(self, endpoint):
+        with open(self._arquivo(endpoint), "rb") as f:
+            f.readline()
+            return f.read()
+
+    def _salvar(self, endpoint, meta, corpo):
+        arq = self._arquivo(endpoint)
+        tmp = f"{arq}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(corpo)
+        os.replace(tmp, arq)
+        self._meta[endpoint] = meta
+
+    def get(self, endpoint):
+        """
+        Devolve (resp, corpo, mudou). Em 304 o corpo vem do disco; para
+        outros status que não 200 o corpo é o da resposta e nada é gravado.
+        """
+        meta = self._ler_meta(endpoint)
+        headers = dict(self.headers)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = self.session.get(f"{self.base_url}{endpoint}",
+                                headers=headers, timeout=self.timeout)
+        if resp.status_code == 304 and meta:
+            with self._lock:
+                self.hits += 1
+            return resp, self._ler_corpo(endpoint), False
+        if resp.status_code != 200:
+            return resp, resp.content, True
+
+        corpo = resp.content
+        h = hashlib.blake2b(corpo, digest_size=16).hexdigest()
+        mudou = h != meta.get("hash")
+        with self._lock:
+            if mudou:
+                self.misses += 1
+            else:
+                self.hits += 1
+        novo = {"etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "hash": h}
+        if mudou or novo != meta:
+            self._salvar(endpoint, novo, corpo)
+        return resp, corpo, mudou
+
+    def estatisticas(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0}
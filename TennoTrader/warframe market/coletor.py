@@ -0,0 +1,162 @@
+# coletor.py
+
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetria
+
+
+class LimiteTaxa(Exception):
+    """A API respondeu 429. `espera` traz o Retry-After em segundos, se veio."""
+
+    def __init__(self, espera=None):
+        super().__init__(espera)
+        self.espera = espera
+
+
+class TokenBucket:
+    """
+    Limitador de taxa: `taxa` fichas por segundo, rajada até `capacidade`.
+
+    Quem chama `adquirir` reserva uma ficha (o saldo pode ficar negativo) e
+    dorme até ela existir, então não precisa de lock dentro do laço asyncio.
+    Num 429 a taxa cai pela metade e o balde trava pelo tempo pedido pela API;
+    depois de `recuperar_apos` sucessos seguidos ela volta a subir até a base.
+    """
+
+    def __init__(self, taxa, capacidade=None, taxa_min=0.2,
+                 recuperar_apos=20, relogio=time.monotonic):
+        self.taxa_base      = taxa
+        self.taxa           = taxa
+        self.capacidade     = capacidade or max(1.0, taxa)
+        self.taxa_min       = taxa_min
+        self.recuperar_apos = recuperar_apos
+        self._relogio       = relogio
+        self._fichas        = self.capacidade
+        self._ultimo        = relogio()
+        self._travado_ate   = 0.0
+        self._sucessos      = 0
+
+    def _repor(self):
+        agora = self._relogio()
+        self._fichas = min(self.capacidade,
+                           self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+        return agora
+
+    async def adquirir(self):
+        agora = self._repor()
+        self._fichas -= 1
+        if self._fichas < 0:
+            await asyncio.sleep(-self._fichas / self.taxa)
+        # um 429 pode ter travado o balde enquanto esperávamos
+        while True:
+            agora = self._relogio()
+            if agora >= self._travado_ate:
+                return
+            await asyncio.sleep(self._travado_ate - agora)
+
+    def sucesso(self):
+        self._sucessos += 1
+        if self._sucessos >= self.recuperar_apos and self.taxa < self.taxa_base:
+            self.taxa = min(self.taxa_base, self.taxa * 1.25)
+            self._sucessos = 0
+
+    def penalizar(self, espera=None):
+        self._repor()
+        self.taxa      = max(self.taxa_min, self.taxa / 2)
+        self._fichas   = min(self._fichas, 0.0)
+        self._sucessos = 0
+        if espera is None:
+            espera = 1.0 / self.taxa
+        self._travado_ate = max(self._travado_ate, self._relogio() + espera)
+
+
+class Coletor:
+    """
+    Coleta assíncrona com concorrência limitada e fila de prioridades.
+
+    `buscar(item)` é a função bloqueante que faz a requisição (ex.: calcular_dados);
+    roda num pool de threads enquanto o laço asyncio controla taxa e concorrência.
+    Prioridade menor sai primeiro; empates saem na ordem de agendamento.
+
+    `fonte()`, se dada, é consultada antes de cada requisição e devolve
+    novos (item, prioridade) para a fila (ex.: AgendadorAdaptativo.vencidos);
+    `apos_busca(item, rec)` é chamada depois de toda busca bem-sucedida,
+    inclusive quando `rec` é None.
+    """
+
+    def __init__(self, buscar, ao_resultado=None, concorrencia=6,
+                 taxa=3.0, max_tentativas=3, fonte=None, apos_busca=None):
+        self.buscar         = buscar
+        self.ao_resultado   = ao_resultado
+        self.fonte          = fonte
+        self.apos_busca     = apos_busca
+        self.concorrencia   = concorrencia
+        self.limitador      = TokenBucket(taxa)
+        self.max_tentativas = max_tentativas
+        self.ultima_varredura = {}
+        self._heap = []
+        self._seq  = itertools.count()
+        self._pool = ThreadPoolExecutor(max_workers=concorrencia,
+                                        thread_name_prefix="coletor")
+
+    def agendar(self, item, prioridade=0.0, tentativas=0):
+        heapq.heappush(self._heap, (prioridade, next(self._seq), item, tentativas))
+
+    def pendentes(self):
+        return len(self._heap)
+
+    async def _trabalhador(self, stats, ativo):
+        loop = asyncio.get_running_loop()
+        while ativo():
+            if self.fonte:
+                for item, prioridade in self.fonte():
+                    self.agendar(item, prioridade)
+            if not self._heap:
+                break
+            prioridade, _, item, tentativas = heapq.heappop(self._heap)
+            await self.limitador.adquirir()
+            stats["requisicoes"] += 1
+            try:
+                rec = await loop.run_in_executor(self._pool, self.buscar, item)
+            except LimiteTaxa as e:
+                stats["limitadas"] += 1
+                self.limitador.penalizar(e.espera)
+                if tentativas + 1 < self.max_tentativas:
+                    # mantém a prioridade: volta para a frente da fila
+                    self.agendar(item, prioridade, tentativas + 1)
+                else:
+                    stats["falhas"] += 1
+                continue
+            except Exception as e:
+                stats["falhas"] += 1
+                telemetria.erro("coletor", e)
+                continue
+            self.limitador.sucesso()
+            stats["sucessos"] += 1
+            if self.apos_busca:
+                self.apos_busca(item, rec)
+            if rec and self.ao_resultado:
+                self.ao_resultado(rec)
+
+    async def varrer(self, ativo=lambda: True):
+        """Esvazia a fila (e a fonte) e devolve as estatísticas da varredura."""
+        stats = {"requisicoes": 0, "sucessos": 0, "limitadas": 0, "falhas": 0}
+        inicio = time.perf_counter()
+        await asyncio.gather(*(self._trabalhador(stats, ativo)
+                               for _ in range(self.concorrencia)))
+        duracao = time.perf_counter() - inicio
+        stats["duracao"]   = duracao
+        stats["req_por_s"] = stats["requisicoes"] / duracao if duracao else 0.0
+        self.ultima_varredura = stats
+        return stats
+
+    def varrer_bloqueante(self, ativo=lambda: True):
+        return asyncio.run(self.varrer(ativo))
+
+    def fechar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,39 +1,440 @@
+import queue
 import sqlite3
+import threading
 import time
 
+import telemetria
+
 DB_PATH = "warframe_market.db"
 
-def init_db(path=DB_PATH):
-    """Inicializa o banco e cria tabela se não existir."""
-    conn = sqlite3.connect(path, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS market_data (
-            ts           INTEGER,
-            item         TEXT,
-            avg_sell     REAL,
-            avg_buy      REAL,
-            median_sell  REAL,
-            median_buy   REAL,
-            weighted_avg_sell REAL,
-            weighted_avg_buy  REAL,
-            spread       REAL,
-            demand       INTEGER,
-            supply       INTEGER,
-            liquidity    INTEGER,
-            score        REAL
+# WAL deixa leitores (treino, ETL) lendo enquanto o gravador escreve;
+# synchronous=NORMAL só faz fsync no checkpoint, o que é seguro em WAL.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+COLUNAS = (
+    "ts", "item", "avg_sell", "avg_buy",
+    "median_sell", "median_buy",
+    "weighted_avg_sell", "weighted_avg_buy",
+    "spread", "demand", "supply", "liquidity", "score"
+)
+METRICAS = COLUNAS[2:]
+
+_METRICAS_S   = ", ".join(f"s.{c}" for c in METRICAS)
+_METRICAS_NEW = ", ".join(f"NEW.{c}" for c in METRICAS)
+_MARCADORES   = ",".join("?" * len(COLUNAS))
+
+# Esquema v1: os itens viram uma tabela-dimensão com id inteiro e a série fica
+# agrupada fisicamente por (item_id, ts) numa tabela WITHOUT ROWID. A view
+# market_data mantém o formato antigo para quem faz SELECT * e o trigger
+# INSTEAD OF aceita os INSERTs antigos (insert_record, to_sql do ingest).
+SCHEMA_V1 = (
+    """
+    CREATE TABLE IF NOT EXISTS items (
+        id       INTEGER PRIMARY KEY,
+        url_name TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS market_series (
+        item_id      INTEGER NOT NULL REFERENCES items(id),
+        ts           INTEGER NOT NULL,
+        avg_sell     REAL,
+        avg_buy      REAL,
+        median_sell  REAL,
+        median_buy   REAL,
+        weighted_avg_sell REAL,
+        weighted_avg_buy  REAL,
+        spread       REAL,
+        demand       INTEGER,
+        supply       INTEGER,
+        liquidity    INTEGER,
+        score        REAL,
+        PRIMARY KEY (item_id, ts)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_market_series_ts ON market_series(ts)",
+    f"""
+    CREATE VIEW IF NOT EXISTS market_data AS
+        SELECT s.ts, i.url_name AS item, {_METRICAS_S}
+        FROM market_series s JOIN items i ON i.id = s.item_id
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS market_data_insert
+    INSTEAD OF INSERT ON market_data
+    BEGIN
+        INSERT OR IGNORE INTO items(url_name) VALUES (NEW.item);
+        INSERT OR REPLACE INTO market_series VALUES (
+            (SELECT id FROM items WHERE url_name = NEW.item),
+            NEW.ts, {_METRICAS_NEW}
+        );
+    END
+    """,
+)
+
+INSERT_SQL        = f"INSERT INTO market_data VALUES ({_MARCADORES})"
+INSERT_SERIES_SQL = f"INSERT OR REPLACE INTO market_series VALUES ({_MARCADORES})"
+
+def _migrar_v1(conn):
+    """Converte a tabela market_data antiga (sem chave) para o esquema v1."""
+    legado = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='market_data'"
+    ).fetchone()
+    if legado:
+        conn.execute("ALTER TABLE market_data RENAME TO market_data_legacy")
+    for stmt in SCHEMA_V1:
+        conn.execute(stmt)
+    if legado:
+        conn.execute("""
+            INSERT OR IGNORE INTO items(url_name)
+            SELECT DISTINCT item FROM market_data_legacy
+            WHERE item IS NOT NULL ORDER BY item
+        """)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO market_series
+            SELECT i.id, l.ts, {", ".join(f"l.{c}" for c in METRICAS)}
+            FROM market_data_legacy l JOIN items i ON i.url_name = l.item
+            WHERE l.ts IS NOT NULL
+            ORDER BY i.id, l.ts
+        """)
+        conn.execute("DROP TABLE market_data_legacy")
+
+# Esquema v2: tabela de features derivadas (features.py), o estado por item
+# que permite continuar o cálculo incremental e marcas d'água nomeadas.
+SCHEMA_V2 = (
+    """
+    CREATE TABLE IF NOT EXISTS features (
+        item_id   INTEGER NOT NULL,
+        ts        INTEGER NOT NULL,
+        pct_sell  REAL,
+        vol_3     REAL,
+        ma_sell_3 REAL,
+        PRIMARY KEY (item_id, ts)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS features_estado (
+        item_id INTEGER PRIMARY KEY,
+        ts      INTEGER NOT NULL,
+        n       INTEGER NOT NULL,
+        sell_1  REAL, sell_2 REAL,
+        pct_1   REAL, pct_2  REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS marcas (
+        nome TEXT PRIMARY KEY,
+        ts   INTEGER NOT NULL
+    )
+    """,
+)
+
+def _migrar_v2(conn):
+    for stmt in SCHEMA_V2:
+        conn.execute(stmt)
+
+# Esquema v3: agregados OHLC por item em baldes de 5 min, 1 h e 1 dia, mantidos
+# por trigger a cada linha nova de market_series (GravadorLote e insert_record
+# passam por ela; o ingest_data desliga o trigger e reconstrói o intervalo no
+# fim). Reescrever um (item_id, ts) que já existe fica com o trigger do v5.
+RESOLUCOES = (300, 3600, 86400)
+
+def _upsert_rollup(res):
+    return f"""
+        INSERT INTO rollups VALUES (
+            {res}, NEW.item_id, NEW.ts - NEW.ts % {res},
+            NEW.avg_sell, NEW.avg_sell, NEW.avg_sell, NEW.avg_sell, NEW.ts, NEW.ts,
+            COALESCE(NEW.spread, 0), COALESCE(NEW.demand, 0), COALESCE(NEW.supply, 0), 1
         )
-    """)
-    conn.commit()
+        ON CONFLICT (res, item_id, balde) DO UPDATE SET
+            open        = CASE WHEN excluded.open_ts < open_ts THEN excluded.open ELSE open END,
+            close       = CASE WHEN excluded.close_ts >= close_ts THEN excluded.close ELSE close END,
+            open_ts     = MIN(open_ts, excluded.open_ts),
+            close_ts    = MAX(close_ts, excluded.close_ts),
+            high        = MAX(high, excluded.high),
+            low         = MIN(low, excluded.low),
+            soma_spread = soma_spread + excluded.soma_spread,
+            max_demand  = MAX(max_demand, excluded.max_demand),
+            max_supply  = MAX(max_supply, excluded.max_supply),
+            n           = n + 1;
+    """
+
+TABELA_ROLLUPS = """
+    CREATE TABLE IF NOT EXISTS rollups (
+        res         INTEGER NOT NULL,    -- largura do balde em s (RESOLUCOES)
+        item_id     INTEGER NOT NULL,
+        balde       INTEGER NOT NULL,    -- ts do início do balde
+        open  REAL, high REAL, low REAL, close REAL,   -- de avg_sell
+        open_ts     INTEGER NOT NULL,
+        close_ts    INTEGER NOT NULL,
+        soma_spread REAL    NOT NULL,
+        max_demand  INTEGER NOT NULL,
+        max_supply  INTEGER NOT NULL,
+        n           INTEGER NOT NULL,
+        PRIMARY KEY (res, item_id, balde)
+    ) WITHOUT ROWID
+"""
+
+# BEFORE: ainda dá para ver se a chave já existia (INSERT OR REPLACE/IGNORE)
+TRIGGER_ROLLUPS = f"""
+    CREATE TRIGGER IF NOT EXISTS market_series_rollup
+    BEFORE INSERT ON market_series
+    WHEN NEW.avg_sell IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM market_series WHERE item_id = NEW.item_id AND ts = NEW.ts
+    )
+    BEGIN
+        {"".join(_upsert_rollup(res) for res in RESOLUCOES)}
+    END
+"""
+
+SCHEMA_V3 = (TABELA_ROLLUPS, TRIGGER_ROLLUPS)
+
+def _migrar_v3(conn):
+    from rollups import reconstruir_rollups    # numpy fica fora da abertura do app
+    for stmt in SCHEMA_V3:
+        conn.execute(stmt)
+    reconstruir_rollups(conn)
+
+# Esquema v4: pontuações nomeadas (pontuacao.py) numa tabela lateral, uma
+# linha por (fórmula, item, ts). A expressão fica guardada em `formulas` para
+# saber quando ela mudou e o histórico precisa ser pontuado de novo.
+SCHEMA_V4 = (
+    """
+    CREATE TABLE IF NOT EXISTS formulas (
+        id        INTEGER PRIMARY KEY,
+        nome      TEXT NOT NULL UNIQUE,
+        expressao TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pontuacoes (
+        formula_id INTEGER NOT NULL REFERENCES formulas(id),
+        item_id    INTEGER NOT NULL,
+        ts         INTEGER NOT NULL,
+        valor      REAL,
+        PRIMARY KEY (formula_id, item_id, ts)
+    ) WITHOUT ROWID
+    """,
+)
+
+def _migrar_v4(conn):
+    for stmt in SCHEMA_V4:
+        conn.execute(stmt)
+
+# Esquema v5: INSERT OR REPLACE de um (item_id, ts) que já existe refaz os
+# baldes da linha com a versão nova no lugar da antiga (max/min não dão para
+# "desfazer" no lugar): o de 5 min a partir de market_series, cada um dos
+# maiores a partir dos baldes da resolução anterior. Só as reescritas pagam
+# esse custo; linha nova continua no upsert do v3. market_series é escrita
+# sempre com INSERT OR REPLACE: um INSERT OR IGNORE de chave existente
+# refaria o balde com uma linha que não entrou.
+def _refazer_rollup(res, fonte):
+    balde = f"NEW.ts - NEW.ts % {res}"
+    return f"""
+        DELETE FROM rollups WHERE res = {res} AND item_id = NEW.item_id AND balde = {balde};
+        INSERT INTO rollups SELECT * FROM (
+            SELECT {res}, NEW.item_id, {balde},
+                   (SELECT open FROM ({fonte}) ORDER BY open_ts LIMIT 1), MAX(high), MIN(low),
+                   (SELECT close FROM ({fonte}) ORDER BY close_ts DESC LIMIT 1),
+                   MIN(open_ts), MAX(close_ts), SUM(soma_spread),
+                   MAX(max_demand), MAX(max_supply), SUM(n) AS n
+            FROM ({fonte})
+        ) WHERE n > 0;
+    """
+
+def _linhas_do_balde(res):
+    # as linhas do balde depois da escrita (as outras e NEW), como baldes de uma linha
+    balde = f"NEW.ts - NEW.ts % {res}"
+    return f"""
+        SELECT avg_sell AS open, avg_sell AS high, avg_sell AS low, avg_sell AS close,
+               ts AS open_ts, ts AS close_ts, COALESCE(spread, 0) AS soma_spread,
+               COALESCE(demand, 0) AS max_demand, COALESCE(supply, 0) AS max_supply, 1 AS n
+        FROM market_series
+        WHERE item_id = NEW.item_id AND ts >= {balde} AND ts < {balde} + {res}
+          AND ts != NEW.ts AND avg_sell IS NOT NULL
+        UNION ALL
+        SELECT NEW.avg_sell, NEW.avg_sell, NEW.avg_sell, NEW.avg_sell, NEW.ts, NEW.ts,
+               COALESCE(NEW.spread, 0), COALESCE(NEW.demand, 0), COALESCE(NEW.supply, 0), 1
+        WHERE NEW.avg_sell IS NOT NULL
+    """
+
+def _baldes_menores(res, menor):
+    balde = f"NEW.ts - NEW.ts % {res}"
+    return f"""
+        SELECT * FROM rollups
+        WHERE res = {menor} AND item_id = NEW.item_id AND balde >= {balde} AND balde < {balde} + {res}
+    """
+
+TRIGGER_ROLLUPS_TROCA = f"""
+    CREATE TRIGGER IF NOT EXISTS market_series_rollup_troca
+    BEFORE INSERT ON market_series
+    WHEN EXISTS (
+        SELECT 1 FROM market_series WHERE item_id = NEW.item_id AND ts = NEW.ts
+    )
+    BEGIN
+        {_refazer_rollup(RESOLUCOES[0], _linhas_do_balde(RESOLUCOES[0]))}
+        {"".join(_refazer_rollup(res, _baldes_menores(res, menor))
+                 for menor, res in zip(RESOLUCOES, RESOLUCOES[1:]))}
+    END
+"""
+
+def _migrar_v5(conn):
+    from rollups import reconstruir_rollups
+    conn.execute(TRIGGER_ROLLUPS_TROCA)
+    # baldes que ficaram com a versão antiga de linhas reescritas até aqui
+    reconstruir_rollups(conn)
+
+def ligar_rollups(conn):
+    conn.execute(TRIGGER_ROLLUPS)
+    conn.execute(TRIGGER_ROLLUPS_TROCA)
+
+def desligar_rollups(conn):
+    conn.execute("DROP TRIGGER IF EXISTS market_series_rollup")
+    conn.execute("DROP TRIGGER IF EXISTS market_series_rollup_troca")
+
+# posição na lista = versão de destino - 1; versões novas entram no fim
+MIGRACOES = [_migrar_v1, _migrar_v2, _migrar_v3, _migrar_v4, _migrar_v5]
+
+def _migrar(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    for alvo, migracao in enumerate(MIGRACOES[versao:], start=versao + 1):
+        conn.execute("BEGIN")
+        try:
+            migracao(conn)
+            conn.execute(f"PRAGMA user_version = {alvo}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[DB] Esquema migrado para v{alvo}")
+
+def init_db(path=DB_PATH, timeout=5.0):
+    """Inicializa o banco, migrando o esquema para a versão atual se preciso."""
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    _migrar(conn)
+    # uma importação que caiu no meio pode ter deixado os triggers desligados
+    ligar_rollups(conn)
     return conn
 
-def insert_record(conn, record: dict):
+def ler_marca(conn, nome, padrao=-1):
+    linha = conn.execute("SELECT ts FROM marcas WHERE nome = ?", (nome,)).fetchone()
+    return linha[0] if linha else padrao
+
+def gravar_marca(conn, nome, ts):
+    conn.execute("INSERT OR REPLACE INTO marcas VALUES (?, ?)", (nome, ts))
+
+def avancar_marca(conn, nome, lida, nova):
     """
-    Insere um registro no formato retornado por calcular_metricas,
-    adicionando timestamp.
+    Grava `nova` só se a marca ainda vale `lida` (None: não existia): quem
+    a desceu no meio (importação) não é desfeito.
+    """
+    with conn:
+        if lida is None:
+            conn.execute("INSERT OR IGNORE INTO marcas VALUES (?, ?)", (nome, nova))
+        else:
+            conn.execute("UPDATE marcas SET ts = ? WHERE nome = ? AND ts = ?", (nova, nome, lida))
+
+def reabrir_marca(conn, nome, desde):
+    """Desce a marca `nome` para antes de `desde`, se ela já tinha passado dele."""
+    conn.execute("UPDATE marcas SET ts = ? WHERE nome = ? AND ts >= ?", (desde - 1, nome, desde))
+
+def resolver_item_id(conn, nome, cache):
+    """Id do item em `items`, criando se não existir; `cache` é um dict nome→id."""
+    item_id = cache.get(nome)
+    if item_id is None:
+        conn.execute("INSERT OR IGNORE INTO items(url_name) VALUES (?)", (nome,))
+        item_id = conn.execute(
+            "SELECT id FROM items WHERE url_name = ?", (nome,)
+        ).fetchone()[0]
+        cache[nome] = item_id
+    return item_id
+
+def historico_item(conn, item, desde=0, ate=None, limite=-1, deslocamento=0):
+    """
+    Série de um item em ordem de ts, no formato de COLUNAS.
+    Vai direto pela chave (item_id, ts), sem varrer a tabela.
+    `limite`/`deslocamento` paginam (-1 = sem limite).
+    """
+    return conn.execute(f"""
+        SELECT s.ts, i.url_name, {_METRICAS_S}
+        FROM items i JOIN market_series s ON s.item_id = i.id
+        WHERE i.url_name = ? AND s.ts >= ? AND s.ts <= ?
+        ORDER BY s.ts LIMIT ? OFFSET ?
+    """, (item, desde, ate if ate is not None else 2**62, limite, deslocamento)).fetchall()
+
+def janela(conn, desde, ate=None, limite=-1, deslocamento=0):
+    """Todos os registros com desde <= ts <= ate (usa o índice em ts)."""
+    return conn.execute(f"""
+        SELECT s.ts, i.url_name, {_METRICAS_S}
+        FROM market_series s JOIN items i ON i.id = s.item_id
+        WHERE s.ts >= ? AND s.ts <= ?
+        ORDER BY s.ts, s.item_id LIMIT ? OFFSET ?
+    """, (desde, ate if ate is not None else 2**62, limite, deslocamento)).fetchall()
+
+COLUNAS_OHLC = ("balde", "open", "high", "low", "close",
+                "spread_medio", "max_demand", "max_supply", "n")
+
+def escolher_resolucao(desde, ate, max_pontos=500):
+    """A resolução mais fina que cobre [desde, ate] com no máximo `max_pontos` baldes."""
+    for res in RESOLUCOES:
+        if (ate - desde) // res + 1 <= max_pontos:
+            return res
+    return RESOLUCOES[-1]
+
+def historico_ohlc(conn, item, desde=0, ate=None, max_pontos=500, res=None):
+    """
+    Velas de avg_sell de um item, no formato de COLUNAS_OHLC, lidas de rollups.
+    Sem `res`, usa escolher_resolucao: o custo depende de quantos baldes
+    voltam, não de quanto histórico há guardado. Devolve (res, linhas).
+    """
+    ate = int(time.time()) if ate is None else ate
+    if res is None:
+        res = escolher_resolucao(desde, ate, max_pontos)
+    elif res not in RESOLUCOES:
+        raise ValueError(f"resolução {res} não é uma de {RESOLUCOES}")
+    linhas = conn.execute("""
+        SELECT r.balde, r.open, r.high, r.low, r.close,
+               r.soma_spread / r.n, r.max_demand, r.max_supply, r.n
+        FROM items i JOIN rollups r ON r.item_id = i.id
+        WHERE r.res = ? AND i.url_name = ? AND r.balde >= ? AND r.balde <= ?
+        ORDER BY r.balde
+    """, (res, item, desde - desde % res, ate)).fetchall()
+    return res, linhas
+
+def historico_pontuacao(conn, formula, item, desde=0, ate=None, limite=-1, deslocamento=0):
+    """(ts, valor) da pontuação `formula` de um item, pela chave de `pontuacoes`."""
+    return conn.execute("""
+        SELECT p.ts, p.valor
+        FROM formulas f JOIN pontuacoes p ON p.formula_id = f.id
+                        JOIN items i ON i.id = p.item_id
+        WHERE f.nome = ? AND i.url_name = ? AND p.ts >= ? AND p.ts <= ?
+        ORDER BY p.ts LIMIT ? OFFSET ?
+    """, (formula, item, desde, ate if ate is not None else 2**62, limite, deslocamento)).fetchall()
+
+def ultimos_registros(conn):
+    """
+    Último registro de cada item, como dicts no formato de calcular_dados
+    (sem ts). Métricas nulas viram 0 para poderem ser ordenadas na UI.
+    Uma busca pela chave por item, sem varrer a série.
     """
-    ts = int(time.time())
-    fields = (
+    metricas = ", ".join(f"COALESCE(s.{c}, 0) AS {c}" for c in METRICAS)
+    cur = conn.execute(f"""
+        SELECT i.url_name AS item, {metricas}
+        FROM items i CROSS JOIN market_series s   -- CROSS: força items por fora
+        WHERE s.item_id = i.id
+          AND s.ts = (SELECT MAX(ts) FROM market_series WHERE item_id = i.id)
+    """)
+    nomes = [d[0] for d in cur.description]
+    return [dict(zip(nomes, linha)) for linha in cur]
+
+def _linha(record, ts):
+    return (
         ts, record["item"],
         record["avg_sell"], record["avg_buy"],
         record["median_sell"], record["median_buy"],
@@ -42,8 +443,131 @@ def insert_record(conn, record: dict):
         record["demand"], record["supply"],
         record["liquidity"], record["score"]
     )
+
+def insert_record(conn, record: dict):
+    """
+    Insere um registro no formato retornado por calcular_metricas,
+    adicionando timestamp.
+    """
     c = conn.cursor()
-    c.execute("""
-        INSERT INTO market_data VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, fields)
+    c.execute(INSERT_SQL, _linha(record, int(time.time())))
     conn.commit()
+
+_FIM = object()
+
+def _ocupado(e):
+    """O erro é de banco travado por outra conexão (passa sozinho)?"""
+    codigo = getattr(e, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(e) or "busy" in str(e)
+
+class GravadorLote:
+    """
+    Grava registros de market_data em lote, numa thread própria.
+
+    `gravar` só enfileira; a thread junta até `tamanho_lote` linhas ou
+    `intervalo` segundos e grava tudo com um executemany numa transação.
+    `flush` espera o que já foi enfileirado chegar no disco e `close`
+    descarrega o resto e fecha a conexão (chamar no on_close).
+
+    Banco travado por outra escrita longa (ingest_data, features, pontuações)
+    não perde o lote: as linhas ficam e a gravação é tentada de novo com
+    espera crescente até `atraso_max`; no `close`, só `tentativas_fim` vezes.
+    Outros erros do SQLite descartam o lote (contado em db_linhas_perdidas).
+
+    Um lote que chega ao disco com linhas de mais de `margem` segundos pode
+    já ter ficado atrás de quem lê por marca d'água: as marcas de `reabrir`
+    descem para antes delas na mesma transação.
+    """
+
+    def __init__(self, path=DB_PATH, tamanho_lote=500, intervalo=1.0, timeout=30.0,
+                 atraso_max=60.0, tentativas_fim=3, reabrir=(), margem=10):
+        self.path         = path
+        self.tamanho_lote = tamanho_lote
+        self.intervalo    = intervalo
+        self.atraso_max   = atraso_max
+        self.tentativas_fim = tentativas_fim
+        self.reabrir      = tuple(reabrir)
+        self.margem       = margem
+        self.gravados     = 0
+        self._conn   = init_db(path, timeout=timeout)
+        self._ids    = {}
+        self._fila   = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True,
+                                        name="gravador-db")
+        self._thread.start()
+
+    def gravar(self, record, ts=None):
+        self._fila.put(_linha(record, int(time.time()) if ts is None else ts))
+
+    def flush(self, timeout=None):
+        pronto = threading.Event()
+        self._fila.put(pronto)
+        return pronto.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._fila.put(_FIM)
+            self._thread.join()
+
+    def _descarregar(self, pendentes):
+        """Grava e esvazia `pendentes`; False se o banco estava travado (as linhas ficam)."""
+        if not pendentes:
+            return True
+        t0 = time.perf_counter()
+        try:
+            with self._conn:
+                linhas = [(resolver_item_id(self._conn, l[1], self._ids), l[0], *l[2:])
+                          for l in pendentes]
+                self._conn.executemany(INSERT_SERIES_SQL, linhas)
+                atrasada = min(l[0] for l in pendentes)
+                if atrasada <= int(time.time()) - self.margem:
+                    for nome in self.reabrir:
+                        reabrir_marca(self._conn, nome, atrasada)
+            self.gravados += len(pendentes)
+            telemetria.observar("db_lote", time.perf_counter() - t0)
+            telemetria.contar("db_linhas", len(pendentes))
+        except sqlite3.Error as e:
+            self._ids.clear()   # ids criados no lote desfeito não existem mais
+            if _ocupado(e):
+                telemetria.contar("db_ocupado")
+                return False
+            telemetria.erro("gravador", e)
+            telemetria.contar("db_linhas_perdidas", len(pendentes))
+        pendentes.clear()
+        return True
+
+    def _loop(self):
+        pendentes, avisar = [], []   # avisar: flush esperando o lote atual
+        limite, atraso, fim = None, 0.0, 0
+        while True:
+            espera = None if limite is None else max(0.0, limite - time.monotonic())
+            try:
+                obj = self._fila.get(timeout=espera)
+            except queue.Empty:
+                obj = None
+            if type(obj) is tuple:
+                pendentes.append(obj)
+                if limite is None:
+                    limite = time.monotonic() + self.intervalo
+                if len(pendentes) < self.tamanho_lote or atraso:
+                    continue    # banco travado: o lote cresce até o fim da espera
+            elif isinstance(obj, threading.Event):
+                avisar.append(obj)
+            elif obj is _FIM or fim:
+                fim += 1
+            if not self._descarregar(pendentes):
+                if fim < self.tentativas_fim:
+                    atraso = min(max(2 * atraso, 0.5), self.atraso_max)
+                    limite = time.monotonic() + atraso
+                    continue
+                telemetria.contar("db_linhas_perdidas", len(pendentes))
+                pendentes.clear()
+            limite, atraso = None, 0.0
+            for evento in avisar:
+                evento.set()
+            avisar.clear()
+            if fim:
+                break
+        self._conn.close()
@@ -1,84 +1,59 @@
 # etl_and_train.py
 
 import sqlite3
+import time
+
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.model_selection import train_test_split
-
-# 1) Conecta e lê todos os dados
-DB_PATH = "warframe_market.db"
-with sqlite3.connect(DB_PATH) as conn:
-    df = pd.read_sql("SELECT * FROM market_data", conn, parse_dates=["ts"])
 
-# 2) Cria coluna datetime e ordena por item
-df["datetime"] = pd.to_datetime(df["ts"], unit="s")
-df = df.sort_values(["item", "datetime"]).set_index("datetime")
+from features import atualizar_features
+from treino import avaliar_candidatos, dobras_walk_forward, imprimir_placar
 
-# 3) Features de série temporal por item
-df["pct_sell"] = (
-    df.groupby("item")["avg_sell"]
-      .pct_change()
-      .replace([np.inf, -np.inf], np.nan)
-      .fillna(0)
-)
-df["vol_3"] = (
-    df.groupby("item")["pct_sell"]
-      .transform(lambda s: s.rolling(3, min_periods=1).std())
-      .fillna(0)
-)
-df["ma_sell_3"] = (
-    df.groupby("item")["avg_sell"]
-      .transform(lambda s: s.rolling(3, min_periods=1).mean())
-      .fillna(0)
-)
+DB_PATH = "warframe_market.db"
 
-# 4) Seleção de features e alvo
+# Features, alvo e split temporal
 FEATURE_COLS = [
     "pct_sell","vol_3","ma_sell_3",
     "spread","demand","supply","liquidity","score"
 ]
 TARGET = "avg_sell"
-
-# 5) Limpa infinitos e preenche NaNs
-df.replace([np.inf, -np.inf], np.nan, inplace=True)
-df[FEATURE_COLS] = df[FEATURE_COLS].fillna(0)
-
-# 6) Split treino/teste por data ou random 80/20 se test vazio
 CUTOFF = "2025-09-30 13:00"
-train = df.loc[df.index <= CUTOFF]
-test  = df.loc[df.index >  CUTOFF]
-
-if test.empty:
-    print("⚠️ Test set vazio com o cutoff. Usando random split 80/20.")
-    X = df[FEATURE_COLS]
-    y = df[TARGET]
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, shuffle=True
-    )
-else:
-    X_train, y_train = train[FEATURE_COLS].loc[train.index], train[TARGET]
-    X_test,  y_test  = df[FEATURE_COLS].loc[test.index],  test[TARGET]
-
-print(f"Treino: {X_train.shape}, Teste: {X_test.shape}")
-
-# 7) Treina modelos
-lr = LinearRegression().fit(X_train, y_train)
-rf = RandomForestRegressor(n_estimators=100, random_state=42)\
-         .fit(X_train, y_train)
-
-# 8) Predições
-pred_lr = lr.predict(X_test)
-pred_rf = rf.predict(X_test)
-
-# 9) Avaliação sem parâmetro 'squared'
-def report(name, true, pred):
-    mae = mean_absolute_error(true, pred)
-    mse = mean_squared_error(true, pred)
-    rmse = np.sqrt(mse)
-    print(f"{name:<20} MAE: {mae:.2f} | RMSE: {rmse:.2f}")
-
-report("Linear Regression", y_test, pred_lr)
-report("Random Forest"     , y_test, pred_rf)
+N_DOBRAS = 3
+
+# os workers do treino importam este arquivo (spawn no Windows): nada roda fora do main
+if __name__ == "__main__":
+    # 1) Atualiza as features em streaming (só linhas novas, ver features.py)
+    atualizar_features(DB_PATH)
+
+    # 2) Lê dados já com as features de série temporal por item
+    with sqlite3.connect(DB_PATH) as conn:
+        df = pd.read_sql("""
+            SELECT i.url_name AS item, s.*, f.pct_sell, f.vol_3, f.ma_sell_3
+            FROM market_series s
+            JOIN items i    ON i.id = s.item_id
+            JOIN features f ON f.item_id = s.item_id AND f.ts = s.ts
+        """, conn)
+
+    # 3) Cria coluna datetime e ordena por tempo (as dobras são fatias contínuas)
+    df = df[df[TARGET].notna()].sort_values(["ts", "item"])
+    df["datetime"] = pd.to_datetime(df["ts"], unit="s")
+    df = df.set_index("datetime")
+
+    # 4) Limpa infinitos e preenche NaNs
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    df[FEATURE_COLS] = df[FEATURE_COLS].fillna(0)
+
+    # 5) Dobras walk-forward a partir do cutoff
+    dobras = dobras_walk_forward(df["ts"].to_numpy(), pd.Timestamp(CUTOFF).timestamp(), N_DOBRAS)
+    print(f"Linhas: {len(df)}, dobras (treino, teste): "
+          + ", ".join(f"({fim_treino}, {fim_teste - fim_treino})" for fim_treino, fim_teste in dobras))
+
+    # 6) Treina e avalia todos os candidatos em paralelo (ver treino.py)
+    t0 = time.perf_counter()
+    placar = avaliar_candidatos(df[FEATURE_COLS].to_numpy(), df[TARGET].to_numpy(), dobras)
+    parede = time.perf_counter() - t0
+
+    # 7) Placar: média de MAE/RMSE nas dobras e tempo total de treino por modelo
+    imprimir_placar(placar)
+    cpu = sum(p["treino_s"] for p in placar)
+    print(f"Tempo de parede: {parede:.2f}s (soma dos treinos: {cpu:.2f}s)")
@@ -0,0 +1,152 @@
+# features.py
+#
+# Features de série temporal por item (as mesmas do etl_and_train.py) calculadas
+# em streaming: lê market_series em blocos na ordem (item_id, ts) da chave
+# primária, calcula tudo com operações vetorizadas que respeitam a fronteira
+# entre itens e grava na tabela `features`. O que falta de um bloco para o
+# outro (últimos 2 preços e 2 variações de cada item) fica em features_estado,
+# então rodar de novo só processa linhas novas.
+
+import sqlite3
+import time
+
+import numpy as np
+
+from database import DB_PATH, init_db, ler_marca, gravar_marca
+
+FEATURE_COLS = ("pct_sell", "vol_3", "ma_sell_3")
+MARCA        = "features"
+MARGEM_TS    = 10     # s; linhas mais novas podem ainda estar no gravador
+_SEM_ESTADO  = (-1, 0, np.nan, np.nan, np.nan, np.nan)   # ts, n, sell_1, sell_2, pct_1, pct_2
+
+def calcular_bloco(ids, ts, sell, estado):
+    """
+    Features de um bloco ordenado por (item_id, ts).
+
+    `estado` é {item_id: (ts, n, sell_1, sell_2, pct_1, pct_2)} com o fim da
+    série já processada de cada item (n = linhas vistas, até 2; _1 é a mais
+    recente) e é atualizado no lugar. Linhas com ts <= estado.ts são puladas.
+    Devolve (ids, ts, pct_sell, vol_3, ma_sell_3) das linhas calculadas.
+    """
+    inicio = np.ones(len(ids), dtype=bool)
+    inicio[1:] = ids[1:] != ids[:-1]
+    grupos = ids[inicio]
+    ctx = np.array([estado.get(g, _SEM_ESTADO) for g in grupos.tolist()],
+                   dtype=float).reshape(-1, 6)
+
+    # descarta o que já foi processado (re-execução depois de um crash)
+    g_linha = np.cumsum(inicio) - 1
+    novas = ts > ctx[g_linha, 0]
+    if not novas.all():
+        return calcular_bloco(ids[novas], ts[novas], sell[novas], estado)
+    if not len(ids):
+        return ids, ts, sell, sell, sell
+
+    n      = len(ids)
+    ini    = np.flatnonzero(inicio)
+    pos    = np.arange(n) - ini[g_linha]              # posição dentro do item
+    n_hist = ctx[g_linha, 1]
+
+    def deslocar(x, k, col):
+        # x[i-k] dentro do item; antes do início do bloco, vem do estado
+        out = np.empty(n)
+        dentro = pos >= k
+        out[dentro] = x[np.flatnonzero(dentro) - k]
+        fora = ~dentro
+        out[fora] = ctx[g_linha[fora], col + (k - pos[fora] - 1)]
+        return out
+
+    s1 = deslocar(sell, 1, 2)
+    s2 = deslocar(sell, 2, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = sell / s1 - 1
+    pct[~np.isfinite(pct)] = 0.0      # primeira linha do item, x/0 e 0/0
+    p1 = deslocar(pct, 1, 4)
+    p2 = deslocar(pct, 2, 4)
+
+    # rolling(3, min_periods=1): k = quantos valores a janela já tem
+    k = np.minimum(3, n_hist + pos + 1)
+    ma = np.where(k >= 3, (s2 + s1 + sell) / 3,
+                  np.where(k == 2, (s1 + sell) / 2, sell))
+    m3 = (p2 + p1 + pct) / 3
+    var3 = ((p2 - m3) ** 2 + (p1 - m3) ** 2 + (pct - m3) ** 2) / 2
+    vol = np.where(k >= 3, np.sqrt(var3),
+                   np.where(k == 2, np.abs(pct - p1) / np.sqrt(2), 0.0))
+
+    fim = np.append(ini[1:], n) - 1
+    novo = zip(grupos.tolist(), ts[fim].tolist(), np.minimum(2, n_hist[fim] + pos[fim] + 1).tolist(),
+               sell[fim].tolist(), s1[fim].tolist(), pct[fim].tolist(), p1[fim].tolist())
+    for g, *valores in novo:
+        estado[g] = tuple(valores)
+    return ids, ts, pct, np.nan_to_num(vol), np.nan_to_num(ma)
+
+def invalidar(conn, menores):
+    """
+    Prepara a próxima rodada para linhas gravadas atrás da marca (importação):
+    `menores` é {item_id: menor ts gravado}. Item cujo estado já passou desse
+    ts tem as features apagadas para ser refeito do início; os outros só
+    precisam que a marca desça para antes do menor ts.
+    """
+    if not menores:
+        return
+    estado = dict(conn.execute("SELECT item_id, ts FROM features_estado"))
+    refazer = [(i,) for i, t in menores.items() if estado.get(i, -1) >= t]
+    conn.executemany("DELETE FROM features WHERE item_id = ?", refazer)
+    conn.executemany("DELETE FROM features_estado WHERE item_id = ?", refazer)
+    nova = -1 if refazer else min(menores.values()) - 1
+    if nova < ler_marca(conn, MARCA):
+        gravar_marca(conn, MARCA, nova)
+
+def atualizar_features(path=DB_PATH, bloco=200_000, reconstruir=False):
+    """
+    Calcula features das linhas de market_series ainda não processadas.
+    A memória fica limitada ao bloco mais o estado por item.
+    Devolve quantas linhas foram gravadas.
+    """
+    conn = init_db(path)
+    leitor = sqlite3.connect(path)
+    try:
+        if reconstruir:
+            with conn:
+                conn.execute("DELETE FROM features")
+                conn.execute("DELETE FROM features_estado")
+                conn.execute("DELETE FROM marcas WHERE nome = ?", (MARCA,))
+        marca  = ler_marca(conn, MARCA)
+        limite = int(time.time()) - MARGEM_TS
+        estado = {row[0]: tuple(np.nan if v is None else v for v in row[1:])
+                  for row in conn.execute("SELECT * FROM features_estado")}
+
+        cur = leitor.execute("""
+            SELECT item_id, ts, avg_sell FROM market_series
+            WHERE ts > ? AND ts <= ? ORDER BY item_id, ts
+        """, (marca, limite))
+        gravadas, maior_ts = 0, marca
+        while True:
+            linhas = cur.fetchmany(bloco)
+            if not linhas:
+                break
+            dados = np.array(linhas, dtype=float)
+            ids, ts = dados[:, 0].astype(np.int64), dados[:, 1].astype(np.int64)
+            antes = set(estado)
+            tocados = set(ids.tolist())
+            saida = calcular_bloco(ids, ts, dados[:, 2], estado)
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO features VALUES (?,?,?,?,?)",
+                                 zip(*(c.tolist() for c in saida)))
+                conn.executemany("INSERT OR REPLACE INTO features_estado VALUES (?,?,?,?,?,?,?)",
+                                 ((g, *(None if v != v else v for v in estado[g]))
+                                  for g in tocados | (set(estado) - antes)))
+            gravadas += len(saida[0])
+            maior_ts = max(maior_ts, int(ts.max()))
+        with conn:
+            gravar_marca(conn, MARCA, max(maior_ts, marca))
+        return gravadas
+    finally:
+        leitor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    n = atualizar_features()
+    dt = time.perf_counter() - t0
+    print(f"[Features] {n} linhas em {dt:.2f}s ({n / dt if dt else 0:.0f} linhas/s)")
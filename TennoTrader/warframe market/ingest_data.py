@@ -1,61 +1,180 @@
 # ingest_data.py
+#
+# Importação em massa de dumps TSV/CSV de market_data (sem cabeçalho por
+# padrão). O arquivo é lido em trechos de `--bloco` MB, parseados em
+# `--processos` processos, e cada trecho é gravado numa transação. Como
+# (item, ts) é a chave, reimportar um dump só reescreve as linhas.
+#   python ingest_data.py [market_data.tsv] [--db ...] [--bloco 32] [--processos 1]
 
+import argparse
+import io
+import os
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import sqlite3
 
-# 1) Defina o esquema / colunas na mesma ordem do seu TSV
-cols = [
-    "ts", "item", "avg_sell", "avg_buy",
-    "median_sell", "median_buy",
-    "weighted_avg_sell", "weighted_avg_buy",
-    "spread", "demand", "supply", "liquidity", "score"
-]
+import features
+import pontuacao
+from database import (COLUNAS, DB_PATH, INSERT_SERIES_SQL, desligar_rollups, init_db,
+                      ligar_rollups, reabrir_marca)
+from modelo import MARCA as MARCA_MODELO
+from previsores import MARCA as MARCA_PREVISORES
+from rollups import reconstruir_rollups
 
-# 2) Caminho para o seu TSV e para o DB
 TSV_PATH = "market_data.tsv"
-DB_PATH  = "warframe_market.db"
-
-# 3) Leia o TSV em um DataFrame
-df = pd.read_csv(
-    TSV_PATH,
-    sep="\t",
-    header=None,
-    names=cols,
-    dtype={
-        "ts": int,
-        "item": str,
-        "avg_sell": float,
-        "avg_buy": float,
-        "median_sell": float,
-        "median_buy": float,
-        "weighted_avg_sell": float,
-        "weighted_avg_buy": float,
-        "spread": float,
-        "demand": int,
-        "supply": int,
-        "liquidity": int,
-        "score": float
-    }
-)
-
-# 4) Converta timestamp e reorganize índice (opcional)
-df["datetime"] = pd.to_datetime(df["ts"], unit="s")
-df.set_index("datetime", inplace=True)
-
-# 5) Insere ou anexa ao banco SQLite
-conn = sqlite3.connect(DB_PATH)
-
-# Se quiser recriar a tabela do zero, descomente a próxima linha:
-# conn.execute("DROP TABLE IF EXISTS market_data;")
-
-# Grava no SQLite — se a tabela não existir, ela será criada automaticamente
-df.reset_index(drop=True).to_sql(
-    "market_data",
-    conn,
-    if_exists="append",  # "replace" para apagar antes e criar nova
-    index=False
-)
-
-conn.close()
-
-print("Importação finalizada:", len(df), "registros inseridos.")
+
+# ─── leitura ──────────────────────────────────────────────────────────────
+def trechos(path, tamanho):
+    """(inicio, fim) em bytes de pedaços de ~`tamanho` bytes que terminam em fim de linha."""
+    total = os.path.getsize(path)
+    bordas = [0]
+    with open(path, "rb") as f:
+        while bordas[-1] < total:
+            f.seek(min(bordas[-1] + tamanho, total))
+            f.readline()
+            bordas.append(min(f.tell(), total))
+    return list(zip(bordas[:-1], bordas[1:]))
+
+def ler_trecho(path, inicio, fim, sep, cabecalho):
+    """
+    Parseia um trecho do arquivo; devolve (itens, colunas numéricas, descartadas).
+    Linhas com campos a mais, ts ou item inválidos são descartadas; métricas
+    inválidas viram NULL.
+    """
+    with open(path, "rb") as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    # on_bad_lines com função só existe no engine python (bem mais lento);
+    # no engine C cada linha pulada vira um "Skipping line N" no aviso
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        df = pd.read_csv(io.BytesIO(dados), sep=sep, header=None, names=COLUNAS,
+                         skiprows=1 if cabecalho and inicio == 0 else 0,
+                         dtype=str, keep_default_na=False, on_bad_lines="warn")
+    malformadas = sum(str(a.message).count("Skipping line") for a in avisos
+                      if issubclass(a.category, pd.errors.ParserWarning))
+    num = {c: pd.to_numeric(df[c], errors="coerce") for c in COLUNAS if c != "item"}
+    ok = num["ts"].notna().to_numpy() & (df["item"].str.len() > 0).to_numpy()
+    itens = df["item"].to_numpy()[ok]
+    colunas = {c: v.to_numpy(dtype=float)[ok] for c, v in num.items()}
+    return itens, colunas, int((~ok).sum()) + malformadas
+
+def ler_em_paralelo(pool, em_voo, path, partes, sep, cabecalho):
+    """Como ler_trecho em cada parte, em ordem, com no máximo `em_voo` trechos submetidos."""
+    fila = deque()
+    for i, f in partes:
+        fila.append(pool.submit(ler_trecho, path, i, f, sep, cabecalho))
+        if len(fila) >= em_voo:
+            yield fila.popleft().result()
+    while fila:
+        yield fila.popleft().result()
+
+# ─── gravação ─────────────────────────────────────────────────────────────
+def _ids_itens(conn, nomes, cache):
+    """Ids de `nomes` (array de str), criando os que faltam numa só passada."""
+    unicos = pd.unique(nomes)
+    novos = [n for n in unicos.tolist() if n not in cache]
+    if novos:
+        conn.executemany("INSERT OR IGNORE INTO items(url_name) VALUES (?)",
+                         ((n,) for n in novos))
+        for k in range(0, len(novos), 900):     # limite de parâmetros do SQLite
+            parte = novos[k:k + 900]
+            cache.update(conn.execute(
+                f"SELECT url_name, id FROM items WHERE url_name IN ({','.join('?' * len(parte))})",
+                parte))
+    return np.array([cache[n] for n in nomes.tolist()], dtype=np.int64)
+
+def gravar_trecho(conn, itens, colunas, cache):
+    """
+    Grava um trecho parseado numa transação; devolve (linhas, menor ts,
+    maior ts, {item_id: menor ts do item}).
+    """
+    if not len(itens):
+        return 0, None, None, {}
+    with conn:
+        ids = _ids_itens(conn, itens, cache)
+        ts = colunas["ts"].astype(np.int64)
+        # na ordem da chave (item_id, ts): as páginas da árvore são tocadas uma vez
+        ordem = np.lexsort((ts, ids))
+        metricas = [colunas[c][ordem].astype(object) for c in COLUNAS[2:]]
+        for m in metricas:
+            m[pd.isna(m)] = None
+        ids, ts = ids[ordem], ts[ordem]
+        conn.executemany(INSERT_SERIES_SQL,
+                         zip(ids.tolist(), ts.tolist(), *(m.tolist() for m in metricas)))
+    inicio = np.ones(len(ids), dtype=bool)
+    inicio[1:] = ids[1:] != ids[:-1]
+    return len(ids), int(ts.min()), int(ts.max()), dict(zip(ids[inicio].tolist(), ts[inicio].tolist()))
+
+def importar(path=TSV_PATH, db_path=DB_PATH, bloco_mb=32, processos=1, sep=None, cabecalho=False):
+    """
+    Importa o arquivo em trechos; devolve {"linhas", "descartadas", "segundos"}.
+
+    Os triggers de rollups ficam desligados durante a importação e, no fim,
+    os rollups do intervalo importado são reconstruídos de uma vez. As
+    marcas d'água de features, pontuações, modelo e previsores descem para
+    antes do menor ts importado.
+    """
+    if sep is None:
+        sep = "," if path.lower().endswith(".csv") else "\t"
+    partes = trechos(path, bloco_mb * 2**20)
+    conn = init_db(db_path)
+    conn.execute("PRAGMA cache_size=-256000")
+    t0 = time.perf_counter()
+    linhas = descartadas = 0
+    menor, maior = None, None
+    menores = {}    # item_id -> menor ts importado
+    cache = dict(conn.execute("SELECT url_name, id FROM items"))
+    pool = ProcessPoolExecutor(processos) if processos > 1 else None
+    with conn:
+        desligar_rollups(conn)
+    try:
+        if pool:
+            # pool.map submeteria tudo de uma vez: com gravação mais lenta que o
+            # parse, o arquivo inteiro parseado acabaria esperando na memória
+            lidos = ler_em_paralelo(pool, processos * 2, path, partes, sep, cabecalho)
+        else:
+            lidos = (ler_trecho(path, i, f, sep, cabecalho) for i, f in partes)
+        for k, (itens, colunas, ruins) in enumerate(lidos, 1):
+            n, lo, hi, por_item = gravar_trecho(conn, itens, colunas, cache)
+            linhas += n
+            descartadas += ruins
+            if n:
+                menor = lo if menor is None else min(menor, lo)
+                maior = hi if maior is None else max(maior, hi)
+                for i, t in por_item.items():
+                    menores[i] = min(t, menores.get(i, t))
+            dt = time.perf_counter() - t0
+            print(f"[Ingest] trecho {k}/{len(partes)}: {linhas} linhas, {linhas / dt:,.0f} linhas/s")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        with conn:
+            ligar_rollups(conn)
+            if menor is not None:
+                # até agora: pega também o que o coletor gravou durante a importação
+                reconstruir_rollups(conn, menor, max(maior, int(time.time())))
+                features.invalidar(conn, menores)
+                pontuacao.reabrir_marcas(conn, menor)
+                reabrir_marca(conn, MARCA_MODELO, menor)
+                reabrir_marca(conn, MARCA_PREVISORES, menor)
+        conn.close()
+    return {"linhas": linhas, "descartadas": descartadas, "segundos": time.perf_counter() - t0}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Importa um dump TSV/CSV de market_data")
+    ap.add_argument("arquivo", nargs="?", default=TSV_PATH)
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--bloco", type=int, default=32, help="MB por trecho")
+    ap.add_argument("--processos", type=int, default=1, help="processos para o parse")
+    ap.add_argument("--sep", default=None, help="separador (padrão: pela extensão)")
+    ap.add_argument("--cabecalho", action="store_true", help="a primeira linha é cabeçalho")
+    args = ap.parse_args()
+    r = importar(args.arquivo, args.db, args.bloco, args.processos, args.sep, args.cabecalho)
+    dt = r["segundos"]
+    print(f"Importação finalizada: {r['linhas']} registros em {dt:.1f}s "
+          f"({r['linhas'] / dt if dt else 0:,.0f} linhas/s), {r['descartadas']} linhas inválidas descartadas.")
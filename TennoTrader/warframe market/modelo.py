@@ -0,0 +1,111 @@
+# modelo.py
+
+import os
+import pickle
+import time
+
+import numpy as np
+
+from database import avancar_marca, ler_marca
+
+FEATURE_COLS = ["spread", "demand", "supply", "liquidity", "score"]
+TARGET       = "avg_sell"
+MODEL_PATH   = "modelo.pkl"
+MARGEM_TS    = 10     # s; linhas mais novas que isso podem ainda estar no gravador
+MARCA        = "modelo"   # em `marcas`: até onde o modelo leu market_series
+
+def matriz_features(registros):
+    """Monta a matriz (n_registros × FEATURE_COLS) para um único predict."""
+    return np.array([[r[c] for c in FEATURE_COLS] for r in registros], dtype=float)
+
+class ModeloIncremental:
+    """
+    Regressor de avg_sell treinado aos poucos.
+
+    Guarda o maior ts já aprendido (marca d'água) e em `atualizar` lê só as
+    linhas novas de market_series, passando cada bloco por partial_fit dos
+    StandardScaler (X e y) e do SGDRegressor. A marca também fica no banco
+    (MARCA): importações e lotes gravados atrasados a descem, e o modelo
+    volta a ler dali.
+    """
+
+    def __init__(self, epocas=5, random_state=42):
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler_x   = StandardScaler()
+        self.scaler_y   = StandardScaler()
+        self.reg        = SGDRegressor(random_state=random_state)
+        self.epocas     = epocas
+        self.marca_ts   = -1
+        self.n_amostras = 0
+        self._rng       = np.random.default_rng(random_state)
+
+    @property
+    def pronto(self):
+        return self.n_amostras > 0
+
+    def partial_fit(self, X, y):
+        X = np.nan_to_num(np.asarray(X, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        y = np.asarray(y, dtype=float)
+        ok = np.isfinite(y)
+        X, y = X[ok], y[ok]
+        if not len(y):
+            return self
+        self.scaler_x.partial_fit(X)
+        self.scaler_y.partial_fit(y.reshape(-1, 1))
+        Xs = self.scaler_x.transform(X)
+        ys = self.scaler_y.transform(y.reshape(-1, 1)).ravel()
+        for _ in range(self.epocas):
+            ordem = self._rng.permutation(len(ys))
+            self.reg.partial_fit(Xs[ordem], ys[ordem])
+        self.n_amostras += len(y)
+        return self
+
+    def fit(self, X, y):
+        # interface do sklearn, usada por treino.py com um modelo recém-criado
+        return self.partial_fit(X, y)
+
+    def predict(self, X):
+        X = np.nan_to_num(np.asarray(X, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        ys = self.reg.predict(self.scaler_x.transform(X))
+        return self.scaler_y.inverse_transform(ys.reshape(-1, 1)).ravel()
+
+    def atualizar(self, conn, bloco=50_000):
+        """Treina com as linhas de ts > marca d'água; devolve quantas leu."""
+        limite = int(time.time()) - MARGEM_TS
+        no_banco = ler_marca(conn, MARCA, None)
+        if no_banco is not None and no_banco < self.marca_ts:
+            # linhas gravadas atrás da marca: as já vistas desse trecho entram de novo
+            self.marca_ts = no_banco
+        cur = conn.execute(f"""
+            SELECT ts, {", ".join(FEATURE_COLS)}, {TARGET}
+            FROM market_series WHERE ts > ? AND ts <= ?
+            ORDER BY ts
+        """, (self.marca_ts, limite))
+        lidas = 0
+        while True:
+            linhas = cur.fetchmany(bloco)
+            if not linhas:
+                break
+            dados = np.array(linhas, dtype=float)   # None vira nan
+            self.partial_fit(dados[:, 1:-1], dados[:, -1])
+            self.marca_ts = max(self.marca_ts, int(dados[-1, 0]))
+            lidas += len(linhas)
+        avancar_marca(conn, MARCA, no_banco, self.marca_ts)
+        return lidas
+
+    def salvar(self, path=MODEL_PATH):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def carregar(path=MODEL_PATH):
+        try:
+            with open(path, "rb") as f:
+                modelo = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return modelo if isinstance(modelo, ModeloIncremental) else None
@@ -0,0 +1,458 @@
+# motor.py
+#
+# Coleta, armazenamento e predição, sem nada de interface: a janela Tk
+# (warframe_market.py) e o serviço sem tela (servico.py) usam o mesmo motor.
+# Como antes, o estado fica em globais do módulo (motor.resultados,
+# motor.previsoes, ...), trocadas inteiras quando mudam.
+
+import copy
+import os
+import json
+import threading
+import time
+from collections import deque
+
+import sqlite3
+
+# só módulos leves no import; numpy, requests e sklearn entram pelas
+# threads de fundo (ver inicializar_fundo)
+from database import GravadorLote, avancar_marca, ler_marca, ultimos_registros
+from coletor import Coletor, LimiteTaxa
+from agendador import AgendadorAdaptativo
+from armazem import ArmazemResultados
+from cliente_http import ClienteCondicional, SemMudanca
+from cache_local import CacheIncremental
+import telemetria
+
+# ─── BANCO DE DADOS E MODELO ──────────────────────────────────────────────────
+DB_PATH   = "warframe_market.db"
+# lote atrasado desce a marca do modelo ("modelo" = modelo.MARCA, que puxa numpy)
+gravador  = GravadorLote(DB_PATH, reabrir=("modelo",))
+MODEL     = None
+PREVISORES = None   # previsores por item (ver previsores.py); MODEL cobre o resto
+running   = True
+
+INTERVAL_TREINO   = 300        # s entre atualizações incrementais do modelo
+INTERVAL_REAJUSTE = 24 * 3600  # s entre reajustes completos dos previsores por item
+
+def atualizar_previsores(conn, ajustado_em):
+    """Reajusta os previsores se passou INTERVAL_REAJUSTE; senão só empurra as observações novas."""
+    global PREVISORES
+    from previsores import MARCA, RegistroPrevisores, PREVISORES_PATH
+    no_banco = ler_marca(conn, MARCA, None)
+    # importação atrás do que já foi visto: o estado por item não volta, reajusta
+    reaberto = PREVISORES is not None and no_banco is not None and no_banco < PREVISORES.marca_ts
+    if PREVISORES is None or reaberto or time.time() - ajustado_em >= INTERVAL_REAJUSTE:
+        novo, ajustado_em = RegistroPrevisores.ajustar(conn), time.time()
+        print(f"[ML] {len(novo)} previsores por item ajustados ({novo.nbytes / 1024:.0f} KiB)")
+    else:
+        novo, usadas = PREVISORES.atualizar(conn)
+        if not usadas:
+            return ajustado_em
+    PREVISORES = novo
+    avancar_marca(conn, MARCA, no_banco, novo.marca_ts)
+    try:
+        novo.salvar(PREVISORES_PATH)
+    except OSError as e:
+        # no Windows o arquivo antigo pode ainda estar mapeado; tenta no próximo ciclo
+        print(f"[ML] Não foi possível salvar os previsores: {e}")
+    return ajustado_em
+
+def train_model():
+    global MODEL, PREVISORES
+    from modelo import ModeloIncremental, MODEL_PATH
+    from previsores import RegistroPrevisores, PREVISORES_PATH
+    t0 = time.perf_counter()
+    modelo = ModeloIncremental.carregar(MODEL_PATH)
+    if modelo is not None and modelo.pronto:
+        MODEL = modelo
+        print(f"[ML] Modelo carregado em {(time.perf_counter()-t0)*1000:.0f} ms "
+              f"({modelo.n_amostras} registros, até ts {modelo.marca_ts})")
+    else:
+        modelo = ModeloIncremental()
+    PREVISORES = RegistroPrevisores.carregar(PREVISORES_PATH)
+    ajustado_em = os.path.getmtime(PREVISORES_PATH) if PREVISORES is not None else 0.0
+
+    while running:
+        # treina numa cópia para não mexer no modelo que está prevendo
+        novo = copy.deepcopy(modelo)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            novas = novo.atualizar(conn)
+            ajustado_em = atualizar_previsores(conn, ajustado_em)
+        finally:
+            conn.close()
+        if novas:
+            novo.salvar(MODEL_PATH)
+            modelo = MODEL = novo
+            print(f"[ML] Modelo atualizado com {novas} registros novos "
+                  f"(total {modelo.n_amostras})")
+        time.sleep(INTERVAL_TREINO)
+
+# ─── PARÂMETROS GLOBAIS ───────────────────────────────────────────────────────
+BASE_URL        = "https://api.warframe.market/v1"
+HEADERS         = {
+    "Accept":"application/json",
+    "Content-Type":"application/json",
+    "platform":"pc",
+    "language":"en"
+}
+CACHE_FILE      = "cache.json"  # formato antigo; só importado uma vez para CACHE_DIR
+CACHE_DIR       = "cache"       # log binário dos resultados (ver cache_local.py)
+TELEMETRIA_PATH = "telemetria.json"  # despejo periódico de telemetria.instantaneo()
+SNAPSHOT_DIR    = "snapshots"   # livros de ordens brutos (ver snapshots.py)
+HTTP_CACHE_DIR  = "http_cache"  # respostas + ETag por endpoint (ver cliente_http.py)
+CONCORRENCIA    = 6     # requisições simultâneas
+TAXA_API        = 3.0   # req/s permitidas pela API
+ORCAMENTO_REQ   = 2.5   # req/s que o agendador pode planejar (< TAXA_API)
+INTERVAL_WORKER = 30    # s entre ciclos de predição
+INTERVAL_AGENDA = 1     # s entre consultas à agenda quando nada vence
+INTERVAL_LOG    = 60    # s entre linhas de log da coleta
+INTERVAL_TELEMETRIA = 60  # s entre despejos de TELEMETRIA_PATH
+INTERVAL_CACHE  = 5     # s entre descargas do log de CACHE_DIR
+TENTATIVAS_CATALOGO = 3   # buscas de /items com 429 antes de desistir
+
+fila        = deque()
+resultados  = ArmazemResultados()  # item -> Registro versionado (ver armazem.py)
+previsoes   = {}  # {'item': pred_sell}; trocado inteiro a cada ciclo
+versao_previsoes = 0  # sobe a cada troca de `previsoes`
+latencia_pred = 0.0   # s gastos no último ciclo de predição
+motor_alertas = None  # MotorAlertas (alertas.py) se alertas.json tiver regras
+formulas    = {}  # nome -> Formula de pontuacoes.json (pontuacao.py)
+pontuacoes  = {}  # item -> {fórmula: valor} da última coleta
+calculados  = set()  # itens com métricas registradas por este processo
+
+# ─── SESSÃO HTTP COM RETRIES ─────────────────────────────────────────────────
+session   = None
+cliente   = None
+snapshots = None
+
+def iniciar_rede():
+    # chamado em segundo plano: requests e numpy (via snapshots) não atrasam a abertura
+    global session, cliente, snapshots
+    import requests
+    import urllib3
+    from snapshots import ArmazemSnapshots
+
+    session = requests.Session()
+    retries = urllib3.util.retry.Retry(
+        total=3, backoff_factor=1,
+        status_forcelist=[500,502,503,504]   # 429 fica com o limitador do coletor
+    )
+    adapter = requests.adapters.HTTPAdapter(max_retries=retries,
+                                            pool_maxsize=CONCORRENCIA)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    cliente   = ClienteCondicional(session, BASE_URL, HEADERS, HTTP_CACHE_DIR)
+    snapshots = ArmazemSnapshots(SNAPSHOT_DIR)
+
+# ─── CACHE ────────────────────────────────────────────────────────────────────
+# cada resultado novo entra no log em registrar_resultado e vai para o disco a
+# cada INTERVAL_CACHE pelo cache_worker (uma varredura do coletor pode durar
+# minutos); no fechamento o log é compactado com as previsões
+cache_disco = CacheIncremental(CACHE_DIR)
+
+def salvar_cache():
+    try:
+        cache_disco.gravar_varios(resultados.valores(), previsoes)
+        cache_disco.descarregar()
+        cache_disco.compactar()
+    except OSError as e:
+        telemetria.erro("cache", e)
+
+def descarregar_cache():
+    try:
+        cache_disco.descarregar()
+    except OSError as e:
+        telemetria.erro("cache", e)
+
+def carregar_cache(path=CACHE_FILE):
+    if not len(cache_disco) and os.path.exists(path):
+        n = cache_disco.importar_json(path)
+        print(f"[Cache] {n} itens importados de {path}")
+    return cache_disco.carregar()
+
+# ─── API / CÁLCULO ────────────────────────────────────────────────────────────
+def safe_request(endpoint, so_se_mudou=False):
+    rota = "orders" if endpoint.endswith("/orders") else endpoint.strip("/")
+    t0 = time.perf_counter()
+    resp, corpo, mudou = cliente.get(endpoint)
+    telemetria.observar("http", time.perf_counter() - t0, rota=rota, status=resp.status_code)
+    telemetria.contar("http_bytes", len(corpo), rota=rota)
+    # tentativas que o Retry do urllib3 fez por baixo (500/502/503/504)
+    retries = getattr(getattr(resp.raw, "retries", None), "history", ())
+    if retries:
+        telemetria.contar("http_retries", len(retries), rota=rota)
+    if resp.status_code == 504:
+        raise RuntimeError("API em manutenção")
+    if resp.status_code == 429:
+        espera = resp.headers.get("Retry-After", "")
+        raise LimiteTaxa(float(espera) if espera.isdigit() else None)
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    if so_se_mudou and not mudou:
+        raise SemMudanca(endpoint)   # nem decodifica o JSON
+    return json.loads(corpo)
+
+def get_all_items():
+    # None = API indisponível (descobrir_catalogo avisa e o serviço tenta de novo)
+    for tentativa in range(TENTATIVAS_CATALOGO):
+        try:
+            return [i["url_name"] 
+                    for i in safe_request("/items")["payload"]["items"]]
+        except LimiteTaxa as e:
+            # o 429 é do limitador do coletor, que ainda nem começou: espera aqui
+            telemetria.contar("http_429", rota="items")
+            if tentativa + 1 < TENTATIVAS_CATALOGO:
+                time.sleep(e.espera if e.espera is not None else 5 * 2 ** tentativa)
+        except RuntimeError:
+            return None
+        except Exception as e:
+            telemetria.erro("get_all_items", e)
+            return []
+    return None
+
+def get_orders(item, so_se_mudou=True):
+    try:
+        orders = safe_request(f"/items/{item}/orders",
+                              so_se_mudou=so_se_mudou)["payload"]["orders"]
+        try:
+            snapshots.gravar(item, orders)
+        except Exception as e:
+            # disco cheio, order_type novo, ...: o snapshot se perde, o livro não
+            telemetria.erro("snapshots", e)
+        sells = [o for o in orders 
+                 if o["order_type"]=="sell" and o["user"]["status"] in ("online","ingame")]
+        buys  = [o for o in orders 
+                 if o["order_type"]=="buy"  and o["user"]["status"] in ("online","ingame")]
+        return sells, buys
+    except (LimiteTaxa, SemMudanca):
+        raise
+    except RuntimeError:
+        return None, None
+    except Exception as e:
+        telemetria.erro("get_orders", e)
+        return [], []
+
+def calcular_dados(item):
+    from analise_dados import calcular_metricas
+    try:
+        # o http_cache sobrevive a um reinício e os resultados não: livro sem
+        # mudança só é pulado se este processo já registrou as métricas dele
+        sells, buys = get_orders(item, so_se_mudou=item in calculados)
+    except SemMudanca:
+        return None   # livro igual ao anterior: métricas já estão em resultados
+    if sells is None:
+        raise RuntimeError("API manutenção")
+    if not sells and not buys:
+        return None
+    with telemetria.medir("metricas"):
+        rec = {"item":item, **calcular_metricas(sells, buys)}
+    if formulas:
+        from pontuacao import pontuar
+        try:
+            valores = pontuar(formulas, rec)
+        except Exception as e:      # nunca perde o registro por causa de uma fórmula
+            telemetria.erro("pontuacao", e)
+            valores = {}
+        # o "score" gravado em market_series é sempre o embutido (entrada do
+        # modelo); uma fórmula "score" do usuário fica só em rec["pontuacoes"]
+        rec["pontuacoes"] = valores
+    return rec
+
+# ─── WORKERS ─────────────────────────────────────────────────────────────────
+def registrar_resultado(rec):
+    telemetria.contar("resultados")
+    calculados.add(rec["item"])
+    gravador.gravar(rec)
+    resultados.atualizar(rec)
+    cache_disco.gravar(rec, previsoes.get(rec["item"], 0.0))
+    if "pontuacoes" in rec:
+        pontuacoes[rec["item"]] = rec["pontuacoes"]
+    if motor_alertas is not None:
+        try:
+            with telemetria.medir("alertas"):
+                motor_alertas.avaliar(rec)
+        except Exception as e:
+            telemetria.erro("alertas", e)
+
+agendador = AgendadorAdaptativo(orcamento=ORCAMENTO_REQ)
+
+def agendar_novos():
+    # itens novos entram na agenda já vencidos; o coletor pede os mais atrasados antes
+    while fila:
+        item = fila.popleft()
+        agendador.adicionar(item, resultados.get(item))
+
+coletor = Coletor(calcular_dados, ao_resultado=registrar_resultado,
+                  concorrencia=CONCORRENCIA, taxa=TAXA_API,
+                  fonte=agendador.vencidos, apos_busca=agendador.observar)
+
+def semear_agendador(janela_s=24 * 3600):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        agendador.semear(conn.execute("""
+            SELECT i.url_name, s.avg_sell
+            FROM market_series s JOIN items i ON i.id = s.item_id
+            WHERE s.ts >= ? ORDER BY s.item_id, s.ts
+        """, (int(time.time()) - janela_s,)))
+    finally:
+        conn.close()
+
+def data_worker():
+    while running:
+        if fila:
+            # catálogo (re)descoberto: a volatilidade do histórico entra antes
+            # da varredura, senão os itens saem todos com o intervalo padrão
+            agendar_novos()
+            try:
+                semear_agendador()
+            except sqlite3.Error as e:
+                telemetria.erro("agendador", e)
+        coletor.varrer_bloqueante(lambda: running)
+        time.sleep(INTERVAL_AGENDA)
+
+def log_coleta():
+    # à parte do data_worker: uma varredura pode durar mais que INTERVAL_LOG
+    ultimo_log, req_log = time.monotonic(), 0
+    while running:
+        time.sleep(INTERVAL_LOG)
+        ag, hc = agendador.estatisticas(), cliente.estatisticas()
+        dt = time.monotonic() - ultimo_log
+        print(f"[Coleta] {(ag['requisicoes'] - req_log) / dt:.2f} req/s "
+              f"| frescor/req: {ag['frescor_por_req']:.2f} "
+              f"| idade média: {ag['idade_media']:.0f}s "
+              f"| fator orçamento: {ag['fator']:.1f} "
+              f"| cache HTTP: {hc['hits']} hits, {hc['misses']} misses")
+        ultimo_log, req_log = time.monotonic(), ag["requisicoes"]
+
+def predictions_worker():
+    global previsoes, versao_previsoes, latencia_pred
+    from modelo import matriz_features
+    while MODEL is None:
+        time.sleep(0.5)
+    while running:
+        t0 = time.perf_counter()
+        registros = resultados.valores()
+        if registros:
+            try:
+                preds = MODEL.predict(matriz_features(registros))
+                if PREVISORES is not None:
+                    preds = PREVISORES.prever([r["item"] for r in registros], preds)
+                # uma única atribuição: a UI vê o conjunto antigo ou o novo, nunca metade
+                previsoes = {r["item"]: float(p) for r, p in zip(registros, preds)}
+                versao_previsoes += 1
+            except Exception as e:
+                telemetria.erro("predicao", e)
+        latencia_pred = time.perf_counter() - t0
+        telemetria.observar("predicao", latencia_pred)
+        print(f"[ML] {len(registros)} predições em {latencia_pred*1000:.1f} ms")
+        time.sleep(INTERVAL_WORKER)
+
+# ─── INICIALIZAÇÃO: CACHE PRIMEIRO, CATÁLOGO EM SEGUNDO PLANO ─────────────────
+aviso_catalogo = None   # (tipo, título, texto) para quem estiver usando o motor mostrar
+
+def carregar_inicial():
+    """Preenche resultados com o cache ou, sem ele, com o último registro de cada item no banco."""
+    global previsoes, versao_previsoes
+    cache = carregar_cache()
+    if cache:
+        resultados.atualizar_varios(cache.values())
+        previsoes = {k: d.get("pred_sell", 0.0) for k, d in cache.items()}
+        versao_previsoes += 1
+        return "cache"
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        resultados.atualizar_varios(ultimos_registros(conn))
+    except sqlite3.Error as e:
+        print(f"[DB] Sem registros iniciais: {e}")
+    finally:
+        conn.close()
+    return "banco"
+
+def descobrir_catalogo():
+    global aviso_catalogo
+    items = get_all_items()
+    if items is None:
+        if len(resultados):
+            aviso_catalogo = ("aviso", "Manutenção", "API indisponível, usando cache.")
+        else:
+            aviso_catalogo = ("erro", "Manutenção",
+                "API indisponível e sem cache.\nEncerre o app e tente mais tarde.")
+    else:
+        fila.extend(items)
+
+def iniciar_alertas():
+    """
+    Carrega alertas.json e semeia as médias móveis com o banco; sem regras,
+    fica desligado. Banco ilegível não desliga os alertas, só a semeadura.
+    """
+    global motor_alertas
+    from alertas import criar_motor
+    novo = criar_motor()
+    if not novo.regras:
+        novo.fechar()
+        return
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            novo.semear(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        # sem o histórico as médias começam no primeiro registro de cada item
+        telemetria.erro("alertas", e)
+    motor_alertas = novo
+    print(f"[Alertas] {len(novo.regras)} regras ativas")
+
+def pontuacoes_worker():
+    # leva as fórmulas ao histórico; expressão mudada refaz o histórico dela
+    from pontuacao import atualizar_pontuacoes
+    while running:
+        try:
+            with telemetria.medir("pontuacoes"):
+                n = atualizar_pontuacoes(DB_PATH, formulas)
+            if n:
+                print(f"[Pontuação] {n} valores gravados")
+        except Exception as e:
+            telemetria.erro("pontuacoes", e)
+        time.sleep(INTERVAL_TREINO)
+
+def cache_worker():
+    while running:
+        time.sleep(INTERVAL_CACHE)
+        descarregar_cache()
+
+def despejar_telemetria():
+    while running:
+        time.sleep(INTERVAL_TELEMETRIA)
+        try:
+            telemetria.despejar_json(TELEMETRIA_PATH)
+        except OSError as e:
+            telemetria.erro("telemetria", e)
+
+def inicializar_fundo():
+    global formulas
+    from pontuacao import carregar_formulas
+    iniciar_rede()
+    formulas = carregar_formulas()
+    for alvo in (train_model, data_worker, log_coleta, predictions_worker, cache_worker,
+                 despejar_telemetria, iniciar_alertas, pontuacoes_worker):
+        threading.Thread(target=alvo, daemon=True).start()
+    descobrir_catalogo()
+
+def parar():
+    """Para as threads e grava o que falta (cache compactado, lote do gravador)."""
+    global running
+    running = False
+    coletor.fechar()
+    salvar_cache()
+    cache_disco.fechar()
+    gravador.close()
+    if motor_alertas is not None:
+        motor_alertas.fechar()
+    try:
+        telemetria.despejar_json(TELEMETRIA_PATH)
+    except OSError as e:
+        print(f"[Telemetria] Falha ao gravar {TELEMETRIA_PATH}: {e}")
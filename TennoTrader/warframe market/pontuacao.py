@@ -0,0 +1,241 @@
+# pontuacao.py
+#
+# Pontuações nomeadas definidas pelo usuário em pontuacoes.json, por exemplo:
+#   {"score":  "liquidity * 3 + (demand - supply) + (10 - spread)",
+#    "margem": "(avg_sell - avg_buy) / max(avg_buy, 1) * 100",
+#    "giro":   "where(liquidity >= 5, log1p(demand) * spread, 0)"}
+# Cada expressão é checada (só colunas de market_series, números, + - * / %
+# **, comparações e as funções de FUNCOES com o número certo de argumentos),
+# testada num registro de mentira e compilada uma vez; a mesma
+# fórmula roda num registro (ao vivo, em calcular_dados) ou em colunas numpy
+# inteiras (histórico). Os valores ficam à parte (registro["pontuacoes"] e
+# a tabela `pontuacoes`): a coluna score de market_series continua sendo a
+# de calcular_metricas, mesmo com uma fórmula chamada "score".
+#
+# atualizar_pontuacoes grava os valores na tabela `pontuacoes` (esquema v4),
+# cada fórmula com a sua marca d'água; fórmula nova ou com a expressão
+# mudada é pontuada de novo sobre todo o histórico, sem recoletar nada.
+#   python pontuacao.py [--reconstruir] [--formulas pontuacoes.json]
+
+import argparse
+import ast
+import json
+import math
+import sqlite3
+import time
+from itertools import repeat
+
+import numpy as np
+
+import telemetria
+from database import DB_PATH, METRICAS, gravar_marca, init_db, ler_marca
+
+FORMULAS_FILE = "pontuacoes.json"
+MARGEM_TS     = 10      # s; linhas mais novas podem ainda estar no gravador
+FUNCOES = {
+    "abs": np.abs, "sqrt": np.sqrt, "log": np.log, "log1p": np.log1p, "exp": np.exp,
+    "min": np.minimum, "max": np.maximum, "clip": np.clip, "where": np.where,
+}
+ARIDADE = {"abs": 1, "sqrt": 1, "log": 1, "log1p": 1, "exp": 1,
+           "min": 2, "max": 2, "clip": 3, "where": 3}
+_NOS = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+    ast.Gt, ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq,
+)
+_INSERT = "INSERT OR REPLACE INTO pontuacoes VALUES (?, ?, ?, ?)"
+
+def _marca(nome):
+    return f"pontuacao:{nome}"
+
+class Formula:
+    """Uma expressão nomeada sobre as colunas de market_series, já compilada."""
+
+    def __init__(self, nome, expressao):
+        self.nome      = nome
+        self.expressao = expressao
+        try:
+            arvore = ast.parse(expressao, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"fórmula {nome}: {e.msg}") from None
+        chamadas = {id(no.func) for no in ast.walk(arvore) if isinstance(no, ast.Call)}
+        campos = set()
+        for no in ast.walk(arvore):
+            if not isinstance(no, _NOS):
+                raise ValueError(f"fórmula {nome}: {type(no).__name__} não é permitido")
+            if isinstance(no, ast.Constant) and (isinstance(no.value, bool)
+                                                 or not isinstance(no.value, (int, float))):
+                raise ValueError(f"fórmula {nome}: constante {no.value!r} não é número")
+            if isinstance(no, ast.Compare) and len(no.ops) > 1:
+                raise ValueError(f"fórmula {nome}: comparação encadeada; use where()")
+            if isinstance(no, ast.Call):
+                if not isinstance(no.func, ast.Name) or no.keywords:
+                    raise ValueError(f"fórmula {nome}: só chamadas simples de {', '.join(FUNCOES)}")
+                n = ARIDADE.get(no.func.id)
+                if n is not None and len(no.args) != n:
+                    raise ValueError(f"fórmula {nome}: {no.func.id}() recebe {n} argumento(s), "
+                                     f"não {len(no.args)}")
+            if isinstance(no, ast.Name):
+                if id(no) in chamadas:
+                    if no.id not in FUNCOES:
+                        raise ValueError(f"fórmula {nome}: função desconhecida {no.id!r}")
+                elif no.id in METRICAS:
+                    campos.add(no.id)
+                else:
+                    raise ValueError(f"fórmula {nome}: campo desconhecido {no.id!r}")
+        self.campos  = tuple(sorted(campos))
+        # constantes viram np.float64 (nomes _k0, _k1, ...): 10**10**10 dá inf
+        # em vez de um inteiro sem limite calculado pelo Python
+        self._globais = {"__builtins__": {}, **FUNCOES}
+        arvore = _Constantes(self._globais).visit(arvore)
+        self._codigo = compile(ast.fix_missing_locations(arvore), f"<fórmula {nome}>", "eval")
+        # erros que só aparecem ao rodar (tipos, formas) ficam na carga, não na coleta
+        try:
+            float(self.avaliar({c: np.float64(1.0) for c in METRICAS}))
+            np.broadcast_to(self.avaliar({c: np.ones(2) for c in METRICAS}), 2)
+        except Exception as e:
+            raise ValueError(f"fórmula {nome}: {type(e).__name__}: {e}") from None
+
+    def avaliar(self, colunas):
+        """Valor da fórmula para `colunas` (campo -> número ou array numpy)."""
+        with np.errstate(all="ignore"):
+            return eval(self._codigo, self._globais, colunas)
+
+class _Constantes(ast.NodeTransformer):
+    def __init__(self, globais):
+        self.globais = globais
+
+    def visit_Constant(self, no):
+        nome = f"_k{len(self.globais)}"
+        self.globais[nome] = np.float64(no.value)
+        return ast.copy_location(ast.Name(id=nome, ctx=ast.Load()), no)
+
+def carregar_formulas(path=FORMULAS_FILE):
+    """{nome: Formula} de `path` (objeto JSON nome -> expressão); arquivo ausente = nenhuma."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"[Pontuação] Ignorando {path}: {e}")
+        return {}
+    formulas = {}
+    for nome, expressao in dados.items():
+        try:
+            formulas[nome] = Formula(nome, expressao)
+        except (ValueError, TypeError) as e:
+            print(f"[Pontuação] Ignorando {e}")
+    return formulas
+
+def pontuar(formulas, rec):
+    """
+    {nome: valor} de todas as fórmulas para um registro; não finito vira
+    None, e uma fórmula que falha também (conta em telemetria), sem derrubar
+    as outras nem o registro.
+    """
+    colunas = {c: np.float64(np.nan if rec.get(c) is None else rec[c]) for c in METRICAS}
+    saida = {}
+    for nome, f in formulas.items():
+        try:
+            v = float(f.avaliar(colunas))
+        except Exception as e:
+            telemetria.erro(f"formula_{nome}", e)
+            v = math.nan
+        saida[nome] = round(v, 2) if math.isfinite(v) else None
+    return saida
+
+# ─── histórico ────────────────────────────────────────────────────────────
+def _sincronizar(conn, formulas, reconstruir):
+    """Acerta a tabela `formulas` com `formulas`; devolve ({nome: id}, {nome: marca})."""
+    guardadas = {nome: (fid, expr) for fid, nome, expr in
+                 conn.execute("SELECT id, nome, expressao FROM formulas")}
+    for nome, (fid, _) in guardadas.items():
+        if nome not in formulas:
+            conn.execute("DELETE FROM pontuacoes WHERE formula_id = ?", (fid,))
+            conn.execute("DELETE FROM formulas WHERE id = ?", (fid,))
+            conn.execute("DELETE FROM marcas WHERE nome = ?", (_marca(nome),))
+    ids, marcas = {}, {}
+    for nome, f in formulas.items():
+        fid, expr = guardadas.get(nome, (None, None))
+        if fid is None:
+            fid = conn.execute("INSERT INTO formulas(nome, expressao) VALUES (?, ?)",
+                               (nome, f.expressao)).lastrowid
+        elif reconstruir or expr != f.expressao:
+            conn.execute("DELETE FROM pontuacoes WHERE formula_id = ?", (fid,))
+            conn.execute("UPDATE formulas SET expressao = ? WHERE id = ?", (f.expressao, fid))
+            conn.execute("DELETE FROM marcas WHERE nome = ?", (_marca(nome),))
+        ids[nome] = fid
+        marcas[nome] = ler_marca(conn, _marca(nome))
+    return ids, marcas
+
+def reabrir_marcas(conn, desde):
+    """Faz todas as fórmulas pontuarem de novo as linhas com ts >= `desde` (importação)."""
+    conn.execute("UPDATE marcas SET ts = ? WHERE nome LIKE 'pontuacao:%' AND ts >= ?",
+                 (desde - 1, desde))
+
+def _pontuar_intervalo(conn, leitor, grupo, ids, desde, ate, bloco):
+    campos = sorted(set().union(*(f.campos for f in grupo)))
+    # do zero: varre pela chave (item_id, ts), que é a ordem de `pontuacoes`;
+    # incremental: pelo índice de ts, que só toca as linhas novas
+    filtro = "+ts > ? AND +ts <= ? ORDER BY item_id, ts" if desde < 0 else "ts > ? AND ts <= ?"
+    cur = leitor.execute(f"SELECT item_id, ts{''.join(', ' + c for c in campos)} "
+                         f"FROM market_series WHERE {filtro}", (desde, ate))
+    gravados, maior_ts = 0, desde
+    while True:
+        linhas = cur.fetchmany(bloco)
+        if not linhas:
+            return gravados, maior_ts
+        dados = np.array(linhas, dtype=float)
+        item_ids = dados[:, 0].astype(np.int64).tolist()
+        ts = dados[:, 1].astype(np.int64)
+        colunas = {c: dados[:, k + 2] for k, c in enumerate(campos)}
+        with conn:
+            for f in grupo:
+                valores = np.broadcast_to(f.avaliar(colunas), len(dados)).astype(float)
+                valores[~np.isfinite(valores)] = np.nan        # NaN é gravado como NULL
+                conn.executemany(_INSERT, zip(repeat(ids[f.nome]), item_ids, ts.tolist(),
+                                              valores.tolist()))
+        gravados += len(dados) * len(grupo)
+        maior_ts = max(maior_ts, int(ts.max()))
+
+def atualizar_pontuacoes(path=DB_PATH, formulas=None, bloco=500_000, reconstruir=False):
+    """
+    Grava em `pontuacoes` os valores de cada fórmula para as linhas de
+    market_series depois da marca dela. Fórmula nova, com expressão mudada
+    ou `reconstruir`: apaga e refaz todo o histórico dela. Fórmulas que
+    saíram de `formulas` têm as linhas apagadas. Devolve quantos valores
+    foram gravados.
+    """
+    formulas = carregar_formulas() if formulas is None else formulas
+    conn = init_db(path)
+    leitor = sqlite3.connect(path)
+    try:
+        with conn:
+            ids, marcas = _sincronizar(conn, formulas, reconstruir)
+        limite = int(time.time()) - MARGEM_TS
+        gravados = 0
+        # fórmulas com a mesma marca dividem a mesma leitura de market_series
+        for marca in sorted(set(marcas.values())):
+            grupo = [f for f in formulas.values() if marcas[f.nome] == marca]
+            n, maior_ts = _pontuar_intervalo(conn, leitor, grupo, ids, marca, limite, bloco)
+            with conn:
+                for f in grupo:
+                    gravar_marca(conn, _marca(f.nome), maior_ts)
+            gravados += n
+        return gravados
+    finally:
+        leitor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pontua o histórico com as fórmulas do usuário")
+    ap.add_argument("--formulas", default=FORMULAS_FILE)
+    ap.add_argument("--banco", default=DB_PATH)
+    ap.add_argument("--reconstruir", action="store_true", help="refaz todas desde o início")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    n = atualizar_pontuacoes(args.banco, carregar_formulas(args.formulas),
+                             reconstruir=args.reconstruir)
+    dt = time.perf_counter() - t0
+    print(f"[Pontuação] {n} valores em {dt:.2f}s ({n / dt if dt else 0:,.0f}/s)")
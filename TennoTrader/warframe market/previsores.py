@@ -0,0 +1,203 @@
+# previsores.py
+#
+# Previsores de série temporal por item: para cada item com histórico
+# suficiente, o próximo avg_sell vem de uma suavização exponencial simples
+# (SES) ou de um AR(2), o que errou menos um passo à frente no histórico.
+# Todos ficam numa única tabela numpy estruturada (~130 bytes por item),
+# salva em .npy e aberta com mmap; itens esparsos caem no modelo global.
+
+import os
+import time
+
+import numpy as np
+
+PREVISORES_PATH = "previsores.npy"
+MARGEM_TS       = 10      # s; linhas mais novas que isso podem ainda estar no gravador
+MARCA           = "previsores"  # em `marcas`: até onde os previsores leram market_series
+
+SEM, SES, AR2 = 0, 1, 2
+ALFAS = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+
+DTYPE = np.dtype([
+    ("item",  "S80"),
+    ("tipo",  "i1"),
+    ("n",     "i4"),      # observações vistas
+    ("ts",    "i8"),      # ts da última observação
+    ("x1",    "f4"),      # última observação
+    ("x2",    "f4"),      # penúltima
+    ("nivel", "f4"),      # nível da SES
+    ("alfa",  "f4"),
+    ("c",     "f4"),      # AR(2): x = c + a1·x1 + a2·x2
+    ("a1",    "f4"),
+    ("a2",    "f4"),
+    ("erro",  "f4"),      # MSE um passo à frente no ajuste
+])
+
+# ─── ajuste vetorizado ────────────────────────────────────────────────────
+def _ajustar_ar2(g, x, pos, n_grupos, escala):
+    """AR(2) por grupo via equações normais somadas com bincount (x normalizado)."""
+    ok = pos >= 2
+    gi, y, z1, z2 = g[ok], x[ok], np.roll(x, 1)[ok], np.roll(x, 2)[ok]
+    termos = (np.ones_like(y), z1, z2)
+    A = np.empty((n_grupos, 3, 3))
+    b = np.empty((n_grupos, 3))
+    for i in range(3):
+        b[:, i] = np.bincount(gi, termos[i] * y, n_grupos)
+        for j in range(i, 3):
+            A[:, i, j] = A[:, j, i] = np.bincount(gi, termos[i] * termos[j], n_grupos)
+    # ridge leve nos coeficientes: preço parado deixa a matriz singular
+    A[:, 1, 1] += 1e-3
+    A[:, 2, 2] += 1e-3
+    A[:, 0, 0] += 1e-9
+    coef = np.linalg.solve(A, b[..., None])[..., 0]
+    res = y - (coef[gi, 0] + coef[gi, 1] * z1 + coef[gi, 2] * z2)
+    n_res = np.bincount(gi, minlength=n_grupos)
+    mse = np.bincount(gi, res ** 2, n_grupos) / np.maximum(n_res - 3, 1) * escala ** 2
+    return coef, mse
+
+def _ajustar_ses(grade, n_obs):
+    """SES em todos os grupos e alfas de uma vez; `grade` é (grupos × T) com NaN à direita."""
+    nivel = np.repeat(grade[:, :1], len(ALFAS), axis=1)
+    sse = np.zeros_like(nivel)
+    for t in range(1, grade.shape[1]):
+        x = grade[:, t:t + 1]
+        valido = ~np.isnan(x)
+        e = np.where(valido, x - nivel, 0.0)
+        sse += e ** 2
+        nivel += ALFAS * e
+    melhor = np.argmin(sse, axis=1)
+    linhas = np.arange(len(grade))
+    mse = sse[linhas, melhor] / np.maximum(n_obs - 1, 1)
+    return ALFAS[melhor], nivel[linhas, melhor], mse
+
+class RegistroPrevisores:
+    """
+    Previsores compactos de todos os itens numa tabela estruturada (DTYPE).
+
+    `ajustar` monta a tabela a partir de market_series; `atualizar` só
+    empurra as observações novas no estado (x1, x2, nível) sem reajustar os
+    parâmetros; `prever` devolve o próximo avg_sell de vários itens de uma
+    vez, usando a previsão do modelo global onde não há previsor. O estado
+    só anda para a frente: linhas gravadas atrás de `marca_ts` (importação)
+    pedem um novo `ajustar`.
+    """
+
+    def __init__(self, tabela):
+        self.tabela  = tabela
+        self._indice = {nome.decode(): i for i, nome in enumerate(tabela["item"].tolist())}
+
+    def __len__(self):
+        return len(self.tabela)
+
+    @property
+    def marca_ts(self):
+        return int(self.tabela["ts"].max()) if len(self.tabela) else -1
+
+    @property
+    def nbytes(self):
+        return self.tabela.nbytes
+
+    @classmethod
+    def ajustar(cls, conn, dias=30, min_amostras=20, janela=500):
+        """
+        Ajusta SES e AR(2) nos últimos `dias` de cada item (no máximo `janela`
+        pontos) e fica com o de menor erro. Itens com menos de `min_amostras`
+        observações ficam de fora e usam o modelo global.
+        """
+        linhas = conn.execute("""
+            SELECT item_id, ts, avg_sell FROM market_series
+            WHERE ts >= ? AND ts <= ? AND avg_sell > 0
+            ORDER BY item_id, ts
+        """, (int(time.time()) - dias * 86400, int(time.time()) - MARGEM_TS)).fetchall()
+        if not linhas:
+            return cls(np.zeros(0, dtype=DTYPE))
+        dados = np.array(linhas, dtype=float)
+        ids, ts, x = dados[:, 0].astype(np.int64), dados[:, 1].astype(np.int64), dados[:, 2]
+        nomes = dict(conn.execute("SELECT id, url_name FROM items"))
+        inicio = np.ones(len(x), dtype=bool)
+        inicio[1:] = ids[1:] != ids[:-1]
+        g = np.cumsum(inicio) - 1
+        ini = np.flatnonzero(inicio)
+        n_grupos = len(ini)
+
+        # só os últimos `janela` pontos de cada item
+        fim = np.append(ini[1:], len(x))
+        manter = np.arange(len(x)) >= np.repeat(np.maximum(ini, fim - janela), fim - ini)
+        g, x, ts = g[manter], x[manter], ts[manter]
+        n_obs = np.bincount(g, minlength=n_grupos)
+        ini = np.concatenate(([0], np.cumsum(n_obs)[:-1]))
+        pos = np.arange(len(x)) - ini[g]
+        ult = ini + n_obs - 1
+
+        escala = np.bincount(g, x, n_grupos) / n_obs     # preço médio do item
+        xn = x / escala[g]
+        coef, mse_ar = _ajustar_ar2(g, xn, pos, n_grupos, escala)
+
+        grade = np.full((n_grupos, int(n_obs.max())), np.nan)
+        grade[g, pos] = x
+        alfa, nivel, mse_ses = _ajustar_ses(grade, n_obs)
+
+        usar_ar = mse_ar < mse_ses
+        tabela = np.zeros(n_grupos, dtype=DTYPE)
+        tabela["item"]  = [nomes[i].encode() for i in ids[inicio].tolist()]
+        tabela["tipo"]  = np.where(n_obs < min_amostras, SEM, np.where(usar_ar, AR2, SES))
+        tabela["n"]     = n_obs
+        tabela["ts"]    = ts[ult]
+        tabela["x1"]    = x[ult]
+        tabela["x2"]    = np.where(n_obs > 1, x[np.maximum(ult - 1, ini)], x[ult])
+        tabela["nivel"] = nivel
+        tabela["alfa"]  = alfa
+        tabela["c"]     = coef[:, 0] * escala
+        tabela["a1"]    = coef[:, 1]
+        tabela["a2"]    = coef[:, 2]
+        tabela["erro"]  = np.where(usar_ar, mse_ar, mse_ses)
+        return cls(tabela[tabela["tipo"] != SEM])
+
+    def atualizar(self, conn):
+        """Registro novo (em memória) com as observações de ts > marca; e quantas foram."""
+        tabela = np.array(self.tabela)       # cópia: self.tabela pode ser um mmap só leitura
+        linhas = conn.execute("""
+            SELECT i.url_name, s.ts, s.avg_sell
+            FROM market_series s JOIN items i ON i.id = s.item_id
+            WHERE s.ts > ? AND s.ts <= ? AND s.avg_sell > 0
+            ORDER BY s.ts
+        """, (self.marca_ts, int(time.time()) - MARGEM_TS)).fetchall()
+        usadas = 0
+        for nome, ts, x in linhas:
+            i = self._indice.get(nome)
+            if i is None:
+                continue           # item novo só entra no próximo ajuste
+            r = tabela[i]
+            r["x2"], r["x1"] = r["x1"], x
+            r["nivel"] += r["alfa"] * (x - r["nivel"])
+            r["ts"] = ts
+            r["n"] += 1
+            usadas += 1
+        return RegistroPrevisores(tabela), usadas
+
+    def prever(self, itens, reserva):
+        """
+        Próximo avg_sell de cada item de `itens`; onde não há previsor, vale
+        o valor correspondente de `reserva` (previsão do modelo global).
+        """
+        saida = np.array(reserva, dtype=float)
+        idx = np.array([self._indice.get(item, -1) for item in itens], dtype=np.int64)
+        tem = idx >= 0
+        if tem.any():
+            t = self.tabela[idx[tem]]
+            ar = t["c"] + t["a1"] * t["x1"] + t["a2"] * t["x2"]
+            saida[tem] = np.where(t["tipo"] == AR2, ar, t["nivel"])
+        return saida
+
+    def salvar(self, path=PREVISORES_PATH):
+        tmp = f"{path}.tmp.npy"
+        np.save(tmp, np.asarray(self.tabela))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def carregar(path=PREVISORES_PATH):
+        try:
+            tabela = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return RegistroPrevisores(tabela) if tabela.dtype == DTYPE else None
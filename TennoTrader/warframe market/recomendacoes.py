@@ -0,0 +1,184 @@
+# recomendacoes.py
+
+import json
+import operator
+from bisect import bisect_left, insort
+
+REGRAS_FILE = "regras.json"
+
+# campos numéricos de um registro de calcular_dados
+CAMPOS = ("avg_sell", "avg_buy", "median_sell", "median_buy",
+          "weighted_avg_sell", "weighted_avg_buy", "spread",
+          "demand", "supply", "liquidity", "score")
+
+OPERADORES = {
+    ">":  operator.gt, ">=": operator.ge,
+    "<":  operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+class Regra:
+    """
+    Um balde de recomendação: quem passa em todas as `condicoes`
+    (campo, operador, valor) entra, ordenado por `ordenar`, e os `limite`
+    primeiros aparecem no resumo formatados com `formato`. Campo, operador,
+    valor ou formato inválidos dão ValueError já aqui, não no meio de um
+    refresh.
+    """
+
+    def __init__(self, nome, titulo, condicoes, ordenar, decrescente=True,
+                 limite=3, formato="{item}"):
+        self.nome        = nome
+        self.titulo      = titulo
+        self.condicoes   = [(c, Regra._operador(nome, op), v) for c, op, v in condicoes]
+        self.ordenar     = ordenar
+        self.decrescente = decrescente
+        self.limite      = limite
+        self.formato     = formato
+        for campo, _, valor in self.condicoes:
+            if campo not in CAMPOS:
+                raise ValueError(f"regra {nome}: campo desconhecido {campo!r}")
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                raise ValueError(f"regra {nome}: valor {valor!r} não é número")
+        if ordenar not in CAMPOS:
+            raise ValueError(f"regra {nome}: não dá para ordenar por {ordenar!r}")
+        try:
+            formato.format(item="", **dict.fromkeys(CAMPOS, 0.0))
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"regra {nome}: formato inválido ({e!r})") from None
+
+    @staticmethod
+    def _operador(nome, op):
+        if op not in OPERADORES:
+            raise ValueError(f"regra {nome}: operador desconhecido {op!r}")
+        return OPERADORES[op]
+
+    def aceita(self, rec):
+        return all(op(rec[campo], valor) for campo, op, valor in self.condicoes)
+
+    def chave(self, rec):
+        # a lista do balde é crescente; para "maior primeiro" guardamos o negativo
+        return -rec[self.ordenar] if self.decrescente else rec[self.ordenar]
+
+    @classmethod
+    def de_dict(cls, d):
+        return cls(d["nome"], d["titulo"], d["condicoes"], d["ordenar"],
+                   d.get("decrescente", True), d.get("limite", 3),
+                   d.get("formato", "{item}"))
+
+REGRAS_PADRAO = [
+    # Rápido Flip: alta score e spread moderado
+    Regra("flip", "Flip Rápido",
+          [("score", ">=", 12), ("spread", ">=", 5)], "score", True, 3,
+          "{item} (Score {score:.1f}, Spread {spread:.1f})"),
+    # Oportunidade de Arbitragem: spread alto e liquidez ≥5
+    Regra("arbitragem", "Arbitragem",
+          [("spread", ">=", 10), ("liquidity", ">=", 5)], "spread", True, 2,
+          "{item} (Spread {spread:.1f}, Liquidez {liquidity})"),
+    # Investimento Long-Term: liquidez alta e score médio
+    Regra("hold", "Investimento (Long-Term)",
+          [("liquidity", ">=", 20), ("score", ">=", 5), ("score", "<", 12)], "liquidity", True, 2,
+          "{item} (Liquidez {liquidity}, Score {score:.1f})"),
+    # Itens de Risco: spread baixo e liquidez baixa
+    Regra("evitar", "Itens de Risco (Evitar)",
+          [("spread", "<", 3), ("liquidity", "<", 3)], "spread", False, 2,
+          "{item} (Spread {spread:.1f}, Liquidez {liquidity})"),
+]
+
+def carregar_regras(path=REGRAS_FILE):
+    """
+    Regras padrão mais as do usuário em `path` (lista de objetos JSON com
+    nome, titulo, condicoes, ordenar e opcionalmente decrescente, limite e
+    formato). Uma regra do usuário com o mesmo nome substitui a padrão; uma
+    regra inválida é ignorada sem levar as outras junto.
+    """
+    regras = {r.nome: r for r in REGRAS_PADRAO}
+    try:
+        with open(path, encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return list(regras.values())
+    except ValueError as e:
+        print(f"[Recomendações] Ignorando {path}: {e}")
+        return list(regras.values())
+    if not isinstance(dados, list):
+        print(f"[Recomendações] Ignorando {path}: esperava uma lista de regras")
+        return list(regras.values())
+    for d in dados:
+        try:
+            regra = Regra.de_dict(d)
+        except ValueError as e:
+            print(f"[Recomendações] Ignorando {e}")
+            continue
+        except (KeyError, TypeError) as e:
+            print(f"[Recomendações] Ignorando regra malformada em {path}: {e!r}")
+            continue
+        regras[regra.nome] = regra
+    return list(regras.values())
+
+class MotorRecomendacoes:
+    """
+    Mantém os baldes de recomendação atualizados incrementalmente.
+
+    Cada balde é uma lista ordenada de (chave, item) mantida com bisect;
+    `atualizar` só mexe nos itens recebidos, então o custo por refresh é
+    O(mudanças × regras) e ler o top-K é uma fatia.
+    """
+
+    def __init__(self, regras=None):
+        self._recs   = {}
+        self._regras = []
+        self._baldes = {}    # nome -> [(chave, item)]
+        self._chaves = {}    # nome -> {item: chave}
+        for regra in (REGRAS_PADRAO if regras is None else regras):
+            self.adicionar_regra(regra)
+
+    @property
+    def regras(self):
+        return list(self._regras)
+
+    def adicionar_regra(self, regra):
+        self.remover_regra(regra.nome)
+        self._regras.append(regra)
+        chaves = {item: regra.chave(rec) for item, rec in self._recs.items()
+                  if regra.aceita(rec)}
+        self._chaves[regra.nome] = chaves
+        self._baldes[regra.nome] = sorted((k, item) for item, k in chaves.items())
+
+    def remover_regra(self, nome):
+        self._regras = [r for r in self._regras if r.nome != nome]
+        self._baldes.pop(nome, None)
+        self._chaves.pop(nome, None)
+
+    def atualizar(self, recs):
+        for rec in recs:
+            item = rec["item"]
+            if self._recs.get(item) is rec:
+                continue
+            self._recs[item] = rec
+            for regra in self._regras:
+                balde, chaves = self._baldes[regra.nome], self._chaves[regra.nome]
+                antiga = chaves.pop(item, None)
+                if antiga is not None:
+                    del balde[bisect_left(balde, (antiga, item))]
+                if regra.aceita(rec):
+                    chaves[item] = k = regra.chave(rec)
+                    insort(balde, (k, item))
+        return self
+
+    def top(self, nome):
+        regra = next(r for r in self._regras if r.nome == nome)
+        return [self._recs[item] for _, item in self._baldes[nome][:regra.limite]]
+
+    def texto(self):
+        if not self._recs:
+            return "Sem dados para recomendar."
+        lines = ["🔍 Recomendações Profissionais:"]
+        for regra in self._regras:
+            escolhidos = self.top(regra.nome)
+            if escolhidos:
+                lines.append(f"• {regra.titulo}:")
+                for d in escolhidos:
+                    lines.append("  - " + regra.formato.format(**d))
+        lines.append("👉 Confira missões/grind que dropam estes itens e venda em regiões populosas.")
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+# replay.py
+#
+# Servidor local que imita a API do warframe.market com respostas gravadas,
+# para medir a coleta sem rede (ver bench_suite.py). As fixtures ficam numa
+# pasta:
+#   items.json            corpo de GET /items
+#   orders/<item>.jsonl   corpos de GET /items/<item>/orders, um por linha;
+#                         cada pedido devolve o próximo da lista (em ciclo),
+#                         então o livro muda como na API de verdade
+#
+#   python replay.py gravar  <pasta> [--itens 200] [--versoes 3]   (usa a API)
+#   python replay.py gerar   <pasta> [--itens 3000] [--versoes 3]  (sintético)
+#   python replay.py servir  <pasta> [--porta 8766] [--latencia 50] [--jitter 20]
+#   (aponte o app para http://127.0.0.1:8766/v1)
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_URL = "https://api.warframe.market/v1"
+STATUS_USUARIO = ("online", "ingame", "offline")
+
+# ─── fixtures ─────────────────────────────────────────────────────────────
+def _escrever(pasta, items_corpo, livros):
+    os.makedirs(os.path.join(pasta, "orders"), exist_ok=True)
+    with open(os.path.join(pasta, "items.json"), "wb") as f:
+        f.write(items_corpo)
+    for item, corpos in livros.items():
+        with open(os.path.join(pasta, "orders", f"{item}.jsonl"), "wb") as f:
+            f.write(b"".join(c.strip() + b"\n" for c in corpos))
+
+def gerar_fixtures(pasta, n_itens=3000, versoes=3, seed=42):
+    """Fixtures sintéticas no formato da API: livros de 0 a 60 ordens por item."""
+    rnd = random.Random(seed)
+    nomes = [f"item_sintetico_{i}" for i in range(n_itens)]
+    items = {"payload": {"items": [{"url_name": n, "item_name": n} for n in nomes]}}
+    livros = {}
+    for nome in nomes:
+        base = rnd.randint(5, 300)
+        corpos = []
+        for _ in range(versoes):
+            orders = []
+            for tipo, media, n in (("sell", base, rnd.randint(0, 40)),
+                                   ("buy", base * 0.7, rnd.randint(0, 20))):
+                for _ in range(n):
+                    orders.append({
+                        "order_type": tipo,
+                        "platinum": max(1, int(rnd.gauss(media, media * 0.3))),
+                        "quantity": rnd.randint(1, 5),
+                        "user": {"ingame_name": f"jogador_{rnd.randint(0, 5000)}",
+                                 "status": rnd.choice(STATUS_USUARIO)},
+                    })
+            corpos.append(json.dumps({"payload": {"orders": orders}}).encode("utf-8"))
+        livros[nome] = corpos
+    _escrever(pasta, json.dumps(items).encode("utf-8"), livros)
+    return len(nomes)
+
+def gravar_fixtures(pasta, n_itens=200, versoes=3, intervalo=60.0, taxa=3.0):
+    """Grava respostas reais: `versoes` passadas sobre os primeiros `n_itens`, a cada `intervalo` s."""
+    import requests
+    sessao = requests.Session()
+    sessao.headers.update({"Accept": "application/json", "platform": "pc", "language": "en"})
+    items_corpo = sessao.get(f"{API_URL}/items", timeout=30).content
+    nomes = [i["url_name"] for i in json.loads(items_corpo)["payload"]["items"]][:n_itens]
+    livros = {n: [] for n in nomes}
+    for v in range(versoes):
+        inicio = time.monotonic()
+        for nome in nomes:
+            livros[nome].append(sessao.get(f"{API_URL}/items/{nome}/orders", timeout=30).content)
+            time.sleep(1 / taxa)
+        print(f"[Replay] passada {v + 1}/{versoes} gravada")
+        if v + 1 < versoes:
+            time.sleep(max(0.0, intervalo - (time.monotonic() - inicio)))
+    # /items só com os itens gravados, para o replay não listar itens sem livro
+    items = json.loads(items_corpo)
+    items["payload"]["items"] = items["payload"]["items"][:n_itens]
+    _escrever(pasta, json.dumps(items).encode("utf-8"), livros)
+    return len(nomes)
+
+# ─── servidor ─────────────────────────────────────────────────────────────
+class ServidorReplay:
+    """
+    Serve as fixtures de `pasta` em 127.0.0.1 numa thread própria.
+
+    `latencia_ms` ± `jitter_ms` é somado a cada resposta; `n_itens` limita
+    (ou, repetindo os livros gravados com outros nomes, estende) o catálogo.
+    ETag e If-None-Match funcionam como na API, para o ClienteCondicional.
+    """
+
+    def __init__(self, pasta, porta=0, latencia_ms=0.0, jitter_ms=0.0, n_itens=None, seed=42):
+        with open(os.path.join(pasta, "items.json"), "rb") as f:
+            items = json.load(f)
+        gravados = [i["url_name"] for i in items["payload"]["items"]]
+        self._corpos = {}
+        for nome in gravados:
+            with open(os.path.join(pasta, "orders", f"{nome}.jsonl"), "rb") as f:
+                self._corpos[nome] = [l for l in f.read().splitlines() if l]
+        n_itens = len(gravados) if n_itens is None else n_itens
+        self.itens = [gravados[k] if k < len(gravados) else f"{gravados[k % len(gravados)]}__{k}"
+                      for k in range(n_itens)]
+        items["payload"]["items"] = [{"url_name": n} for n in self.itens]
+        self._items = json.dumps(items).encode("utf-8")
+        self.latencia = latencia_ms / 1000
+        self.jitter   = jitter_ms / 1000
+        self.pedidos  = 0
+        self._rnd  = random.Random(seed)
+        self._vez  = {}
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), self._manipulador())
+        self._http.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._http.server_address[1]}/v1"
+
+    def corpo(self, caminho):
+        """Próximo corpo de resposta de `caminho` (/v1/...), ou None se não existe."""
+        partes = caminho.strip("/").split("/")
+        if partes == ["v1", "items"]:
+            return self._items
+        if len(partes) == 4 and partes[:2] == ["v1", "items"] and partes[3] == "orders":
+            nome = partes[2]
+            corpos = self._corpos.get(nome.split("__")[0])
+            if corpos is None:
+                return None
+            with self._lock:
+                k = self._vez[nome] = self._vez.get(nome, -1) + 1
+            return corpos[k % len(corpos)]
+        return None
+
+    def _atraso(self):
+        with self._lock:
+            self.pedidos += 1
+            return max(0.0, self.latencia + self._rnd.uniform(-self.jitter, self.jitter))
+
+    def _manipulador(self):
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True   # sem isso, keep-alive espera o ACK atrasado (~40 ms)
+
+            def log_message(self, formato, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(servidor._atraso())
+                corpo = servidor.corpo(self.path.split("?")[0])
+                if corpo is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+        return Manipulador
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True,
+                                        name="replay")
+        self._thread.start()
+        return self.url
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fixtures e servidor de replay da API")
+    ap.add_argument("acao", choices=("gravar", "gerar", "servir"))
+    ap.add_argument("pasta")
+    ap.add_argument("--itens", type=int, default=None)
+    ap.add_argument("--versoes", type=int, default=3)
+    ap.add_argument("--porta", type=int, default=8766)
+    ap.add_argument("--latencia", type=float, default=0.0, help="ms por resposta")
+    ap.add_argument("--jitter", type=float, default=0.0, help="± ms na latência")
+    args = ap.parse_args()
+    if args.acao == "gravar":
+        n = gravar_fixtures(args.pasta, args.itens or 200, args.versoes)
+        print(f"[Replay] {n} itens gravados em {args.pasta}")
+    elif args.acao == "gerar":
+        n = gerar_fixtures(args.pasta, args.itens or 3000, args.versoes)
+        print(f"[Replay] {n} itens sintéticos em {args.pasta}")
+    else:
+        srv = ServidorReplay(args.pasta, args.porta, args.latencia, args.jitter, args.itens)
+        print(f"[Replay] {len(srv.itens)} itens em {srv.iniciar()}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            srv.parar()
@@ -0,0 +1,70 @@
+# rollups.py
+#
+# Reconstrução em lote da tabela `rollups` (esquema v3 em database.py). O
+# trigger mantém os baldes linha a linha; aqui eles são recalculados de uma
+# vez, lendo market_series em blocos na ordem da chave (item_id, ts): nessa
+# ordem cada balde é um trecho contíguo e as três resoluções saem de
+# reduceat no mesmo bloco.
+
+import numpy as np
+
+from database import RESOLUCOES
+
+_INSERT = f"INSERT OR REPLACE INTO rollups VALUES ({','.join('?' * 13)})"
+
+def agregar_bloco(ids, ts, sell, spread, demand, supply, res):
+    """Linhas de `rollups` na resolução `res` para um bloco ordenado por (item_id, ts)."""
+    balde = ts - ts % res
+    inicio = np.ones(len(ts), dtype=bool)
+    inicio[1:] = (ids[1:] != ids[:-1]) | (balde[1:] != balde[:-1])
+    ini = np.flatnonzero(inicio)
+    fim = np.append(ini[1:], len(ts)) - 1
+    return zip(
+        [res] * len(ini), ids[ini].tolist(), balde[ini].tolist(),
+        sell[ini].tolist(), np.maximum.reduceat(sell, ini).tolist(),
+        np.minimum.reduceat(sell, ini).tolist(), sell[fim].tolist(),
+        ts[ini].tolist(), ts[fim].tolist(),
+        np.add.reduceat(spread, ini).tolist(),
+        np.maximum.reduceat(demand, ini).tolist(), np.maximum.reduceat(supply, ini).tolist(),
+        (fim - ini + 1).tolist(),
+    )
+
+def reconstruir_rollups(conn, desde=None, ate=None, bloco=500_000):
+    """
+    Recalcula os rollups a partir de market_series (dentro da transação do
+    chamador). Com `desde`/`ate`, só os baldes que tocam esse intervalo,
+    ampliado para dias inteiros (os baldes menores cabem nos de 1 dia).
+    Devolve quantas linhas de market_series foram lidas.
+    """
+    dia = RESOLUCOES[-1]
+    ini = 0 if desde is None else desde - desde % dia
+    fim = 2**62 if ate is None else ate - ate % dia + dia - 1
+    conn.execute("DELETE FROM rollups WHERE balde >= ? AND balde <= ?", (ini, fim))
+    cur = conn.execute("""
+        SELECT item_id, ts, avg_sell, COALESCE(spread, 0),
+               COALESCE(demand, 0), COALESCE(supply, 0)
+        FROM market_series
+        -- +ts: varre pela chave, já na ordem; pelo índice de ts o ORDER BY
+        -- viraria uma ordenação do intervalo inteiro em memória
+        WHERE +ts >= ? AND +ts <= ? AND avg_sell IS NOT NULL
+        ORDER BY item_id, ts
+    """, (ini, fim))
+    resto = np.empty((0, 6))
+    lidas = 0
+    while True:
+        linhas = cur.fetchmany(bloco)
+        lidas += len(linhas)
+        dados = np.concatenate((resto, np.array(linhas, dtype=float).reshape(-1, 6)))
+        if linhas:
+            # o último (item, dia) pode continuar no próximo bloco: fica para ele
+            ids, dias = dados[:, 0], dados[:, 1] // dia
+            corte = int(np.argmax((ids == ids[-1]) & (dias == dias[-1])))
+            dados, resto = dados[:corte], dados[corte:]
+        if len(dados):
+            ids, ts = dados[:, 0].astype(np.int64), dados[:, 1].astype(np.int64)
+            colunas = (ids, ts, dados[:, 2], dados[:, 3],
+                       dados[:, 4].astype(np.int64), dados[:, 5].astype(np.int64))
+            for res in RESOLUCOES:
+                conn.executemany(_INSERT, agregar_bloco(*colunas, res))
+        if not linhas:
+            return lidas
@@ -0,0 +1,310 @@
+# servico.py
+#
+# Modo sem tela: roda o motor (coleta, banco, modelo) e serve uma API HTTP
+# local em JSON, para vários painéis lerem da mesma coleta.
+#   python servico.py [--host 127.0.0.1] [--porta 8765]
+#
+#   GET /resultados?ordem=score&reversa=1&pagina=0&tamanho=100
+#   GET /resultados?desde=<versao>&prev=<versao_previsoes>&espera=<s>
+#       só o que mudou depois de `desde`; com `espera`, segura a resposta
+#       (long-poll) até aparecer algo novo. As previsões vêm inteiras só
+#       quando `prev` não é a versão atual delas.
+#   GET /eventos?desde=<versao>        os mesmos deltas como Server-Sent Events
+#   GET /historico/<item>?desde=&ate=&pagina=&tamanho=
+#   GET /janela?desde=&ate=&pagina=&tamanho=
+#   GET /ohlc/<item>?desde=&ate=&pontos=&res=    velas dos rollups
+#   GET /pontuacao/<formula>/<item>?desde=&ate=&pagina=&tamanho=
+#   GET /recomendacoes
+#   GET /alertas                       últimos alertas disparados (alertas.json)
+#   GET /estado
+#   GET /metrics                       telemetria no formato texto do Prometheus
+#   GET /telemetria                    a mesma telemetria em JSON
+
+import argparse
+import json
+import signal
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import motor
+import telemetria
+from armazem import CAMPOS
+from database import COLUNAS, COLUNAS_OHLC, historico_item, historico_ohlc, \
+    historico_pontuacao, janela
+from recomendacoes import MotorRecomendacoes, carregar_regras
+
+TAMANHO_PADRAO = 100
+TAMANHO_MAX    = 5000
+ESPERA_MAX     = 60     # s que um long-poll pode segurar a conexão
+INTERVAL_SSE   = 15     # s entre comentários de keep-alive no /eventos
+INTERVAL_CATALOGO = 60  # s entre novas tentativas de listar os itens
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+# ─── consultas ────────────────────────────────────────────────────────────
+def _int(params, nome, padrao, minimo=None, maximo=None):
+    try:
+        valor = int(params.get(nome, [padrao])[0])
+    except ValueError:
+        raise ErroRequisicao(400, f"'{nome}' deve ser inteiro") from None
+    if minimo is not None:
+        valor = max(minimo, valor)
+    if maximo is not None:
+        valor = min(maximo, valor)
+    return valor
+
+def _pagina(params):
+    tamanho = _int(params, "tamanho", TAMANHO_PADRAO, 1, TAMANHO_MAX)
+    return tamanho, _int(params, "pagina", 0, 0) * tamanho
+
+def _registro(r, prev):
+    d = r.as_dict()
+    d["pred_sell"] = prev.get(r.item, 0.0)
+    d["versao"] = r.versao
+    pontuacoes = motor.pontuacoes.get(r.item)
+    if pontuacoes:
+        d["pontuacoes"] = pontuacoes
+    return d
+
+class Api:
+    """As consultas da API, separadas do HTTP para poderem ser chamadas direto."""
+
+    def __init__(self, db_path=motor.DB_PATH):
+        self.db_path = db_path
+        self._rec = MotorRecomendacoes(carregar_regras())
+        self._rec_versao = 0
+        self._rec_lock = threading.Lock()
+
+    def resultados(self, params):
+        if "desde" in params:
+            return self.delta(params)
+        ordem = params.get("ordem", ["score"])[0]
+        if ordem not in CAMPOS and ordem != "pred_sell":
+            raise ErroRequisicao(400, f"ordem desconhecida: {ordem}")
+        reversa = params.get("reversa", ["1"])[0] not in ("0", "false")
+        tamanho, ini = _pagina(params)
+        prev = motor.previsoes
+        versao, snap = motor.resultados.snapshot()
+        if ordem == "pred_sell":
+            chave = lambda r: prev.get(r.item, 0.0)
+        else:
+            chave = lambda r: r[ordem]
+        ordenados = sorted(snap.values(), key=chave, reverse=reversa)
+        return {
+            "versao": versao,
+            "versao_previsoes": motor.versao_previsoes,
+            "total": len(ordenados),
+            "itens": [_registro(r, prev) for r in ordenados[ini:ini + tamanho]],
+        }
+
+    def delta(self, params):
+        desde = _int(params, "desde", 0, 0)
+        espera = _int(params, "espera", 0, 0, ESPERA_MAX)
+        prev_cliente = _int(params, "prev", -1)
+        if espera and prev_cliente == motor.versao_previsoes:
+            motor.resultados.esperar(desde, espera)
+        prev = motor.previsoes
+        versao, novos = motor.resultados.mudancas_desde(desde)
+        saida = {
+            "versao": versao,
+            "versao_previsoes": motor.versao_previsoes,
+            "itens": [_registro(r, prev) for r in novos],
+        }
+        if prev_cliente != motor.versao_previsoes:
+            saida["previsoes"] = prev
+        return saida
+
+    def historico(self, item, params):
+        tamanho, ini = _pagina(params)
+        with sqlite3.connect(self.db_path) as conn:
+            linhas = historico_item(conn, item, _int(params, "desde", 0),
+                                    _int(params, "ate", 2**62), tamanho, ini)
+        return {"colunas": COLUNAS, "linhas": linhas}
+
+    def ohlc(self, item, params):
+        agora = int(time.time())
+        desde = _int(params, "desde", agora - 7 * 86400)
+        res = _int(params, "res", 0) or None
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                res, linhas = historico_ohlc(conn, item, desde, _int(params, "ate", agora),
+                                             _int(params, "pontos", 500, 1, TAMANHO_MAX), res)
+        except ValueError as e:
+            raise ErroRequisicao(400, str(e)) from None
+        return {"res": res, "colunas": COLUNAS_OHLC, "linhas": linhas}
+
+    def pontuacao(self, formula, item, params):
+        tamanho, ini = _pagina(params)
+        with sqlite3.connect(self.db_path) as conn:
+            linhas = historico_pontuacao(conn, formula, item, _int(params, "desde", 0),
+                                         _int(params, "ate", 2**62), tamanho, ini)
+        return {"colunas": ("ts", "valor"), "linhas": linhas}
+
+    def janela(self, params):
+        tamanho, ini = _pagina(params)
+        agora = int(time.time())
+        with sqlite3.connect(self.db_path) as conn:
+            linhas = janela(conn, _int(params, "desde", agora - 3600),
+                            _int(params, "ate", agora), tamanho, ini)
+        return {"colunas": COLUNAS, "linhas": linhas}
+
+    def recomendacoes(self, params):
+        with self._rec_lock:
+            self._rec_versao, novos = motor.resultados.mudancas_desde(self._rec_versao)
+            self._rec.atualizar(novos)
+            return {
+                "texto": self._rec.texto(),
+                "regras": [{"nome": r.nome, "titulo": r.titulo,
+                            "itens": [x.as_dict() for x in self._rec.top(r.nome)]}
+                           for r in self._rec.regras],
+            }
+
+    def alertas(self, params):
+        m = motor.motor_alertas
+        if m is None:
+            return {"regras": [], "alertas": []}
+        return {"regras": [r.nome for r in m.regras], "alertas": m.recentes()[::-1]}
+
+    def estado(self, params):
+        saida = {
+            "itens": len(motor.resultados),
+            "versao": motor.resultados.versao,
+            "versao_previsoes": motor.versao_previsoes,
+            "latencia_pred_ms": motor.latencia_pred * 1000,
+            "agendador": motor.agendador.estatisticas(),
+        }
+        if motor.cliente is not None:
+            saida["cache_http"] = motor.cliente.estatisticas()
+        return saida
+
+# ─── HTTP ─────────────────────────────────────────────────────────────────
+class Manipulador(BaseHTTPRequestHandler):
+    api = None     # definido em servir()
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # sem isso, keep-alive espera o ACK atrasado (~40 ms)
+
+    def log_message(self, formato, *args):
+        pass       # uma linha por requisição poluiria o log da coleta
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _responder_texto(self, texto, tipo):
+        dados = texto.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        partes = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        if partes == ["eventos"]:
+            try:
+                return self._eventos(params)
+            except ErroRequisicao as e:
+                return self._responder(e.status, {"erro": str(e)})
+        if partes == ["metrics"]:
+            return self._responder_texto(telemetria.prometheus(),
+                                         "text/plain; version=0.0.4; charset=utf-8")
+        with telemetria.medir("api", rota=partes[0] if partes else ""):
+            self._rotear(url, params, partes)
+
+    def _rotear(self, url, params, partes):
+        try:
+            if len(partes) == 2 and partes[0] == "historico":
+                return self._responder(200, self.api.historico(partes[1], params))
+            if len(partes) == 2 and partes[0] == "ohlc":
+                return self._responder(200, self.api.ohlc(partes[1], params))
+            if len(partes) == 3 and partes[0] == "pontuacao":
+                return self._responder(200, self.api.pontuacao(partes[1], partes[2], params))
+            rota = {
+                ("resultados",):    self.api.resultados,
+                ("janela",):        self.api.janela,
+                ("recomendacoes",): self.api.recomendacoes,
+                ("alertas",):       self.api.alertas,
+                ("estado",):        self.api.estado,
+                ("telemetria",):    lambda params: telemetria.instantaneo(),
+            }.get(tuple(partes))
+            if rota is None:
+                raise ErroRequisicao(404, f"rota desconhecida: {url.path}")
+            self._responder(200, rota(params))
+        except ErroRequisicao as e:
+            self._responder(e.status, {"erro": str(e)})
+        except sqlite3.Error as e:
+            self._responder(503, {"erro": f"banco indisponível: {e}"})
+
+    def _eventos(self, params):
+        versao = _int(params, "desde", motor.resultados.versao, 0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        prev = -1
+        try:
+            while motor.running:
+                motor.resultados.esperar(versao, INTERVAL_SSE)
+                if motor.resultados.versao == versao and prev == motor.versao_previsoes:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    d = self.api.delta({"desde": [versao], "prev": [prev]})
+                    versao, prev = d["versao"], d["versao_previsoes"]
+                    self.wfile.write(b"data: " + json.dumps(d, ensure_ascii=False).encode("utf-8")
+                                     + b"\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # cliente fechou
+
+# ─── inicialização ────────────────────────────────────────────────────────
+def iniciar_motor():
+    origem = motor.carregar_inicial()
+    print(f"[Serviço] {len(motor.resultados)} itens iniciais do {origem}")
+    motor.inicializar_fundo()
+    # sem janela para mostrar o aviso: registra e tenta o catálogo de novo depois
+    while motor.running and motor.aviso_catalogo is not None:
+        _, titulo, texto = motor.aviso_catalogo
+        motor.aviso_catalogo = None
+        print(f"[Serviço] {titulo}: {texto.splitlines()[0]}; nova tentativa em {INTERVAL_CATALOGO}s")
+        time.sleep(INTERVAL_CATALOGO)
+        motor.descobrir_catalogo()
+
+def servir(host="127.0.0.1", porta=8765):
+    Manipulador.api = Api()
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=iniciar_motor, daemon=True).start()
+    # SIGTERM (serviço do sistema) encerra como o Ctrl+C, gravando o que falta
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=servidor.shutdown).start())
+    print(f"[Serviço] API em http://{host}:{porta}/")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        motor.parar()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Coletor sem tela com API HTTP local")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--porta", type=int, default=8765)
+    args = ap.parse_args()
+    servir(args.host, args.porta)
@@ -0,0 +1,211 @@
+# snapshots.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from analise_dados import calcular_metricas, metricas_colunares
+
+SNAPSHOT_DIR = "snapshots"
+
+STATUS = ("offline", "online", "ingame")
+TIPOS  = ("sell", "buy")
+
+# um registro por livro coletado; `ini`/`n` apontam para ordens.bin do mesmo dia
+DTYPE_LIVRO = np.dtype([("ts", "<i8"), ("item", "<i4"), ("ini", "<i8"), ("n", "<i4")])
+# float32 guarda exatamente qualquer preço inteiro até 16 milhões de platina
+DTYPE_ORDEM = np.dtype([("platinum", "<f4"), ("quantity", "<i4"), ("usuario", "<i4"),
+                        ("tipo", "i1"), ("status", "i1")])
+
+class ArmazemSnapshots:
+    """
+    Guarda cada livro de ordens bruto num formato colunar só de acréscimo.
+
+    Por dia (UTC) há uma pasta com livros.bin e ordens.bin (arrays NumPy
+    estruturados, lidos via memmap); nomes de itens e usuários viram ids
+    inteiros pelos dicionários itens.txt/usuarios.txt, uma linha por id.
+    As ordens são gravadas antes do livro, então um crash no meio deixa no
+    máximo ordens órfãs no fim do arquivo, que a leitura ignora. Antes de
+    acrescentar num dia pela primeira vez (e depois de uma escrita que
+    falhou), os arquivos dele são cortados no último livro completo, e os
+    dicionários na última linha inteira: um registro pela metade
+    desalinharia tudo que viesse depois.
+    """
+
+    def __init__(self, pasta=SNAPSHOT_DIR):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._itens    = self._carregar_dic("itens.txt")
+        self._usuarios = self._carregar_dic("usuarios.txt")
+        self._n_ordens = {}   # dia -> ordens já em ordens.bin
+
+    # ─── dicionários ──────────────────────────────────────────────────────
+    def _carregar_dic(self, nome):
+        caminho = os.path.join(self.pasta, nome)
+        try:
+            with open(caminho, "rb") as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return {}
+        fim = dados.rfind(b"\n") + 1
+        if fim != len(dados):
+            # nome pela metade: nenhum livro aponta para ele ainda
+            with open(caminho, "r+b") as f:
+                f.truncate(fim)
+        return {nome: i for i, nome in enumerate(dados[:fim].decode("utf-8").splitlines())}
+
+    def _id(self, dic, nome_arq, valor):
+        i = dic.get(valor)
+        if i is None:
+            i = dic[valor] = len(dic)
+            with open(os.path.join(self.pasta, nome_arq), "a", encoding="utf-8") as f:
+                f.write(valor + "\n")
+        return i
+
+    def nomes_itens(self):
+        nomes = [None] * len(self._itens)
+        for nome, i in self._itens.items():
+            nomes[i] = nome
+        return nomes
+
+    # ─── escrita ──────────────────────────────────────────────────────────
+    def _pasta_dia(self, dia):
+        p = os.path.join(self.pasta, dia)
+        os.makedirs(p, exist_ok=True)
+        return p
+
+    @staticmethod
+    def _reparar_dia(pasta):
+        """Corta livros.bin e ordens.bin no último livro completo; devolve quantas ordens ficam."""
+        arq_livros = os.path.join(pasta, "livros.bin")
+        arq_ordens = os.path.join(pasta, "ordens.bin")
+        tam_l = os.path.getsize(arq_livros) if os.path.exists(arq_livros) else 0
+        tam_o = os.path.getsize(arq_ordens) if os.path.exists(arq_ordens) else 0
+        n_ordens = tam_o // DTYPE_ORDEM.itemsize
+        livros = np.fromfile(arq_livros, dtype=DTYPE_LIVRO,
+                             count=tam_l // DTYPE_LIVRO.itemsize) if tam_l else \
+            np.empty(0, dtype=DTYPE_LIVRO)
+        # livros são gravados em ordem de `ini`: os completos formam um prefixo
+        fins = livros["ini"] + livros["n"]
+        ruins = np.flatnonzero(fins > n_ordens)
+        n_livros = int(ruins[0]) if len(ruins) else len(livros)
+        n_ordens = int(fins[n_livros - 1]) if n_livros else 0
+        for arq, tam, novo in ((arq_livros, tam_l, n_livros * DTYPE_LIVRO.itemsize),
+                               (arq_ordens, tam_o, n_ordens * DTYPE_ORDEM.itemsize)):
+            if tam != novo:
+                with open(arq, "r+b") as f:
+                    f.truncate(novo)
+        return n_ordens
+
+    def gravar(self, item, orders, ts=None):
+        """Acrescenta o livro bruto (lista de ordens da API) de `item`."""
+        ts  = int(time.time()) if ts is None else ts
+        dia = time.strftime("%Y-%m-%d", time.gmtime(ts))
+        with self._lock:
+            ordens = np.empty(len(orders), dtype=DTYPE_ORDEM)
+            for k, o in enumerate(orders):
+                user   = o.get("user") or {}
+                status = user.get("status")
+                tipo   = o.get("order_type")
+                ordens[k] = (
+                    o["platinum"], o.get("quantity", 1),
+                    self._id(self._usuarios, "usuarios.txt", user.get("ingame_name", "")),
+                    TIPOS.index(tipo) if tipo in TIPOS else -1,
+                    STATUS.index(status) if status in STATUS else -1,
+                )
+            pasta = self._pasta_dia(dia)
+            if dia not in self._n_ordens:
+                self._n_ordens[dia] = self._reparar_dia(pasta)
+            ini = self._n_ordens[dia]
+            livro = np.array([(ts, self._id(self._itens, "itens.txt", item), ini, len(ordens))],
+                             dtype=DTYPE_LIVRO)
+            try:
+                with open(os.path.join(pasta, "ordens.bin"), "ab") as f:
+                    f.write(ordens.tobytes())
+                with open(os.path.join(pasta, "livros.bin"), "ab") as f:
+                    f.write(livro.tobytes())
+            except BaseException:
+                # pode ter ficado meio registro: a próxima escrita repara o dia
+                self._n_ordens.pop(dia, None)
+                raise
+            self._n_ordens[dia] = ini + len(ordens)
+
+    # ─── leitura ──────────────────────────────────────────────────────────
+    def dias(self):
+        return sorted(d for d in os.listdir(self.pasta)
+                      if os.path.isfile(os.path.join(self.pasta, d, "livros.bin")))
+
+    @staticmethod
+    def _mapear(caminho, dtype):
+        n = os.path.getsize(caminho) // dtype.itemsize if os.path.exists(caminho) else 0
+        if not n:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(caminho, dtype=dtype, mode="r", shape=(n,))
+
+    def ler_dia(self, dia):
+        """(livros, ordens) do dia como memmaps, sem livros incompletos."""
+        pasta  = os.path.join(self.pasta, dia)
+        livros = self._mapear(os.path.join(pasta, "livros.bin"), DTYPE_LIVRO)
+        ordens = self._mapear(os.path.join(pasta, "ordens.bin"), DTYPE_ORDEM)
+        if len(livros):
+            livros = livros[livros["ini"] + livros["n"] <= len(ordens)]
+        return livros, ordens
+
+    def reproduzir(self, dias=None):
+        """
+        Gera (ts, item, sells, buys) como o get_orders devolveria (só usuários
+        online/ingame), prontos para calcular_metricas.
+        """
+        nomes = self.nomes_itens()
+        ativos = (STATUS.index("online"), STATUS.index("ingame"))
+        for dia in dias or self.dias():
+            livros, ordens = self.ler_dia(dia)
+            for ts, item, ini, n in livros.tolist():
+                sells, buys = [], []
+                for preco, qtd, _, tipo, status in ordens[ini:ini + n].tolist():
+                    if status in ativos and tipo >= 0:
+                        (sells if tipo == 0 else buys).append(
+                            {"platinum": preco, "quantity": qtd})
+                yield ts, nomes[item], sells, buys
+
+    def recalcular(self, dias=None):
+        """Reaplica calcular_metricas a todos os snapshots, um livro por vez."""
+        return [{"ts": ts, "item": item, **calcular_metricas(sells, buys)}
+                for ts, item, sells, buys in self.reproduzir(dias)
+                if sells or buys]
+
+    def colunas_dia(self, dia):
+        """
+        Colunas (ts, ids de item, venda, compra) do dia para metricas_colunares,
+        montadas direto dos memmaps, sem criar dicts por ordem.
+        """
+        livros, ordens = self.ler_dia(dia)
+        n = len(livros)
+        cnt = livros["n"].astype(np.int64)
+        pos = np.repeat(livros["ini"] - (np.cumsum(cnt) - cnt), cnt) + np.arange(cnt.sum())
+        livro_da_ordem = np.full(len(ordens), -1, dtype=np.int64)
+        livro_da_ordem[pos] = np.repeat(np.arange(n), cnt)
+        ativo = np.isin(ordens["status"], (STATUS.index("online"), STATUS.index("ingame")))
+        ativo &= livro_da_ordem >= 0
+        lados = []
+        for tipo in range(len(TIPOS)):
+            sel = ativo & (ordens["tipo"] == tipo)
+            # ordens de um livro são contíguas e na ordem dos livros
+            conts = np.bincount(livro_da_ordem[sel], minlength=n)
+            offsets = np.concatenate(([0], np.cumsum(conts))).astype(np.int64)
+            precos = ordens["platinum"][sel].astype(float)
+            lados.append((precos, np.ones(len(precos)), offsets))
+        return np.asarray(livros["ts"]), np.asarray(livros["item"]), lados[0], lados[1]
+
+    def recalcular_colunar(self, dias=None):
+        """
+        Versão em lote de `recalcular`: devolve por dia (ts, itens, colunas)
+        com as métricas de metricas_colunares (sem arredondar).
+        """
+        nomes = np.array(self.nomes_itens(), dtype=object)
+        for dia in dias or self.dias():
+            ts, itens, venda, compra = self.colunas_dia(dia)
+            yield ts, nomes[itens], metricas_colunares(venda, compra)
@@ -0,0 +1,161 @@
+# tabela.py
+
+from bisect import bisect_left, insort
+
+# valores e tags de uma linha das tabelas principais (colunas em warframe_market.py)
+def formatar_linha(d, pred):
+    return (
+        d["item"],
+        f"{d['avg_sell']}p",
+        f"{d['avg_buy']}p",
+        d["demand"], d["supply"], d["score"],
+        d["median_sell"], d["weighted_avg_sell"], d["spread"],
+        f"{pred:.1f}p"
+    )
+
+def tag_linha(d):
+    if d["score"] >= 15:     return ("alto",)
+    if d["spread"] < 5:      return ("apertado",)
+    if d["liquidity"] < 3:   return ("baixo",)
+    return ()
+
+class ModeloTabela:
+    """
+    Estado das tabelas da UI: linhas já formatadas e a ordem atual.
+
+    `sincronizar` só reformata e reposiciona os itens cujo registro (ou
+    predição) mudou desde a última chamada; a ordem fica numa lista
+    ordenada de (valor, item) mantida com bisect, sem re-sort completo.
+    """
+
+    def __init__(self, formatar, tag, coluna, reversa=False):
+        self.formatar = formatar      # (rec, pred) -> valores da linha
+        self.tag      = tag           # rec -> tags da linha
+        self.coluna   = coluna
+        self.reversa  = reversa
+        self._rec    = {}
+        self._pred   = {}
+        self._linha  = {}             # item -> (valores, tags)
+        self._chave  = {}             # item -> valor usado na ordem
+        self._ordem  = []             # [(valor, item)] crescente
+
+    def __len__(self):
+        return len(self._ordem)
+
+    def _valor(self, item):
+        if self.coluna == "pred_sell":
+            return self._pred[item]
+        return self._rec[item].get(self.coluna, 0)
+
+    def _reposicionar(self, item):
+        antiga = self._chave.get(item)
+        if antiga is not None:
+            del self._ordem[bisect_left(self._ordem, (antiga, item))]
+        nova = self._chave[item] = self._valor(item)
+        insort(self._ordem, (nova, item))
+
+    def sincronizar(self, registros, previsoes):
+        """`registros` é [(item, rec)]; devolve o conjunto de itens que mudaram."""
+        mudados = set()
+        for item, rec in registros:
+            pred = previsoes.get(item, 0.0)
+            if self._rec.get(item) is rec and self._pred.get(item) == pred:
+                continue
+            self._rec[item]   = rec
+            self._pred[item]  = pred
+            self._linha[item] = (self.formatar(rec, pred), self.tag(rec))
+            self._reposicionar(item)
+            mudados.add(item)
+        return mudados
+
+    def definir_ordem(self, coluna, reversa):
+        if coluna != self.coluna:
+            self.coluna = coluna
+            self._chave = {item: self._valor(item) for item in self._rec}
+            self._ordem = sorted((v, item) for item, v in self._chave.items())
+        self.reversa = reversa
+
+    def fatia(self, ini, n):
+        """Itens nas posições [ini, ini+n) da ordem exibida."""
+        if not self.reversa:
+            return [item for _, item in self._ordem[ini:ini + n]]
+        fim = len(self._ordem) - ini
+        return [item for _, item in reversed(self._ordem[max(0, fim - n):max(0, fim)])]
+
+    def linha(self, item):
+        return self._linha[item]
+
+class VisaoTabela:
+    """
+    Mostra uma janela do ModeloTabela num Treeview.
+
+    O Treeview só contém as linhas visíveis, com iid = nome do item; a cada
+    renderização entram/saem só as linhas que cruzaram a borda da janela e
+    só as células de itens que mudaram são reescritas. Com `rolagem`, um
+    Scrollbar controla o deslocamento e a quantidade de linhas acompanha a
+    altura do widget.
+    """
+
+    def __init__(self, tree, modelo, linhas, rolagem=None, altura_linha=22):
+        self.tree     = tree
+        self.modelo   = modelo
+        self.linhas   = linhas
+        self.rolagem  = rolagem
+        self.altura_linha = altura_linha
+        self.inicio   = 0
+        self._exibidos = []
+        if rolagem is not None:
+            rolagem.configure(command=self._rolar)
+            tree.bind("<Configure>", self._redimensionar)
+            tree.bind("<MouseWheel>", lambda e: self._deslocar(-e.delta // 120 * 3))
+            tree.bind("<Button-4>",   lambda e: self._deslocar(-3))
+            tree.bind("<Button-5>",   lambda e: self._deslocar(3))
+
+    # ─── rolagem ──────────────────────────────────────────────────────────
+    def _limitar(self, inicio):
+        return max(0, min(inicio, len(self.modelo) - self.linhas))
+
+    def _deslocar(self, passos):
+        self.inicio = self._limitar(self.inicio + passos)
+        self.renderizar()
+
+    def _rolar(self, acao, valor, unidade=None):
+        if acao == "moveto":
+            self.inicio = self._limitar(int(float(valor) * len(self.modelo)))
+        elif acao == "scroll":
+            passo = self.linhas if unidade == "pages" else 1
+            self.inicio = self._limitar(self.inicio + int(valor) * passo)
+        self.renderizar()
+
+    def _redimensionar(self, evento):
+        # desconta o cabeçalho; o Treeview em si nunca rola
+        linhas = max(1, evento.height // self.altura_linha - 1)
+        if linhas != self.linhas:
+            self.linhas = linhas
+            self.inicio = self._limitar(self.inicio)
+            self.renderizar()
+
+    # ─── desenho ──────────────────────────────────────────────────────────
+    def renderizar(self, mudados=()):
+        tree   = self.tree
+        janela = self.modelo.fatia(self.inicio, self.linhas)
+        visiveis = set(janela)
+        sairam = [item for item in self._exibidos if item not in visiveis]
+        if sairam:
+            tree.delete(*sairam)
+        ficaram = set(self._exibidos) - set(sairam)
+        for pos, item in enumerate(janela):
+            valores, tags = self.modelo.linha(item)
+            if item not in ficaram:
+                tree.insert("", pos, iid=item, values=valores, tags=tags)
+            elif item in mudados:
+                tree.item(item, values=valores, tags=tags)
+        if list(tree.get_children()) != janela:
+            for pos, item in enumerate(janela):
+                tree.move(item, "", pos)
+        self._exibidos = janela
+
+        if self.rolagem is not None:
+            total = len(self.modelo) or 1
+            self.rolagem.set(self.inicio / total,
+                             min(1.0, (self.inicio + self.linhas) / total))
@@ -0,0 +1,157 @@
+# telemetria.py
+#
+# Contadores e tempos dos caminhos quentes (HTTP, métricas, gravação no
+# banco, predição, refresh da UI) e o último erro de cada origem. Só usa a
+# biblioteca padrão e um lock por chamada, para poder ficar ligado sempre.
+# Sai em texto no formato do Prometheus (servico.py /metrics), em JSON
+# (despejar_json, aba Saúde da UI) ou pelos dicts de instantaneo().
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIXO = "tennotrader_"
+# limites (s) dos baldes dos histogramas; o último balde (+Inf) é implícito
+BALDES  = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INTERVAL_LOG_ERRO = 60   # s entre linhas de log de uma mesma origem de erro
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+def _quantil(baldes, n, q):
+    """Limite superior do balde onde cai o quantil q (o Prometheus também só sabe isso)."""
+    alvo, acumulado = q * n, 0
+    for limite, c in zip(BALDES, baldes):
+        acumulado += c
+        if acumulado >= alvo:
+            return limite
+    return float("inf")
+
+def _rotulos_prom(rotulos, extra=()):
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pares) + "}"
+
+class Telemetria:
+    """
+    Registro de contadores (`contar`), tempos em histograma (`observar`,
+    `medir`) e erros (`erro`), identificados por nome + rótulos.
+    """
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._contadores = {}   # (nome, rótulos) -> valor
+        self._tempos     = {}   # (nome, rótulos) -> [n, soma, máx, baldes]
+        self._erros      = {}   # origem -> {"n", "tipo", "mensagem", "ts"}
+        self._logado     = {}   # origem -> (monotonic do último log, n naquele log)
+        self.inicio      = time.time()
+
+    # ─── registro ─────────────────────────────────────────────────────────
+    def contar(self, nome, n=1, **rotulos):
+        k = _chave(nome, rotulos)
+        with self._lock:
+            self._contadores[k] = self._contadores.get(k, 0) + n
+
+    def observar(self, nome, segundos, **rotulos):
+        k = _chave(nome, rotulos)
+        with self._lock:
+            t = self._tempos.get(k)
+            if t is None:
+                t = self._tempos[k] = [0, 0.0, 0.0, [0] * (len(BALDES) + 1)]
+            t[0] += 1
+            t[1] += segundos
+            t[2] = max(t[2], segundos)
+            i = 0
+            while i < len(BALDES) and segundos > BALDES[i]:
+                i += 1
+            t[3][i] += 1
+
+    @contextmanager
+    def medir(self, nome, **rotulos):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - t0, **rotulos)
+
+    def erro(self, origem, exc):
+        """Conta o erro e loga, no máximo uma linha por INTERVAL_LOG_ERRO por origem."""
+        tipo = type(exc).__name__
+        agora = time.monotonic()
+        with self._lock:
+            e = self._erros.setdefault(origem, {"n": 0})
+            e.update(n=e["n"] + 1, tipo=tipo, mensagem=str(exc)[:300], ts=time.time())
+            k = _chave("erros", {"origem": origem, "tipo": tipo})
+            self._contadores[k] = self._contadores.get(k, 0) + 1
+            ultimo, n_antes = self._logado.get(origem, (None, 0))
+            logar = ultimo is None or agora - ultimo >= INTERVAL_LOG_ERRO
+            if logar:
+                self._logado[origem] = (agora, e["n"])
+            n = e["n"]
+        if logar:
+            extra = f" (+{n - n_antes - 1} desde o último aviso)" if n - n_antes > 1 else ""
+            print(f"[Erro] {origem}: {tipo}: {exc}{extra}")
+
+    # ─── leitura ──────────────────────────────────────────────────────────
+    def instantaneo(self):
+        """Cópia de tudo em dicts/listas prontos para JSON."""
+        with self._lock:
+            contadores = [{"nome": n, "rotulos": dict(r), "valor": v}
+                          for (n, r), v in self._contadores.items()]
+            tempos = []
+            for (nome, r), (n, soma, maximo, baldes) in self._tempos.items():
+                tempos.append({
+                    "nome": nome, "rotulos": dict(r), "n": n, "soma_s": soma, "max_s": maximo,
+                    "p50_s": _quantil(baldes, n, 0.5), "p99_s": _quantil(baldes, n, 0.99),
+                })
+            erros = {o: dict(e) for o, e in self._erros.items()}
+        return {"ts": time.time(), "inicio": self.inicio,
+                "contadores": contadores, "tempos": tempos, "erros": erros}
+
+    def prometheus(self):
+        """Tudo no formato de texto de exposição do Prometheus (version=0.0.4)."""
+        linhas = []
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            tempos = sorted((k, (t[0], t[1], list(t[3]))) for k, t in self._tempos.items())
+        vistos = set()
+        for (nome, rotulos), valor in contadores:
+            metrica = f"{PREFIXO}{nome}_total"
+            if metrica not in vistos:
+                linhas.append(f"# TYPE {metrica} counter")
+                vistos.add(metrica)
+            linhas.append(f"{metrica}{_rotulos_prom(rotulos)} {valor}")
+        for (nome, rotulos), (n, soma, baldes) in tempos:
+            metrica = f"{PREFIXO}{nome}_segundos"
+            if metrica not in vistos:
+                linhas.append(f"# TYPE {metrica} histogram")
+                vistos.add(metrica)
+            acumulado = 0
+            for limite, c in zip(BALDES + ("+Inf",), baldes):
+                acumulado += c
+                linhas.append(f"{metrica}_bucket{_rotulos_prom(rotulos, [('le', limite)])} {acumulado}")
+            linhas.append(f"{metrica}_sum{_rotulos_prom(rotulos)} {soma}")
+            linhas.append(f"{metrica}_count{_rotulos_prom(rotulos)} {n}")
+        linhas.append(f"# TYPE {PREFIXO}inicio_segundos gauge")
+        linhas.append(f"{PREFIXO}inicio_segundos {self.inicio}")
+        return "\n".join(linhas) + "\n"
+
+    def despejar_json(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.instantaneo(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+# instância do processo; os módulos usam as funções abaixo
+TELEMETRIA = Telemetria()
+contar       = TELEMETRIA.contar
+observar     = TELEMETRIA.observar
+medir        = TELEMETRIA.medir
+erro         = TELEMETRIA.erro
+instantaneo  = TELEMETRIA.instantaneo
+prometheus   = TELEMETRIA.prometheus
+despejar_json = TELEMETRIA.despejar_json
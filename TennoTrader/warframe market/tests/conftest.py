@@ -0,0 +1,34 @@
+# conftest.py
+#
+# Os módulos do app ficam soltos na pasta de cima e se importam pelo nome.
+#   python -m pytest tests        (de dentro de "warframe market")
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def servidor(tmp_path_factory):
+    """ServidorReplay com livros fixos (uma versão só: a segunda busca é 304)."""
+    from replay import ServidorReplay, gerar_fixtures
+    pasta = tmp_path_factory.mktemp("replay")
+    gerar_fixtures(str(pasta), n_itens=5, versoes=1)
+    srv = ServidorReplay(str(pasta))
+    srv.iniciar()
+    yield srv
+    srv.parar()
+
+@pytest.fixture(scope="session")
+def motor(tmp_path_factory, servidor):
+    """O módulo motor rodando numa pasta temporária, contra o `servidor`."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("motor"))     # banco e caches do motor vão para cá
+    import motor as m
+    m.BASE_URL = servidor.url
+    m.iniciar_rede()
+    yield m
+    m.parar()
+    os.chdir(cwd)
@@ -0,0 +1,97 @@
+import pytest
+
+from agendador import AgendadorAdaptativo, _Estado
+
+class Relogio:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+def agendador(**kw):
+    relogio = Relogio()
+    return AgendadorAdaptativo(relogio=relogio, **kw), relogio
+
+def itens(saida):
+    return sorted(item for item, _ in saida)
+
+def test_calor_vai_do_intervalo_max_ao_min_em_escala_log():
+    ag, _ = agendador(intervalo_min=5.0, intervalo_max=3600.0)
+    parado, quente = _Estado(), _Estado()
+    quente.vol, quente.liquidez, quente.score = 10.0, 50, 30.0
+    assert ag.calor(parado) == 0.0
+    assert ag.calor(quente) == pytest.approx(1.0)
+    ag.adicionar("parado", {"liquidity": 0, "score": 0.0})
+    ag.adicionar("meio", {"liquidity": 50, "score": 30.0})     # h = 0.3 + 0.2
+    ag.adicionar("sem_rec")
+    assert ag._itens["parado"].intervalo == pytest.approx(3600.0)
+    assert ag._itens["sem_rec"].intervalo == pytest.approx(3600.0)
+    assert ag._itens["meio"].intervalo == pytest.approx((5.0 * 3600.0) ** 0.5)
+
+def test_orcamento_estica_todos_os_intervalos_pelo_mesmo_fator():
+    ag, relogio = agendador(orcamento=0.1, intervalo_min=10.0, intervalo_max=10.0)
+    ag.adicionar("a")
+    ag.adicionar("b")
+    assert ag.fator() == pytest.approx(2.0)           # 2 × 1/10 req/s para 0.1 de orçamento
+    assert itens(ag.vencidos()) == ["a", "b"]
+    for item in "ab":
+        ag.observar(item, None)
+    relogio.t = 19.0
+    assert ag.vencidos() == []
+    relogio.t = 20.0
+    assert itens(ag.vencidos()) == ["a", "b"]
+    assert ag.estatisticas()["taxa_planejada"] == pytest.approx(0.1)
+
+def test_orcamento_folgado_nao_encurta_intervalos():
+    ag, _ = agendador(orcamento=100.0, intervalo_min=10.0, intervalo_max=10.0)
+    ag.adicionar("a")
+    assert ag.fator() == 1.0
+
+def test_vencidos_sai_o_mais_atrasado_primeiro_e_so_uma_vez():
+    ag, relogio = agendador(intervalo_min=10.0, intervalo_max=10.0)
+    ag.adicionar("a")
+    ag.vencidos()
+    ag.observar("a", None)                            # volta em t=10
+    relogio.t = 5.0
+    ag.adicionar("b")                                 # vence já (t=0)
+    relogio.t = 12.0
+    assert [item for item, _ in ag.vencidos()] == ["b", "a"]
+    assert ag.vencidos() == []
+
+def test_item_na_fila_nao_sai_de_novo_ate_a_resposta():
+    ag, relogio = agendador(intervalo_min=10.0, intervalo_max=10.0, perdido_apos=30.0)
+    ag.adicionar("a")
+    assert itens(ag.vencidos()) == ["a"]
+    relogio.t = 10.0
+    assert ag.vencidos() == []                        # venceu, mas ainda está no coletor
+    relogio.t = 12.0
+    ag.observar("a", None)                            # remarca a partir da resposta
+    relogio.t = 21.0
+    assert ag.vencidos() == []
+    relogio.t = 22.0
+    assert itens(ag.vencidos()) == ["a"]
+
+def test_item_sem_resposta_volta_depois_de_perdido_apos():
+    ag, relogio = agendador(intervalo_min=10.0, intervalo_max=10.0, perdido_apos=30.0)
+    ag.adicionar("a")
+    ag.vencidos()
+    for t in (10.0, 20.0):
+        relogio.t = t
+        assert ag.vencidos() == []
+    relogio.t = 30.0
+    assert itens(ag.vencidos()) == ["a"]              # a busca se perdeu: manda de novo
+
+def test_observar_mudanca_aquece_e_sem_mudanca_esfria():
+    ag, relogio = agendador(intervalo_min=5.0, intervalo_max=3600.0)
+    ag.adicionar("a", {"avg_sell": 100.0, "liquidity": 0, "score": 0.0})
+    antes = ag._itens["a"].intervalo
+    ag.observar("a", {"avg_sell": 120.0, "liquidity": 0, "score": 0.0})
+    depois = ag._itens["a"].intervalo
+    assert depois < antes
+    ag.observar("a", None)
+    assert depois < ag._itens["a"].intervalo < antes
+    ag.observar("nao_agendado", None)                 # ignorado
+    e = ag.estatisticas()
+    assert (e["requisicoes"], e["com_mudanca"]) == (2, 1)
+    assert e["frescor_por_req"] == 0.5
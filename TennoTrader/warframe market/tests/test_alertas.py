@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from alertas import CAMPOS_BASE, MotorAlertas, RegraAlerta, campo_derivado, carregar_alertas
+
+def rec(item="a", **campos):
+    return {"item": item, **dict.fromkeys(CAMPOS_BASE, 10.0), **campos}
+
+def disparos(motor, item="a", ts=0, **campos):
+    return [a["regra"] for a in motor.avaliar(rec(item, **campos), ts)]
+
+def test_dispara_na_subida_e_nao_enquanto_continua_valendo():
+    motor = MotorAlertas([RegraAlerta("largo", [("spread", ">", 20)], intervalo=0)], destinos={})
+    assert disparos(motor, spread=30, ts=0) == ["largo"]
+    assert disparos(motor, spread=40, ts=10) == []
+    assert disparos(motor, spread=5, ts=20) == []
+    assert disparos(motor, spread=30, ts=30) == ["largo"]
+
+def test_intervalo_segura_um_novo_disparo_do_mesmo_item():
+    motor = MotorAlertas([RegraAlerta("largo", [("spread", ">", 20)], intervalo=900)], destinos={})
+    assert disparos(motor, spread=30, ts=0) == ["largo"]
+    assert disparos(motor, spread=5, ts=100) == []
+    assert disparos(motor, spread=30, ts=200) == []           # subiu, mas cedo demais
+    assert disparos(motor, "b", spread=30, ts=200) == ["largo"]   # outro item tem o seu
+    assert disparos(motor, spread=5, ts=950) == []
+    assert disparos(motor, spread=30, ts=1000) == ["largo"]
+
+def test_subida_engolida_pelo_intervalo_nao_dispara_depois():
+    # continuar valendo não é subir: passado o intervalo, só a próxima subida conta
+    motor = MotorAlertas([RegraAlerta("largo", [("spread", ">", 20)], intervalo=900)], destinos={})
+    disparos(motor, spread=30, ts=0)
+    disparos(motor, spread=5, ts=100)
+    assert disparos(motor, spread=30, ts=200) == []
+    assert disparos(motor, spread=30, ts=2000) == []
+
+def test_todas_as_condicoes_e_itens_da_regra():
+    regras = [RegraAlerta("barato_liquido", [("avg_sell", "<", 5), ("liquidity", ">=", 20)]),
+              RegraAlerta("so_b", [("demand", ">", 50)], itens=["b"])]
+    motor = MotorAlertas(regras, destinos={})
+    assert disparos(motor, avg_sell=3, liquidity=10, demand=60) == []
+    assert disparos(motor, "b", avg_sell=3, liquidity=25, demand=60) == ["barato_liquido", "so_b"]
+
+def test_campo_derivado_precisa_de_historico():
+    motor = MotorAlertas([RegraAlerta("queda", [("avg_sell_var_1h", "<=", -20)])], destinos={})
+    assert disparos(motor, avg_sell=100, ts=0) == []            # sem média ainda
+    assert disparos(motor, avg_sell=70, ts=60) == ["queda"]
+
+def test_destinos_recebem_na_thread_de_envio():
+    recebidos = []
+
+    class Destino:
+        def enviar(self, alerta):
+            recebidos.append(alerta["item"])
+
+    regra = RegraAlerta("largo", [("spread", ">", 20)], destinos=("teste", "inexistente"))
+    motor = MotorAlertas([regra], destinos={"teste": Destino()}).iniciar()
+    motor.avaliar(rec(spread=30), 0)
+    motor.fechar()
+    assert recebidos == ["a"]
+
+def test_regra_invalida():
+    with pytest.raises(ValueError, match="campo desconhecido"):
+        RegraAlerta("r", [("preco", ">", 1)])
+    with pytest.raises(ValueError, match="operador"):
+        RegraAlerta("r", [("spread", "=>", 1)])
+
+@pytest.mark.parametrize("nome", ["avg_sell_var_0s", "avg_sell_var_0m", "avg_sell_var_00h",
+                                  "avg_sell_var_-1h", "avg_sell_var_1w", "preco_var_1h"])
+def test_janela_invalida_nao_vira_campo_derivado(nome):
+    assert campo_derivado(nome) is None
+    with pytest.raises(ValueError, match="campo desconhecido"):
+        RegraAlerta("r", [(nome, "<", 0)])
+
+def test_janelas_validas():
+    assert campo_derivado("avg_sell_var_1s") == ("avg_sell", 1)
+    assert campo_derivado("spread_var_15m") == ("spread", 900)
+    assert campo_derivado("demand_var_10d") == ("demand", 864000)
+
+def test_regra_invalida_no_arquivo_nao_leva_as_outras(tmp_path, capsys):
+    path = tmp_path / "alertas.json"
+    path.write_text(json.dumps({"webhook": "http://x", "regras": [
+        {"nome": "boa", "condicoes": [["spread", ">", 20]]},
+        {"nome": "janela_zero", "condicoes": [["avg_sell_var_0s", "<", -10]]},
+        {"nome": "sem_condicoes"},
+        {"nome": "valor_texto", "condicoes": [["spread", ">", "muito"]]},
+        {"nome": "outra", "condicoes": [["demand", ">=", 5]], "itens": ["a"]},
+    ]}), encoding="utf-8")
+    regras, webhook = carregar_alertas(str(path))
+    assert [r.nome for r in regras] == ["boa", "outra"]
+    assert webhook == "http://x"
+    assert capsys.readouterr().out.count("[Alertas] Ignorando") == 3
+
+def test_banco_ilegivel_nao_desliga_os_alertas(motor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "alertas.json").write_text(json.dumps(
+        [{"nome": "queda", "condicoes": [["avg_sell_var_1h", "<=", -20]], "destinos": []}]),
+        encoding="utf-8")
+    monkeypatch.setattr(motor, "DB_PATH", str(tmp_path / "nao" / "existe.db"))
+    motor.iniciar_alertas()
+    try:
+        assert motor.motor_alertas is not None
+        assert [r.nome for r in motor.motor_alertas.regras] == ["queda"]
+    finally:
+        motor.motor_alertas.fechar()
+        motor.motor_alertas = None
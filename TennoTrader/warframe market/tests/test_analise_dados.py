@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from analise_dados import calcular_metricas, calcular_metricas_lote
+
+def ordens(rnd, n, base, inteiro=True):
+    saida = []
+    for _ in range(n):
+        preco = base * rnd.lognormvariate(0, 0.3)
+        if rnd.random() < 0.05:
+            preco *= 20                     # outlier
+        o = {"platinum": max(1, round(preco)) if inteiro else preco}
+        if rnd.random() < 0.5:
+            o["volume"] = rnd.randint(1, 10)
+        saida.append(o)
+    return saida
+
+def livros(seed, inteiro=True):
+    rnd = random.Random(seed)
+    saida = [([], []), ([{"platinum": 7}], []), ([], [{"platinum": 3, "volume": 2}])]
+    for _ in range(300):
+        base = rnd.uniform(5, 500)
+        saida.append((ordens(rnd, rnd.choice((0, 1, 2, 3, 5, 30, 120)), base, inteiro),
+                      ordens(rnd, rnd.choice((0, 1, 2, 4, 40)), base * 0.8, inteiro)))
+    return saida
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lote_igual_ao_livro_a_livro_com_precos_inteiros(seed):
+    lote = livros(seed)
+    assert calcular_metricas_lote(lote) == [calcular_metricas(s, b) for s, b in lote]
+
+def test_lote_com_precos_fracionarios():
+    lote = livros(4, inteiro=False)
+    for rapido, ref in zip(calcular_metricas_lote(lote), (calcular_metricas(s, b) for s, b in lote)):
+        assert rapido.keys() == ref.keys()
+        for campo, valor in ref.items():
+            # arredondado a 1 casa: uma diferença no último bit pode mudar o arredondamento
+            assert rapido[campo] == pytest.approx(valor, abs=0.11), campo
+
+def test_lote_vazio():
+    assert calcular_metricas_lote([]) == []
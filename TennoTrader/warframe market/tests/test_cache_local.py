@@ -0,0 +1,60 @@
+import os
+
+from cache_local import CAMPOS_F, CAMPOS_I, REGISTRO, CacheIncremental
+
+def rec(item, preco):
+    return {"item": item, **{c: float(preco) for c in CAMPOS_F},
+            **{c: 1 for c in CAMPOS_I}, "score": 2.0}
+
+def test_ultima_versao_de_cada_item_volta_na_abertura(tmp_path):
+    c = CacheIncremental(str(tmp_path))
+    c.gravar(rec("x", 10), 11.0, ts=1)
+    c.gravar(rec("y", 20), ts=2)
+    c.gravar(rec("x", 12), 13.0, ts=3)
+    c.fechar()
+
+    dados = CacheIncremental(str(tmp_path)).carregar()
+    assert set(dados) == {"x", "y"}
+    assert (dados["x"]["ts"], dados["x"]["avg_sell"], dados["x"]["pred_sell"]) == (3, 12.0, 13.0)
+    assert dados["y"]["spread"] == 20.0
+
+def test_registro_pela_metade_no_fim_e_cortado(tmp_path):
+    c = CacheIncremental(str(tmp_path))
+    c.gravar(rec("x", 10), ts=1)
+    c.fechar()
+    arq = tmp_path / "registros.bin"
+    with open(arq, "ab") as f:
+        f.write(REGISTRO.pack(0, 2, *[99.0] * 7, 1, 1, 1, 0.0, 0.0)[:REGISTRO.size // 2])
+
+    c = CacheIncremental(str(tmp_path))
+    assert os.path.getsize(arq) == REGISTRO.size
+    assert c.carregar()["x"]["avg_sell"] == 10.0
+    # o que vem depois continua alinhado
+    c.gravar(rec("x", 14), ts=3)
+    c.fechar()
+    assert CacheIncremental(str(tmp_path)).carregar()["x"]["avg_sell"] == 14.0
+
+def test_nome_pela_metade_e_registro_sem_nome(tmp_path):
+    c = CacheIncremental(str(tmp_path))
+    c.gravar(rec("x", 10), ts=1)
+    c.fechar()
+    with open(tmp_path / "itens.txt", "ab") as f:
+        f.write(b"item_corta")
+    with open(tmp_path / "registros.bin", "ab") as f:
+        f.write(REGISTRO.pack(5, 2, *[99.0] * 7, 1, 1, 1, 0.0, 0.0))   # id sem nome
+
+    c = CacheIncremental(str(tmp_path))
+    assert (tmp_path / "itens.txt").read_bytes() == b"x\n"
+    assert list(c.carregar()) == ["x"]
+    c.gravar(rec("y", 20), ts=3)
+    c.fechar()
+    assert set(CacheIncremental(str(tmp_path)).carregar()) == {"x", "y"}
+
+def test_compacta_quando_o_log_cresce(tmp_path):
+    c = CacheIncremental(str(tmp_path), fator_compactar=2, min_compactar=4)
+    for k in range(10):
+        c.gravar(rec("x", k), ts=k)
+        c.descarregar()
+    c.fechar()
+    assert os.path.getsize(tmp_path / "registros.bin") < 10 * REGISTRO.size
+    assert CacheIncremental(str(tmp_path)).carregar()["x"]["avg_sell"] == 9.0
@@ -0,0 +1,106 @@
+import requests
+
+from cliente_http import ClienteCondicional
+from replay import ServidorReplay, gerar_fixtures
+
+ENDPOINT = "/items/item_sintetico_0/orders"
+
+def novo_cliente(servidor, pasta):
+    return ClienteCondicional(requests.Session(), servidor.url, {}, str(pasta))
+
+def test_304_devolve_o_corpo_guardado(servidor, tmp_path):
+    cliente = novo_cliente(servidor, tmp_path)
+    r1, corpo1, mudou1 = cliente.get(ENDPOINT)
+    r2, corpo2, mudou2 = cliente.get(ENDPOINT)
+    assert (r1.status_code, mudou1) == (200, True)
+    assert (r2.status_code, mudou2) == (304, False)
+    assert corpo2 == corpo1
+    assert (cliente.hits, cliente.misses) == (1, 1)
+
+def test_200_com_o_mesmo_hash_conta_como_sem_mudanca(servidor, tmp_path):
+    cliente = novo_cliente(servidor, tmp_path)
+    cliente.get(ENDPOINT)
+    cliente._meta[ENDPOINT]["etag"] = None      # sem If-None-Match: só o hash decide
+    resp, _, mudou = cliente.get(ENDPOINT)
+    assert resp.status_code == 200
+    assert not mudou
+    assert cliente.hits == 1
+
+def test_validadores_sobrevivem_a_um_reinicio(servidor, tmp_path):
+    _, corpo, _ = novo_cliente(servidor, tmp_path).get(ENDPOINT)
+    resp, corpo2, mudou = novo_cliente(servidor, tmp_path).get(ENDPOINT)
+    assert resp.status_code == 304
+    assert not mudou
+    assert corpo2 == corpo
+
+def test_livro_novo_conta_como_mudanca(tmp_path):
+    gerar_fixtures(str(tmp_path / "fixtures"), n_itens=1, versoes=2)
+    srv = ServidorReplay(str(tmp_path / "fixtures"))
+    srv.iniciar()
+    try:
+        cliente = novo_cliente(srv, tmp_path / "cache")
+        cliente.get(ENDPOINT)
+        resp, _, mudou = cliente.get(ENDPOINT)
+        assert resp.status_code == 200
+        assert mudou
+        assert cliente.misses == 2
+    finally:
+        srv.parar()
+
+def test_erro_do_servidor_nao_grava_nada(servidor, tmp_path):
+    cliente = novo_cliente(servidor, tmp_path)
+    resp, _, mudou = cliente.get("/items/nao_existe/orders")
+    assert resp.status_code == 404
+    assert mudou
+    assert not list(tmp_path.iterdir())
+
+def test_livro_sem_mudanca_so_e_pulado_depois_de_registrado(motor):
+    item = "item_sintetico_1"
+    rec = motor.calcular_dados(item)
+    assert rec is not None
+    assert motor.calcular_dados(item) is not None     # 304, mas nada registrado ainda
+    motor.registrar_resultado(rec)
+    assert motor.calcular_dados(item) is None
+
+def test_reinicio_recalcula_livro_sem_mudanca(motor):
+    item = "item_sintetico_2"
+    motor.registrar_resultado(motor.calcular_dados(item))
+    # reinício: o http_cache continua no disco, o processo começa do zero
+    motor.calculados.clear()
+    motor.iniciar_rede()
+    rec = motor.calcular_dados(item)
+    assert rec is not None
+    assert rec["item"] == item
+
+class Resposta429:
+    status_code = 429
+    raw = None
+
+    def __init__(self, espera):
+        self.headers = {"Retry-After": espera}
+
+def test_429_no_catalogo_avisa_em_vez_de_catalogo_vazio(motor, monkeypatch):
+    chamadas = []
+
+    def get(endpoint):
+        chamadas.append(endpoint)
+        return Resposta429("0"), b"", True
+
+    monkeypatch.setattr(motor.cliente, "get", get)
+    monkeypatch.setattr(motor, "aviso_catalogo", None)
+    antes = len(motor.fila)
+    motor.descobrir_catalogo()
+    assert chamadas == ["/items"] * motor.TENTATIVAS_CATALOGO
+    assert motor.aviso_catalogo is not None
+    assert len(motor.fila) == antes
+
+def test_429_no_catalogo_espera_e_tenta_de_novo(motor, servidor, monkeypatch):
+    original, esperas = motor.cliente.get, []
+    respostas = iter([(Resposta429("7"), b"", True)])
+
+    monkeypatch.setattr(motor.cliente, "get", lambda endpoint: next(respostas, None) or original(endpoint))
+    # time é o módulo de todos: outras threads também passam por aqui
+    monkeypatch.setattr(motor.time, "sleep", esperas.append)
+    itens = motor.get_all_items()
+    assert 7.0 in esperas
+    assert len(itens) == 5
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import coletor
+from coletor import Coletor, LimiteTaxa, TokenBucket
+
+class Relogio:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+@pytest.fixture
+def dormidas(monkeypatch):
+    """asyncio.sleep do coletor anda o relógio falso em vez de dormir; devolve (relógio, esperas)."""
+    relogio, esperas = Relogio(), []
+
+    async def dormir(s):
+        esperas.append(s)
+        relogio.t += s
+
+    monkeypatch.setattr(coletor.asyncio, "sleep", dormir)
+    return relogio, esperas
+
+def adquirir(balde, n=1):
+    async def varias():
+        for _ in range(n):
+            await balde.adquirir()
+    asyncio.run(varias())
+
+def test_balde_libera_a_rajada_e_depois_espaca_pela_taxa(dormidas):
+    relogio, esperas = dormidas
+    balde = TokenBucket(2.0, capacidade=2, relogio=relogio)
+    adquirir(balde, 2)
+    assert esperas == []
+    adquirir(balde, 2)
+    assert esperas == [pytest.approx(0.5), pytest.approx(0.5)]
+
+def test_429_corta_a_taxa_e_trava_pelo_retry_after(dormidas):
+    relogio, esperas = dormidas
+    balde = TokenBucket(4.0, capacidade=4, taxa_min=0.5, relogio=relogio)
+    balde.penalizar(3.0)
+    assert balde.taxa == 2.0
+    adquirir(balde)
+    assert relogio.t >= 3.0
+    for _ in range(5):
+        balde.penalizar(0.0)
+    assert balde.taxa == 0.5                        # não passa de taxa_min
+
+def test_429_sem_retry_after_trava_por_uma_ficha(dormidas):
+    relogio, _ = dormidas
+    balde = TokenBucket(4.0, relogio=relogio)
+    balde.penalizar()
+    adquirir(balde)
+    assert relogio.t == pytest.approx(0.5)          # 1 / taxa nova
+
+def test_taxa_volta_aos_poucos_depois_de_sucessos_seguidos():
+    balde = TokenBucket(4.0, recuperar_apos=3, relogio=Relogio())
+    balde.penalizar(0.0)
+    balde.penalizar(0.0)
+    assert balde.taxa == 1.0
+    for _ in range(2):
+        balde.sucesso()
+    assert balde.taxa == 1.0
+    balde.sucesso()
+    assert balde.taxa == 1.25
+    for _ in range(30):
+        balde.sucesso()
+    assert balde.taxa == 4.0                        # não passa da base
+
+def coletar(buscar, itens, **kw):
+    resultados = []
+    c = Coletor(buscar, ao_resultado=resultados.append, concorrencia=1, taxa=100.0, **kw)
+    for prioridade, item in enumerate(itens):
+        c.agendar(item, prioridade)
+    try:
+        return c, c.varrer_bloqueante(), resultados
+    finally:
+        c.fechar()
+
+def test_coletor_reagenda_o_item_limitado_na_frente_da_fila():
+    chamadas = []
+
+    def buscar(item):
+        chamadas.append(item)
+        if chamadas.count(item) == 1 and item == "a":
+            raise LimiteTaxa(0.0)
+        return {"item": item}
+
+    c, stats, resultados = coletar(buscar, ["a", "b"])
+    assert chamadas == ["a", "a", "b"]
+    assert [r["item"] for r in resultados] == ["a", "b"]
+    assert (stats["limitadas"], stats["sucessos"], stats["falhas"]) == (1, 2, 0)
+    assert c.limitador.taxa == 50.0
+
+def test_coletor_desiste_depois_de_max_tentativas():
+    chamadas = []
+
+    def buscar(item):
+        chamadas.append(item)
+        raise LimiteTaxa(0.0)
+
+    _, stats, resultados = coletar(buscar, ["a"], max_tentativas=3)
+    assert chamadas == ["a"] * 3
+    assert resultados == []
+    assert (stats["limitadas"], stats["falhas"]) == (3, 1)
@@ -0,0 +1,140 @@
+import random
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import telemetria
+from database import COLUNAS, INSERT_SERIES_SQL, MIGRACOES, GravadorLote, init_db
+from rollups import reconstruir_rollups
+
+TS0 = 1_700_000_000
+
+def test_migra_market_data_antiga_ate_a_versao_atual(tmp_path):
+    path = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE market_data ({', '.join(COLUNAS)})")
+    conn.executemany(f"INSERT INTO market_data VALUES ({','.join('?' * len(COLUNAS))})", [
+        (TS0, "b", 10.0, 8, 10, 8, 10, 8, 2, 3, 4, 5, 6.0),
+        (TS0 + 60, "a", 20.0, 16, 20, 16, 20, 16, 4, 1, 1, 1, 2.0),
+        (TS0 + 120, "a", 22.0, 16, 20, 16, 20, 16, 4, 1, 1, 1, 2.0),
+        (None, "a", 1.0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1.0),       # sem ts: fica para trás
+    ])
+    conn.commit()
+    conn.close()
+
+    conn = init_db(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRACOES)
+        tabelas = {n for n, in conn.execute("SELECT name FROM sqlite_master")}
+        assert {"items", "market_series", "features", "marcas", "rollups",
+                "formulas", "pontuacoes", "market_series_rollup",
+                "market_series_rollup_troca"} <= tabelas
+        assert "market_data_legacy" not in tabelas
+        assert conn.execute("SELECT item, ts, avg_sell FROM market_data ORDER BY ts").fetchall() == \
+            [("b", TS0, 10.0), ("a", TS0 + 60, 20.0), ("a", TS0 + 120, 22.0)]
+        # os rollups já saem montados com o histórico migrado
+        assert conn.execute("""
+            SELECT open, high, low, close, n FROM rollups r JOIN items i ON i.id = r.item_id
+            WHERE i.url_name = 'a' AND res = 86400
+        """).fetchall() == [(20.0, 22.0, 20.0, 22.0, 2)]
+    finally:
+        conn.close()
+    # abrir de novo não migra nada
+    init_db(path).close()
+
+def linhas_aleatorias(n, itens, seed):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        preco = None if rnd.random() < 0.05 else rnd.uniform(1, 100)
+        yield (rnd.randint(1, itens), TS0 + rnd.randint(0, 3 * 86400), preco,
+               1, 1, 1, 1, 1, rnd.uniform(0, 5), rnd.randint(0, 9), rnd.randint(0, 9), 1, 1.0)
+
+def rollups(conn):
+    return conn.execute("SELECT * FROM rollups ORDER BY res, item_id, balde").fetchall()
+
+def test_trigger_com_reescritas_bate_com_a_reconstrucao(tmp_path):
+    conn = init_db(str(tmp_path / "t.db"))
+    with conn:
+        conn.executemany("INSERT INTO items(id, url_name) VALUES (?, ?)",
+                         ((i, f"item_{i}") for i in range(1, 4)))
+    linhas = list(linhas_aleatorias(3000, 3, seed=1))
+    rnd = random.Random(2)
+    # chaves repetidas: preço novo, e algumas linhas que perdem o preço
+    linhas += [(*r[:2], rnd.uniform(1, 100), *r[3:]) for r in rnd.sample(linhas, 300)]
+    linhas += [(*r[:2], None, *r[3:]) for r in rnd.sample(linhas, 50)]
+    with conn:
+        conn.executemany(INSERT_SERIES_SQL, linhas)
+    pelo_trigger = rollups(conn)
+    with conn:
+        reconstruir_rollups(conn)
+    reconstruidos = rollups(conn)
+    conn.close()
+    assert len(pelo_trigger) == len(reconstruidos)
+    for a, b in zip(pelo_trigger, reconstruidos):
+        assert a == pytest.approx(b)
+
+def contador(nome):
+    return sum(c["valor"] for c in telemetria.instantaneo()["contadores"] if c["nome"] == nome)
+
+def registro(item, preco):
+    return {"item": item, **dict.fromkeys(COLUNAS[2:], preco)}
+
+def travar(path, segundos):
+    """Segura a escrita do banco por `segundos` numa thread; devolve a thread."""
+    pronto = threading.Event()
+
+    def segurar():
+        conn = sqlite3.connect(path)
+        conn.execute("BEGIN IMMEDIATE")
+        pronto.set()
+        time.sleep(segundos)
+        conn.rollback()
+        conn.close()
+
+    t = threading.Thread(target=segurar)
+    t.start()
+    pronto.wait()
+    return t
+
+def test_gravador_espera_o_banco_travado_sem_perder_linhas(tmp_path):
+    path = str(tmp_path / "t.db")
+    gravador = GravadorLote(path, intervalo=0.05, timeout=0.1)
+    perdidas = contador("db_linhas_perdidas")
+    trava = travar(path, 1.5)
+    gravador.gravar(registro("a", 10.0), ts=TS0)
+    assert not gravador.flush(timeout=0.5)       # ainda travado: o lote espera
+    trava.join()
+    assert gravador.flush(timeout=10)
+    gravador.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM market_series").fetchone()[0] == 1
+    conn.close()
+    assert contador("db_linhas_perdidas") == perdidas
+    assert contador("db_ocupado") > 0
+
+def test_gravador_desiste_no_close_se_o_banco_nao_destrava(tmp_path):
+    path = str(tmp_path / "t.db")
+    gravador = GravadorLote(path, intervalo=0.05, timeout=0.05, atraso_max=0.1)
+    perdidas = contador("db_linhas_perdidas")
+    trava = travar(path, 1)
+    gravador.gravar(registro("a", 10.0), ts=TS0)
+    gravador.gravar(registro("b", 10.0), ts=TS0)
+    gravador.close()
+    assert contador("db_linhas_perdidas") == perdidas + 2
+    trava.join()
+
+def test_lote_atrasado_desce_as_marcas_de_reabrir(tmp_path):
+    path = str(tmp_path / "t.db")
+    gravador = GravadorLote(path, reabrir=("modelo",), margem=10)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany("INSERT INTO marcas VALUES (?, ?)", [("modelo", TS0 + 500), ("outra", TS0 + 500)])
+    gravador.gravar(registro("a", 10.0))                 # recente: não mexe
+    assert gravador.flush(timeout=10)
+    assert conn.execute("SELECT ts FROM marcas ORDER BY nome").fetchall() == [(TS0 + 500,)] * 2
+    gravador.gravar(registro("a", 10.0), ts=TS0)
+    gravador.close()
+    assert conn.execute("SELECT ts FROM marcas ORDER BY nome").fetchall() == [(TS0 - 1,), (TS0 + 500,)]
+    conn.close()
@@ -0,0 +1,128 @@
+import sqlite3
+import time
+
+import pytest
+
+import ingest_data
+from database import COLUNAS
+
+def linha(ts, item, preco=10.0, extra=0):
+    campos = [str(ts), item] + [str(preco)] * (len(COLUNAS) - 2) + ["x"] * extra
+    return "\t".join(campos) + "\n"
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_linhas_malformadas_entram_nas_descartadas(tmp_path, processos):
+    tsv = tmp_path / "dump.tsv"
+    tsv.write_text(linha(1000, "a") + linha(1060, "a", extra=2) + linha("nada", "b") +
+                   linha(1000, "b") + linha(1060, "") + linha(1120, "b"), encoding="utf-8")
+    r = ingest_data.importar(str(tsv), str(tmp_path / "t.db"), processos=processos)
+    assert (r["linhas"], r["descartadas"]) == (3, 3)
+    conn = sqlite3.connect(tmp_path / "t.db")
+    assert conn.execute("SELECT COUNT(*) FROM market_series").fetchone()[0] == 3
+    conn.close()
+
+class PoolContado:
+    """Executa na hora, mas conta quantos resultados foram submetidos e não lidos."""
+
+    def __init__(self):
+        self.em_voo = self.maximo = 0
+
+    def submit(self, fn, *args):
+        self.em_voo += 1
+        self.maximo = max(self.maximo, self.em_voo)
+        return _Lido(fn(*args), self)
+
+class _Lido:
+    def __init__(self, valor, pool):
+        self.valor, self.pool = valor, pool
+
+    def result(self):
+        self.pool.em_voo -= 1
+        return self.valor
+
+def test_leitura_paralela_limita_trechos_em_voo(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_data, "ler_trecho", lambda path, i, f, sep, cab: i)
+    pool = PoolContado()
+    partes = [(k, k + 1) for k in range(20)]
+    lidos = list(ingest_data.ler_em_paralelo(pool, 4, "x", partes, "\t", False))
+    assert lidos == list(range(20))
+    assert pool.maximo == 4
+
+def test_importacao_no_passado_refaz_features_e_pontuacoes(tmp_path):
+    from features import atualizar_features
+    from pontuacao import Formula, atualizar_pontuacoes
+    db = str(tmp_path / "t.db")
+    formulas = {"dobro": Formula("dobro", "avg_sell * 2")}
+
+    def importar(nome, linhas):
+        (tmp_path / nome).write_text("".join(linhas), encoding="utf-8")
+        ingest_data.importar(str(tmp_path / nome), db)
+
+    def tabelas():
+        conn = sqlite3.connect(db)
+        try:
+            return (conn.execute("SELECT * FROM features ORDER BY item_id, ts").fetchall(),
+                    conn.execute("SELECT * FROM pontuacoes ORDER BY item_id, ts").fetchall())
+        finally:
+            conn.close()
+
+    importar("novo.tsv", [linha(5000 + 60 * k, "a", 10 + k) for k in range(5)] +
+             [linha(9000 + 60 * k, "b", 30 + k) for k in range(5)])
+    atualizar_features(db)
+    atualizar_pontuacoes(db, formulas)
+    # dump antigo: "a" ganha linhas antes das dele, "b" só depois da marca de "a"
+    importar("antigo.tsv", [linha(1000 + 60 * k, "a", 50 + k) for k in range(3)] +
+             [linha(5500 + 60 * k, "b", 70 + k) for k in range(3)])
+    atualizar_features(db)
+    atualizar_pontuacoes(db, formulas)
+    incremental = tabelas()
+
+    atualizar_features(db, reconstruir=True)
+    atualizar_pontuacoes(db, formulas, reconstruir=True)
+    assert incremental == tabelas()
+    assert len(incremental[0]) == len(incremental[1]) == 16
+
+def test_importacao_no_passado_volta_a_marca_do_modelo(tmp_path):
+    from modelo import MARCA, ModeloIncremental
+    db = str(tmp_path / "t.db")
+    (tmp_path / "novo.tsv").write_text("".join(linha(5000 + 60 * k, "a", 10 + k) for k in range(5)),
+                                       encoding="utf-8")
+    ingest_data.importar(str(tmp_path / "novo.tsv"), db)
+    conn = sqlite3.connect(db)
+    modelo = ModeloIncremental()
+    assert modelo.atualizar(conn) == 5
+    assert modelo.atualizar(conn) == 0
+    assert conn.execute("SELECT ts FROM marcas WHERE nome = ?", (MARCA,)).fetchone() == (5240,)
+
+    (tmp_path / "antigo.tsv").write_text("".join(linha(1000 + 60 * k, "a", 50 + k) for k in range(3)),
+                                         encoding="utf-8")
+    ingest_data.importar(str(tmp_path / "antigo.tsv"), db)
+    assert conn.execute("SELECT ts FROM marcas WHERE nome = ?", (MARCA,)).fetchone() == (999,)
+    assert modelo.atualizar(conn) == 8       # as antigas e, de novo, as que já tinha visto
+    assert modelo.marca_ts == 5240
+    assert conn.execute("SELECT ts FROM marcas WHERE nome = ?", (MARCA,)).fetchone() == (5240,)
+    conn.close()
+
+def test_importacao_no_passado_reajusta_os_previsores(motor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(motor, "PREVISORES", None)
+    agora = int(time.time())
+    db = str(tmp_path / "t.db")
+    (tmp_path / "novo.tsv").write_text(
+        "".join(linha(agora - 3000 + 60 * k, "a", 10 + k % 3) for k in range(30)), encoding="utf-8")
+    ingest_data.importar(str(tmp_path / "novo.tsv"), db)
+    conn = sqlite3.connect(db)
+    ajustado_em = motor.atualizar_previsores(conn, 0.0)
+    assert motor.PREVISORES.tabela["n"].tolist() == [30]
+    # nada novo: fica como está
+    assert motor.atualizar_previsores(conn, ajustado_em) == ajustado_em
+
+    (tmp_path / "antigo.tsv").write_text(
+        "".join(linha(agora - 9000 + 60 * k, "a", 20) for k in range(5)), encoding="utf-8")
+    ingest_data.importar(str(tmp_path / "antigo.tsv"), db)
+    assert motor.atualizar_previsores(conn, ajustado_em) > ajustado_em
+    assert motor.PREVISORES.tabela["n"].tolist() == [35]
+    # a marca subiu de novo: o próximo ciclo não reajusta
+    ajustado_em = time.time()
+    assert motor.atualizar_previsores(conn, ajustado_em) == ajustado_em
+    conn.close()
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from database import INSERT_SERIES_SQL, METRICAS, init_db
+from pontuacao import Formula, atualizar_pontuacoes, carregar_formulas, pontuar
+
+REC = {"item": "a", **dict.fromkeys(METRICAS, 2.0), "avg_buy": 1.0, "spread": 4.0}
+
+@pytest.mark.parametrize("expressao, erro", [
+    ("spread +", "invalid syntax|fórmula"),
+    ("__import__('os')", "função desconhecida|só chamadas"),
+    ("preco * 2", "campo desconhecido"),
+    ("spread.real", "Attribute"),
+    ("'x' + spread", "não é número"),
+    ("True + spread", "não é número"),
+    ("1 < spread < 3", "encadeada"),
+    ("max(spread)", "2 argumento"),
+    ("abs(spread, 2)", "1 argumento"),
+    ("where(spread > 1)", "3 argumento"),
+    ("clip(spread, lo=0, hi=1)", "só chamadas"),
+    ("[spread][0]", "não é permitido"),
+])
+def test_formula_invalida_falha_na_carga(expressao, erro):
+    with pytest.raises(ValueError, match=erro):
+        Formula("f", expressao)
+
+def test_mesma_formula_num_registro_e_em_colunas():
+    f = Formula("margem", "(avg_sell - avg_buy) / max(avg_buy, 1) * 100 + where(spread > 3, 1, 0)")
+    assert f.campos == ("avg_buy", "avg_sell", "spread")
+    assert pontuar({"margem": f}, REC) == {"margem": 101.0}
+    colunas = {"avg_sell": np.array([2.0, 3.0]), "avg_buy": np.array([1.0, 0.5]),
+               "spread": np.array([4.0, 1.0])}
+    assert f.avaliar(colunas).tolist() == [101.0, 250.0]
+
+def test_valor_nao_finito_vira_none_sem_derrubar_as_outras():
+    formulas = {"grande": Formula("grande", "10 ** 10 ** 10 + spread"),
+                "zero": Formula("zero", "spread / (demand - demand)"),
+                "ok": Formula("ok", "spread * 2")}
+    assert pontuar(formulas, REC) == {"grande": None, "zero": None, "ok": 8.0}
+    assert pontuar(formulas, {**REC, "spread": None})["ok"] is None
+
+def test_carregar_ignora_so_as_invalidas(tmp_path, capsys):
+    path = tmp_path / "pontuacoes.json"
+    path.write_text(json.dumps({"boa": "spread * 2", "ruim": "max(spread)"}), encoding="utf-8")
+    assert list(carregar_formulas(str(path))) == ["boa"]
+    assert "[Pontuação] Ignorando" in capsys.readouterr().out
+    assert carregar_formulas(str(tmp_path / "nao_existe.json")) == {}
+
+def test_score_do_usuario_nao_toca_market_series(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = init_db(path)
+    with conn:
+        conn.execute("INSERT INTO items(id, url_name) VALUES (1, 'a')")
+        conn.executemany(INSERT_SERIES_SQL, [(1, 1000 + k, *[float(k)] * len(METRICAS))
+                                             for k in range(5)])
+    formulas = {"score": Formula("score", "spread * 100")}
+    assert atualizar_pontuacoes(path, formulas) == 5
+    assert conn.execute("SELECT score FROM market_series ORDER BY ts").fetchall() == \
+        [(float(k),) for k in range(5)]
+    assert conn.execute("SELECT valor FROM pontuacoes ORDER BY ts").fetchall() == \
+        [(k * 100.0,) for k in range(5)]
+    # expressão trocada refaz o histórico dela
+    formulas["score"] = Formula("score", "spread + 1")
+    assert atualizar_pontuacoes(path, formulas) == 5
+    assert conn.execute("SELECT valor FROM pontuacoes ORDER BY ts").fetchall() == \
+        [(k + 1.0,) for k in range(5)]
+    conn.close()
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from recomendacoes import REGRAS_PADRAO, MotorRecomendacoes, Regra, carregar_regras
+
+def rec(item, **campos):
+    base = dict.fromkeys(("avg_sell", "avg_buy", "median_sell", "median_buy",
+                          "weighted_avg_sell", "weighted_avg_buy", "spread",
+                          "demand", "supply", "liquidity", "score"), 0.0)
+    return {"item": item, **base, **campos}
+
+@pytest.mark.parametrize("condicoes, ordenar, formato, erro", [
+    ([("spred", ">=", 5)], "spread", "{item}", "campo desconhecido"),
+    ([("spread", "=>", 5)], "spread", "{item}", "operador desconhecido"),
+    ([("spread", ">=", "5")], "spread", "{item}", "não é número"),
+    ([("spread", ">=", 5)], "item", "{item}", "ordenar"),
+    ([("spread", ">=", 5)], "spread", "{item} {lucro}", "formato"),
+])
+def test_regra_invalida_falha_na_criacao(condicoes, ordenar, formato, erro):
+    with pytest.raises(ValueError, match=erro):
+        Regra("r", "R", condicoes, ordenar, formato=formato)
+
+def test_regra_invalida_e_ignorada_sem_levar_as_outras(tmp_path, capsys):
+    path = tmp_path / "regras.json"
+    path.write_text(json.dumps([
+        {"nome": "ruim", "titulo": "Ruim", "condicoes": [["spread", ">=", 5]], "ordenar": "item"},
+        {"nome": "sem_titulo", "condicoes": [], "ordenar": "spread"},
+        {"nome": "caros", "titulo": "Caros", "condicoes": [["avg_sell", ">", 100]],
+         "ordenar": "avg_sell", "limite": 1},
+    ]), encoding="utf-8")
+    regras = carregar_regras(str(path))
+    nomes = [r.nome for r in regras]
+    assert nomes == [r.nome for r in REGRAS_PADRAO] + ["caros"]
+    saida = capsys.readouterr().out
+    assert saida.count("[Recomendações] Ignorando") == 2
+
+    motor = MotorRecomendacoes(regras)
+    motor.atualizar([rec("a", avg_sell=150.0), rec("b", avg_sell=300.0), rec("c", avg_sell=50.0)])
+    assert [r["item"] for r in motor.top("caros")] == ["b"]
@@ -0,0 +1,62 @@
+import os
+
+from snapshots import DTYPE_LIVRO, DTYPE_ORDEM, ArmazemSnapshots
+
+TS  = 1_700_000_000
+DIA = "2023-11-14"
+
+def livro(preco, n=2, status="online"):
+    return [{"platinum": preco + k, "quantity": 1, "order_type": ("sell", "buy")[k % 2],
+             "user": {"ingame_name": f"u{k}", "status": status}} for k in range(n)]
+
+def precos(armazem):
+    return [(item, [o["platinum"] for o in sells + buys])
+            for _, item, sells, buys in armazem.reproduzir()]
+
+def acrescentar(caminho, dados):
+    with open(caminho, "ab") as f:
+        f.write(dados)
+
+def test_ordens_orfas_e_livro_pela_metade_sao_cortados(tmp_path):
+    a = ArmazemSnapshots(str(tmp_path))
+    a.gravar("x", livro(10), TS)
+    a.gravar("y", livro(20), TS + 1)
+    pasta = tmp_path / DIA
+    # crash no meio de outro livro: 3 ordens e meia, e meio registro de livro
+    acrescentar(pasta / "ordens.bin", b"\x01" * (DTYPE_ORDEM.itemsize * 3 + 5))
+    acrescentar(pasta / "livros.bin", b"\x02" * (DTYPE_LIVRO.itemsize // 2))
+
+    b = ArmazemSnapshots(str(tmp_path))
+    b.gravar("z", livro(30, n=3), TS + 2)
+    assert os.path.getsize(pasta / "ordens.bin") == 7 * DTYPE_ORDEM.itemsize
+    assert os.path.getsize(pasta / "livros.bin") == 3 * DTYPE_LIVRO.itemsize
+    assert precos(b) == [("x", [10, 11]), ("y", [20, 21]), ("z", [30, 32, 31])]
+
+def test_livro_sem_as_ordens_e_descartado(tmp_path):
+    a = ArmazemSnapshots(str(tmp_path))
+    a.gravar("x", livro(10), TS)
+    a.gravar("y", livro(20), TS + 1)
+    arq = tmp_path / DIA / "ordens.bin"
+    with open(arq, "r+b") as f:
+        f.truncate(3 * DTYPE_ORDEM.itemsize)        # o livro de "y" perdeu uma ordem
+
+    b = ArmazemSnapshots(str(tmp_path))
+    b.gravar("z", livro(30), TS + 2)
+    assert precos(b) == [("x", [10, 11]), ("z", [30, 31])]
+
+def test_nome_pela_metade_no_dicionario(tmp_path):
+    a = ArmazemSnapshots(str(tmp_path))
+    a.gravar("x", livro(10), TS)
+    acrescentar(tmp_path / "itens.txt", "item_corta".encode("utf-8"))
+
+    b = ArmazemSnapshots(str(tmp_path))
+    b.gravar("y", livro(20), TS + 1)
+    assert (tmp_path / "itens.txt").read_text(encoding="utf-8") == "x\ny\n"
+    assert precos(b) == [("x", [10, 11]), ("y", [20, 21])]
+
+def test_order_type_desconhecido_nao_derruba_a_gravacao(tmp_path):
+    a = ArmazemSnapshots(str(tmp_path))
+    ordens = livro(10)
+    ordens[1]["order_type"] = "leilao"
+    a.gravar("x", ordens, TS)
+    assert precos(a) == [("x", [10])]
@@ -0,0 +1,131 @@
+# treino.py
+#
+# Avaliação de modelos candidatos em paralelo. A matriz de features (e o
+# alvo) vai uma vez para um bloco de memória compartilhada; os processos do
+# pool só recebem o nome do bloco e fatiam o que precisam sem copiar. Cada
+# tarefa é (candidato, dobra) de uma validação walk-forward no tempo.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+def candidatos_padrao():
+    """Nome -> fábrica (chamável sem argumentos que devolve um estimador novo)."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from modelo import ModeloIncremental
+
+    # n_jobs=1: o paralelismo é entre tarefas, não dentro da floresta
+    rf = partial(RandomForestRegressor, n_estimators=100, random_state=42, n_jobs=1)
+    return {
+        "Random Forest":            rf,
+        "Random Forest (prof. 12)": partial(rf, max_depth=12),
+        "Random Forest (folha 5)":  partial(rf, min_samples_leaf=5),
+        "Linear Regression":        LinearRegression,
+        "SGD incremental":          ModeloIncremental,
+    }
+
+# ─── dobras ───────────────────────────────────────────────────────────────
+def dobras_walk_forward(ts, cutoff, n_dobras=3, fracao_teste=0.2):
+    """
+    Dobras (fim_treino, fim_teste) em índices de `ts`, que deve estar ordenado.
+
+    O período depois de `cutoff` é dividido em `n_dobras` blocos seguidos;
+    a dobra k treina com tudo antes do bloco k e testa no bloco k. Se não
+    há nada depois do cutoff, usa o último `fracao_teste` do tempo.
+    """
+    ts = np.asarray(ts)
+    ini = int(np.searchsorted(ts, cutoff, side="right"))
+    if ini == len(ts):
+        corte = ts[0] + (ts[-1] - ts[0]) * (1 - fracao_teste)
+        ini = int(np.searchsorted(ts, corte, side="right"))
+        print(f"⚠️ Nada depois do cutoff; testando nos últimos {fracao_teste:.0%} do período.")
+    # bordas em ts, não em linhas, para não partir um mesmo instante em dois
+    bordas = np.linspace(ts[ini - 1] if ini else ts[0], ts[-1], n_dobras + 1)
+    fins = np.searchsorted(ts, bordas[1:], side="right")
+    fins[-1] = len(ts)
+    dobras, inicio = [], ini
+    for fim in fins.tolist():
+        if fim > inicio and inicio > 0:
+            dobras.append((inicio, fim))
+        inicio = max(inicio, fim)
+    return dobras
+
+# ─── lado do worker ───────────────────────────────────────────────────────
+_shm = None
+_X = _y = None
+
+def _anexar(nome, forma):
+    global _shm, _X, _y
+    _shm = shared_memory.SharedMemory(name=nome)
+    dados = np.ndarray(forma, dtype=np.float64, buffer=_shm.buf)
+    _X, _y = dados[:, :-1], dados[:, -1]
+
+def _avaliar(nome, fabrica, dobra, fim_treino, fim_teste):
+    modelo = fabrica()
+    t0 = time.perf_counter()
+    modelo.fit(_X[:fim_treino], _y[:fim_treino])
+    t_treino = time.perf_counter() - t0
+    erro = modelo.predict(_X[fim_treino:fim_teste]) - _y[fim_treino:fim_teste]
+    mae  = float(np.mean(np.abs(erro)))
+    rmse = float(np.sqrt(np.mean(erro ** 2)))
+    return nome, dobra, mae, rmse, t_treino
+
+# ─── orquestração ─────────────────────────────────────────────────────────
+def avaliar_candidatos(X, y, dobras, candidatos=None, workers=None):
+    """
+    Treina cada candidato em cada dobra num ProcessPoolExecutor.
+
+    X (n × f) e y (n) devem estar na ordem de `ts` usada nas dobras.
+    Devolve o placar: lista de dicts por modelo (mae, rmse, treino_s e
+    detalhe por dobra), do menor MAE para o maior.
+    """
+    candidatos = candidatos or candidatos_padrao()
+    workers = workers or os.cpu_count() or 1
+    X = np.asarray(X, dtype=np.float64)
+    forma = (X.shape[0], X.shape[1] + 1)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * forma[0] * forma[1]))
+    try:
+        dados = np.ndarray(forma, dtype=np.float64, buffer=shm.buf)
+        dados[:, :-1] = X
+        dados[:, -1] = np.asarray(y, dtype=np.float64)
+        del dados
+
+        # maiores primeiro (florestas, dobras com mais treino) para equilibrar o pool
+        tarefas = sorted(
+            ((nome, fab, k, fim_treino, fim_teste)
+             for nome, fab in candidatos.items()
+             for k, (fim_treino, fim_teste) in enumerate(dobras)),
+            key=lambda t: ("Forest" not in t[0], -t[3]))
+        resultados = {}
+        with ProcessPoolExecutor(workers, initializer=_anexar,
+                                 initargs=(shm.name, forma)) as pool:
+            for fut in as_completed([pool.submit(_avaliar, *t) for t in tarefas]):
+                nome, k, mae, rmse, t_treino = fut.result()
+                resultados.setdefault(nome, []).append((k, mae, rmse, t_treino))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    placar = []
+    for nome, dobras_nome in resultados.items():
+        dobras_nome.sort()
+        placar.append({
+            "modelo":   nome,
+            "mae":      float(np.mean([d[1] for d in dobras_nome])),
+            "rmse":     float(np.mean([d[2] for d in dobras_nome])),
+            "treino_s": float(sum(d[3] for d in dobras_nome)),
+            "dobras":   dobras_nome,
+        })
+    placar.sort(key=lambda p: p["mae"])
+    return placar
+
+def imprimir_placar(placar):
+    print(f"{'#':>2}  {'Modelo':<26} {'MAE':>9} {'RMSE':>9} {'Treino':>9}")
+    for i, p in enumerate(placar, 1):
+        print(f"{i:>2}  {p['modelo']:<26} {p['mae']:>9.2f} {p['rmse']:>9.2f} {p['treino_s']:>8.2f}s")
@@ -1,171 +1,30 @@
 # warframe_market.py
 
 import time
-import json
+T_INICIO = time.perf_counter()   # referência do tempo até a primeira pintura
+
 import threading
 import tkinter as tk
-from collections import deque
-
-import requests
-import urllib3
-import sqlite3
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
 
 from ttkbootstrap import Window, Style, ttk
 from tkinter import messagebox
 
-from database import init_db, insert_record
-from analise_dados import calcular_metricas
-
-# ─── BANCO DE DADOS E MODELO ──────────────────────────────────────────────────
-DB_PATH   = "warframe_market.db"
-db_conn   = init_db()
-MODEL     = None
-running   = True
-
-def train_model():
-    global MODEL
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT * FROM market_data", conn, parse_dates=["ts"])
-    conn.close()
-
-    # usamos apenas as colunas já presentes
-    feature_cols = ["spread", "demand", "supply", "liquidity", "score"]
-    X = df[feature_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
-    y = df["avg_sell"]
-
-    MODEL = RandomForestRegressor(n_estimators=100, random_state=42)
-    MODEL.fit(X, y)
-    print(f"[ML] Modelo treinado com {len(df)} registros")
-
-threading.Thread(target=train_model, daemon=True).start()
-
-# ─── PARÂMETROS GLOBAIS ───────────────────────────────────────────────────────
-BASE_URL        = "https://api.warframe.market/v1"
-HEADERS         = {
-    "Accept":"application/json",
-    "Content-Type":"application/json",
-    "platform":"pc",
-    "language":"en"
-}
-CACHE_FILE      = "cache.json"
-BATCH_SIZE      = 20
-INTERVAL_WORKER = 30    # s entre coleta
+# coleta, banco e modelo ficam no motor (o mesmo que o servico.py usa sem tela)
+import motor
+import telemetria
+from tabela import ModeloTabela, VisaoTabela, formatar_linha, tag_linha
+from recomendacoes import MotorRecomendacoes, carregar_regras
+
+# ─── ESTADO DA UI ────────────────────────────────────────────────────────────
 INTERVAL_UI     = 2     # s entre redraw UI
 
-fila        = deque()
-resultados  = {}  # {'item':…, 'spread':…, 'score':…, 'pred_sell':…}
+tempo_primeira_pintura = None  # s do início do módulo até a janela desenhada com dados
+tempo_ui      = 0.0   # s gastos no último ui_refresh
+versao_ui     = 0     # última versão de resultados já passada para as tabelas
+previsoes_ui  = None  # conjunto de previsões já passado para as tabelas
 ordem_atual = {"coluna":"pred_sell","reversa":False}
 tema_escuro  = True
 
-# ─── SESSÃO HTTP COM RETRIES ─────────────────────────────────────────────────
-session = requests.Session()
-retries = urllib3.util.retry.Retry(
-    total=3, backoff_factor=1,
-    status_forcelist=[429,500,502,503,504]
-)
-adapter = requests.adapters.HTTPAdapter(max_retries=retries)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
-
-# ─── CACHE ────────────────────────────────────────────────────────────────────
-def salvar_cache(path=CACHE_FILE):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(list(resultados.values()), f)
-    except: pass
-
-def carregar_cache(path=CACHE_FILE):
-    try:
-        data = json.load(open(path, encoding="utf-8"))
-        return {d["item"]:d for d in data}
-    except:
-        return {}
-
-# ─── API / CÁLCULO ────────────────────────────────────────────────────────────
-def safe_request(endpoint):
-    resp = session.get(f"{BASE_URL}{endpoint}", headers=HEADERS, timeout=10)
-    if resp.status_code == 504:
-        raise RuntimeError("API em manutenção")
-    resp.raise_for_status()
-    return resp.json()
-
-def get_all_items():
-    try:
-        return [i["url_name"] 
-                for i in safe_request("/items")["payload"]["items"]]
-    except RuntimeError:
-        return None
-    except:
-        return []
-
-def get_orders(item):
-    try:
-        orders = safe_request(f"/items/{item}/orders")["payload"]["orders"]
-        sells = [o for o in orders 
-                 if o["order_type"]=="sell" and o["user"]["status"] in ("online","ingame")]
-        buys  = [o for o in orders 
-                 if o["order_type"]=="buy"  and o["user"]["status"] in ("online","ingame")]
-        return sells, buys
-    except RuntimeError:
-        return None, None
-    except:
-        return [], []
-
-def calcular_dados(item):
-    sells, buys = get_orders(item)
-    if sells is None:
-        raise RuntimeError("API manutenção")
-    if not sells and not buys:
-        return None
-    return {"item":item, **calcular_metricas(sells, buys)}
-
-# ─── WORKERS ─────────────────────────────────────────────────────────────────
-def data_worker():
-    while running:
-        for _ in range(min(BATCH_SIZE, len(fila))):
-            item = fila.popleft()
-            try:
-                rec = calcular_dados(item)
-                if rec:
-                    insert_record(db_conn, rec)
-                    resultados[rec["item"]] = rec
-            except RuntimeError:
-                pass
-        time.sleep(INTERVAL_WORKER)
-
-def predictions_worker():
-    while MODEL is None:
-        time.sleep(0.5)
-    while running:
-        for rec in resultados.values():
-            feat = [rec["spread"], rec["demand"], rec["supply"],
-                    rec["liquidity"], rec["score"]]
-            try:
-                rec["pred_sell"] = float(MODEL.predict([feat])[0])
-            except:
-                rec["pred_sell"] = 0.0
-        time.sleep(INTERVAL_WORKER)
-
-threading.Thread(target=data_worker, daemon=True).start()
-threading.Thread(target=predictions_worker, daemon=True).start()
-
-# ─── INICIALIZAÇÃO DE ITENS OU CACHE ────────────────────────────────────────
-items = get_all_items()
-if items is None:
-    cache = carregar_cache()
-    if cache:
-        messagebox.showwarning("Manutenção","API indisponível, usando cache.")
-        resultados.update(cache)
-    else:
-        messagebox.showerror("Manutenção",
-            "API indisponível e sem cache.\nEncerre o app e tente mais tarde.")
-        exit(1)
-else:
-    fila.extend(items)
-
 # ─── EXPLICAÇÕES E RECOMENDAÇÕES ─────────────────────────────────────────────
 def explain_terms():
     return (
@@ -191,50 +50,9 @@ def explain_columns():
         "- Predição        : preço futuro previsto.\n"
     )
 
-def generate_recommendations(data):
-    if not data:
-        return "Sem dados para recomendar."
-    # Rápido Flip: alta score e spread moderado
-    flip = sorted(
-        [d for d in data if d["score"] >= 12 and d["spread"] >= 5],
-        key=lambda x: x["score"], reverse=True
-    )[:3]
-    # Oportunidade de Arbitragem: spread alto e liquidez ≥5
-    arb = sorted(
-        [d for d in data if d["spread"] >= 10 and d["liquidity"] >= 5],
-        key=lambda x: x["spread"], reverse=True
-    )[:2]
-    # Investimento Long-Term: liquidez alta e score médio
-    hold = sorted(
-        [d for d in data if d["liquidity"] >= 20 and 5 <= d["score"] < 12],
-        key=lambda x: x["liquidity"], reverse=True
-    )[:2]
-    # Itens de Risco: spread baixo e liquidez baixa
-    avoid = sorted(
-        [d for d in data if d["spread"] < 3 and d["liquidity"] < 3],
-        key=lambda x: x["spread"]
-    )[:2]
-
-    lines = ["🔍 Recomendações Profissionais:"]
-    if flip:
-        lines.append("• Flip Rápido:")
-        for d in flip:
-            lines.append(f"  - {d['item']} (Score {d['score']:.1f}, Spread {d['spread']:.1f})")
-    if arb:
-        lines.append("• Arbitragem:")
-        for d in arb:
-            lines.append(f"  - {d['item']} (Spread {d['spread']:.1f}, Liquidez {d['liquidity']})")
-    if hold:
-        lines.append("• Investimento (Long-Term):")
-        for d in hold:
-            lines.append(f"  - {d['item']} (Liquidez {d['liquidity']}, Score {d['score']:.1f})")
-    if avoid:
-        lines.append("• Itens de Risco (Evitar):")
-        for d in avoid:
-            lines.append(f"  - {d['item']} (Spread {d['spread']:.1f}, Liquidez {d['liquidity']})")
-
-    lines.append("👉 Confira missões/grind que dropam estes itens e venda em regiões populosas.")
-    return "\n".join(lines)
+# baldes flip/arbitragem/hold/evitar mantidos incrementalmente; regras extras
+# do usuário vêm de regras.json (ver recomendacoes.py)
+motor_rec = MotorRecomendacoes(carregar_regras())
 
 # ─── MONTAGEM DA UI ──────────────────────────────────────────────────────────
 root = Window(themename="flatly")
@@ -254,16 +72,22 @@ nb = ttk.Notebook(root)
 fr_resumo = ttk.Frame(nb)
 fr_top    = ttk.Frame(nb)
 fr_all    = ttk.Frame(nb)
+fr_saude  = ttk.Frame(nb)
 
 nb.add(fr_resumo, text="Resumo")
 nb.add(fr_top,    text="Top 10")
 nb.add(fr_all,    text="Todos")
+nb.add(fr_saude,  text="Saúde")
 nb.pack(expand=True, fill="both")
 
 lbl_summary = ttk.Label(fr_resumo, text="Gerando recomendações…",
                         anchor="nw", justify="left", font=("Segoe UI", 11))
 lbl_summary.pack(padx=20, pady=(20,5), anchor="nw")
 
+lbl_alertas = ttk.Label(fr_resumo, text="", anchor="nw", justify="left",
+                        font=("Segoe UI", 10), foreground="#c62828")
+lbl_alertas.pack(padx=20, pady=(0,5), anchor="nw")
+
 lbl_help = ttk.Label(fr_resumo, text=explain_terms(),
                      anchor="nw", justify="left",
                      font=("Segoe UI", 9), foreground="#555")
@@ -285,6 +109,13 @@ hdrs = (
 
 tree_top = ttk.Treeview(fr_top, columns=cols, show="headings")
 tree_all = ttk.Treeview(fr_all, columns=cols, show="headings")
+sb_all   = ttk.Scrollbar(fr_all, orient="vertical")
+sb_all.pack(side="right", fill="y")
+
+modelo_tabela = ModeloTabela(formatar_linha, tag_linha,
+                             ordem_atual["coluna"], ordem_atual["reversa"])
+visao_top = VisaoTabela(tree_top, modelo_tabela, linhas=10)
+visao_all = VisaoTabela(tree_all, modelo_tabela, linhas=30, rolagem=sb_all)
 
 def ordenar_por_coluna(col):
     if ordem_atual["coluna"] == col:
@@ -292,7 +123,10 @@ def ordenar_por_coluna(col):
     else:
         ordem_atual["coluna"] = col
         ordem_atual["reversa"] = False
-    ui_refresh()
+    modelo_tabela.definir_ordem(ordem_atual["coluna"], ordem_atual["reversa"])
+    visao_all.inicio = 0
+    visao_top.renderizar()
+    visao_all.renderizar()
 
 for tree in (tree_top, tree_all):
     for c,h in zip(cols, hdrs):
@@ -304,52 +138,101 @@ for tree in (tree_top, tree_all):
     tree.tag_configure("baixo",    background="#c62828", foreground="white")
     tree.pack(expand=True, fill="both")
 
+# aba Saúde: tempos e contadores da telemetria (telemetria.py), para ver se a
+# lentidão vem da API, do banco, da predição ou do próprio redesenho
+cols_saude = ("serie", "n", "media", "p50", "p99", "max")
+tree_saude = ttk.Treeview(fr_saude, columns=cols_saude, show="headings", height=12)
+for c, h in zip(cols_saude, ("Série", "Chamadas", "Média ms", "p50 ms ≤", "p99 ms ≤", "Máx ms")):
+    tree_saude.heading(c, text=h, anchor="center")
+    tree_saude.column(c, width=220 if c == "serie" else 100, anchor="center")
+tree_saude.pack(fill="x", padx=10, pady=(10, 5))
+lbl_contadores = ttk.Label(fr_saude, text="", anchor="nw", justify="left", font=("Segoe UI", 9))
+lbl_contadores.pack(padx=10, pady=5, anchor="nw")
+lbl_erros = ttk.Label(fr_saude, text="", anchor="nw", justify="left",
+                      font=("Segoe UI", 9), foreground="#c62828")
+lbl_erros.pack(padx=10, pady=5, anchor="nw")
+
+def _serie(d):
+    rotulos = ", ".join(f"{k}={v}" for k, v in sorted(d["rotulos"].items()))
+    return f"{d['nome']} ({rotulos})" if rotulos else d["nome"]
+
+def atualizar_saude():
+    snap = telemetria.instantaneo()
+    tree_saude.delete(*tree_saude.get_children())
+    for t in sorted(snap["tempos"], key=_serie):
+        tree_saude.insert("", "end", values=(
+            _serie(t), t["n"], f"{t['soma_s'] / t['n'] * 1000:.1f}",
+            f"{t['p50_s'] * 1000:g}", f"{t['p99_s'] * 1000:g}", f"{t['max_s'] * 1000:.1f}"))
+    lbl_contadores.config(text="\n".join(
+        f"{_serie(c)}: {c['valor']}" for c in sorted(snap["contadores"], key=_serie)))
+    lbl_erros.config(text="\n".join(
+        f"{origem}: {e['n']}× — último {e['tipo']}: {e['mensagem']} "
+        f"({time.strftime('%H:%M:%S', time.localtime(e['ts']))})"
+        for origem, e in sorted(snap["erros"].items())) or "Sem erros.")
+
 # ─── ATUALIZAÇÃO DA UI ───────────────────────────────────────────────────────
-def ui_refresh():
-    dados = list(resultados.values())
-    lbl_summary.config(text=generate_recommendations(dados))
-
-    chave = ordem_atual["coluna"]
-    rev   = ordem_atual["reversa"]
-    ordenados = sorted(dados, key=lambda x: x.get(chave,0), reverse=rev)
-
-    tree_top.delete(*tree_top.get_children())
-    for d in ordenados[:10]:
-        iid = tree_top.insert("", "end", values=(
-            d["item"],
-            f"{d['avg_sell']}p",
-            f"{d['avg_buy']}p",
-            d["demand"], d["supply"], d["score"],
-            d["median_sell"], d["weighted_avg_sell"], d["spread"],
-            f"{d.get('pred_sell',0):.1f}p"
-        ))
-        if d["score"] >= 15:      tree_top.item(iid, tags=("alto",))
-        elif d["spread"] < 5:      tree_top.item(iid, tags=("apertado",))
-        elif d["liquidity"] < 3:   tree_top.item(iid, tags=("baixo",))
-
-    tree_all.delete(*tree_all.get_children())
-    for d in ordenados:
-        iid = tree_all.insert("", "end", values=(
-            d["item"],
-            f"{d['avg_sell']}p",
-            f"{d['avg_buy']}p",
-            d["demand"], d["supply"], d["score"],
-            d["median_sell"], d["weighted_avg_sell"], d["spread"],
-            f"{d.get('pred_sell',0):.1f}p"
-        ))
-        if d["score"] >= 15:      tree_all.item(iid, tags=("alto",))
-        elif d["spread"] < 5:      tree_all.item(iid, tags=("apertado",))
-        elif d["liquidity"] < 3:   tree_all.item(iid, tags=("baixo",))
+def mostrar_aviso():
+    """Mostra o aviso do catálogo; devolve True se o app foi encerrado."""
+    tipo, titulo, texto = motor.aviso_catalogo
+    motor.aviso_catalogo = None
+    if tipo == "erro":
+        messagebox.showerror(titulo, texto)
+        on_close()
+        return True
+    messagebox.showwarning(titulo, texto)
+    return False
 
+def ui_refresh():
+    global tempo_ui, versao_ui, previsoes_ui
+    if motor.aviso_catalogo is not None and mostrar_aviso():
+        return
+    t0 = time.perf_counter()
+
+    # só linhas que mudaram são reformatadas/reposicionadas, e só a janela
+    # visível de cada Treeview é tocada
+    prev = motor.previsoes
+    if prev is previsoes_ui:
+        versao_ui, novos = motor.resultados.mudancas_desde(versao_ui)
+    else:
+        # ciclo novo de predição: qualquer linha pode ter mudado
+        versao_ui, snap = motor.resultados.snapshot()
+        novos, previsoes_ui = list(snap.values()), prev
+    resumo = motor_rec.atualizar(novos).texto()
+    if resumo != lbl_summary.cget("text"):
+        lbl_summary.config(text=resumo)
+
+    if motor.motor_alertas is not None:
+        texto = "\n".join(
+            f"⚠ {time.strftime('%H:%M', time.localtime(a['ts']))} {a['mensagem']}"
+            for a in reversed(motor.motor_alertas.recentes()[-5:]))
+        if texto != lbl_alertas.cget("text"):
+            lbl_alertas.config(text=texto)
+
+    mudados = modelo_tabela.sincronizar(((r.item, r) for r in novos), prev)
+    visao_top.renderizar(mudados)
+    visao_all.renderizar(mudados)
+
+    tempo_ui = time.perf_counter() - t0
+    telemetria.observar("ui_refresh", tempo_ui)
+    if nb.select() == str(fr_saude):
+        atualizar_saude()
     root.after(int(INTERVAL_UI*1000), ui_refresh)
 
-root.after(100, ui_refresh)
+def marcar_primeira_pintura():
+    # roda no primeiro giro do mainloop; o update força o desenho pendente
+    global tempo_primeira_pintura
+    root.update_idletasks()
+    tempo_primeira_pintura = time.perf_counter() - T_INICIO
+    print(f"[UI] Primeira pintura em {tempo_primeira_pintura*1000:.0f} ms "
+          f"({len(motor.resultados)} itens do {origem_inicial})")
+    threading.Thread(target=motor.inicializar_fundo, daemon=True).start()
+
+origem_inicial = motor.carregar_inicial()
+ui_refresh()   # a primeira tela já sai com os dados do cache/banco
+root.after(0, marcar_primeira_pintura)
 
 def on_close():
-    global running
-    running = False
-    salvar_cache()
-    db_conn.close()
+    motor.parar()
     root.destroy()
 
 root.protocol("WM_DELETE_WINDOW", on_close)